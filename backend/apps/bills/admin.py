@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Bill, BillVote, BillUpdate
+from .models import AnalysisJob, AnalysisRun, AnalyticsResult, Bill, BillVote, BillUpdate, Deputy, DeputyVote, LLMResponseCache, Print, PrintSetAnalysis
 
 
 @admin.register(Bill)
@@ -111,3 +111,93 @@ class BillUpdateAdmin(admin.ModelAdmin):
         }),
     )
 
+
+
+@admin.register(Print)
+class PrintAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla druków sejmowych"""
+    list_display = ('number', 'term', 'title_short', 'exists', 'extraction_method', 'text_length', 'checked_at')
+    list_filter = ('term', 'exists', 'extraction_method')
+    search_fields = ('number', 'title')
+    ordering = ('term', 'number')
+    raw_id_fields = ('predecessor',)
+    readonly_fields = ('content_hash', 'checked_at', 'text_extracted_at', 'created_at', 'updated_at')
+    
+    def title_short(self, obj):
+        return obj.title[:50] + '...' if len(obj.title) > 50 else obj.title
+    title_short.short_description = 'Tytuł'
+    
+    def text_length(self, obj):
+        return len(obj.text)
+    text_length.short_description = 'Długość tekstu'
+
+
+@admin.register(Deputy)
+class DeputyAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla posłów"""
+    list_display = ('last_name', 'first_name', 'club')
+    list_filter = ('club',)
+    search_fields = ('last_name', 'first_name')
+    ordering = ('last_name', 'first_name')
+
+
+@admin.register(DeputyVote)
+class DeputyVoteAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla głosów posłów"""
+    list_display = ('deputy', 'bill', 'club', 'vote')
+    list_filter = ('vote', 'club')
+    search_fields = ('deputy__last_name', 'deputy__first_name', 'bill__title', 'bill__number')
+    raw_id_fields = ('bill', 'deputy')
+
+
+@admin.register(AnalyticsResult)
+class AnalyticsResultAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla przeliczonych analiz głosowań"""
+    list_display = ('key', 'votings', 'duration_ms', 'computed_at')
+    readonly_fields = ('computed_at',)
+
+
+@admin.register(LLMResponseCache)
+class LLMResponseCacheAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla cache odpowiedzi AI"""
+    list_display = ('key_short', 'template_version', 'model', 'tokens', 'hits', 'misses', 'created_at', 'last_hit_at')
+    list_filter = ('template_version', 'model')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'model', 'template_version', 'tokens', 'hits', 'misses', 'created_at', 'last_hit_at')
+    
+    def key_short(self, obj):
+        return obj.key[:12]
+    key_short.short_description = 'Klucz'
+
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla zadań analizy AI"""
+    list_display = ('bill', 'status', 'stage', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'stage')
+    search_fields = ('bill__title', 'bill__number')
+    raw_id_fields = ('bill', 'requested_by')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
+@admin.register(PrintSetAnalysis)
+class PrintSetAnalysisAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla wspólnych analiz zestawów druków"""
+    list_display = ('key', 'term', 'bills_count', 'analysis_date', 'updated_at')
+    list_filter = ('term',)
+    search_fields = ('key',)
+    readonly_fields = ('created_at', 'updated_at')
+    
+    def bills_count(self, obj):
+        return obj.bills.count()
+    bills_count.short_description = 'Głosowania'
+
+
+@admin.register(AnalysisRun)
+class AnalysisRunAdmin(admin.ModelAdmin):
+    """Panel administracyjny dla telemetrii przebiegów analizy AI"""
+    list_display = ('bill', 'status', 'mode', 'total_seconds', 'llm_calls', 'cache_hits', 'prompt_tokens', 'completion_tokens', 'cost_usd', 'created_at')
+    list_filter = ('status', 'mode', 'model')
+    search_fields = ('bill__title', 'bill__number')
+    raw_id_fields = ('bill', 'print_set')
+    readonly_fields = ('created_at',)
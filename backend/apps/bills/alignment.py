@@ -0,0 +1,137 @@
+"""
+Zgodność głosów obywateli (BillVote) z głosowaniami w Sejmie
+
+Dla każdego projektu trzymany jest rekord BillAlignment (stanowisko
+obywateli, wynik Sejmu, zgodność klubów), a dla każdego klubu liczniki
+ClubAlignment. Po każdym głosie obywatela przeliczany jest tylko rekord
+tego projektu, a liczniki klubów zmieniane są o różnicę względem
+poprzedniego stanu - bez łączenia wszystkich głosów ze wszystkimi
+głosowaniami przy każdym żądaniu.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+import logging
+
+from .models import BillAlignment, ClubAlignment
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_KEY = 'alignment:summary'
+CACHE_TIMEOUT = 60 * 60
+
+
+def majority_position(yes, no):
+    """'support' / 'against' albo '' przy remisie lub braku głosów"""
+    if yes > no:
+        return 'support'
+    if no > yes:
+        return 'against'
+    return ''
+
+
+def sejm_counts(bill):
+    """Głosy za i przeciw w Sejmie z zapisanych wyników głosowania"""
+    results = bill.voting_results or {}
+    return int(results.get('za') or 0), int(results.get('przeciw') or 0)
+
+
+def club_positions(bill):
+    """Stanowisko większości każdego klubu w głosowaniu"""
+    positions = {}
+    for club in bill.club_results or []:
+        position = majority_position(club.get('za', 0), club.get('przeciw', 0))
+        if club.get('klub') and position:
+            positions[club['klub']] = position
+    return positions
+
+
+@transaction.atomic
+def update_bill_alignment(bill):
+    """
+    Przelicza zgodność dla jednego projektu i koryguje liczniki klubów o różnicę
+
+    Wywoływane po każdej zmianie głosów obywateli (Bill.update_vote_statistics)
+    i po imporcie wyników głosowania.
+    """
+    alignment, _ = BillAlignment.objects.select_for_update().get_or_create(bill=bill)
+    old_matches = alignment.club_matches or {}
+
+    alignment.citizen_support = bill.support_votes
+    alignment.citizen_against = bill.against_votes
+    alignment.citizen_neutral = bill.neutral_votes
+    alignment.citizen_position = majority_position(bill.support_votes, bill.against_votes)
+    alignment.sejm_yes, alignment.sejm_no = sejm_counts(bill)
+    alignment.sejm_position = majority_position(alignment.sejm_yes, alignment.sejm_no)
+    if alignment.citizen_position and alignment.sejm_position:
+        alignment.aligned = alignment.citizen_position == alignment.sejm_position
+    else:
+        alignment.aligned = None
+
+    new_matches = {}
+    if alignment.citizen_position:
+        new_matches = {
+            club: position == alignment.citizen_position
+            for club, position in club_positions(bill).items()
+        }
+
+    for club in set(old_matches) | set(new_matches):
+        compared_delta = (club in new_matches) - (club in old_matches)
+        aligned_delta = int(new_matches.get(club, False)) - int(old_matches.get(club, False))
+        if not compared_delta and not aligned_delta:
+            continue
+        ClubAlignment.objects.get_or_create(club=club)
+        ClubAlignment.objects.filter(club=club).update(
+            compared_votings=F('compared_votings') + compared_delta,
+            aligned_votings=F('aligned_votings') + aligned_delta
+        )
+
+    alignment.club_matches = new_matches
+    alignment.save()
+    transaction.on_commit(lambda: cache.delete(SUMMARY_CACHE_KEY))
+    return alignment
+
+
+@transaction.atomic
+def rebuild_alignment(bills):
+    """Przelicza zgodność od zera dla podanych projektów (liczniki klubów zerowane)"""
+    BillAlignment.objects.all().delete()
+    ClubAlignment.objects.all().delete()
+    count = 0
+    for bill in bills:
+        update_bill_alignment(bill)
+        count += 1
+    return count
+
+
+def get_alignment_summary():
+    """Zgodność Sejmu i klubów z obywatelami (z cache)"""
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is not None:
+        return summary
+
+    totals = BillAlignment.objects.aggregate(
+        compared=Count('id', filter=Q(aligned__isnull=False)),
+        aligned=Count('id', filter=Q(aligned=True))
+    )
+    clubs = [
+        {
+            'club': club.club,
+            'compared_votings': club.compared_votings,
+            'aligned_votings': club.aligned_votings,
+            'alignment_rate': club.alignment_rate,
+        }
+        for club in ClubAlignment.objects.filter(compared_votings__gt=0)
+    ]
+    clubs.sort(key=lambda club: club['alignment_rate'], reverse=True)
+
+    summary = {
+        'sejm': {
+            'compared_votings': totals['compared'],
+            'aligned_votings': totals['aligned'],
+            'alignment_rate': round(totals['aligned'] / totals['compared'], 4) if totals['compared'] else None,
+        },
+        'clubs': clubs,
+    }
+    cache.set(SUMMARY_CACHE_KEY, summary, CACHE_TIMEOUT)
+    return summary
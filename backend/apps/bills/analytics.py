@@ -0,0 +1,256 @@
+"""
+Analizy głosowań klubów liczone wektorowo na macierzy głosów
+
+- spójność klubów (indeks Rice'a: |za - przeciw| / (za + przeciw))
+- posłowie głosujący wbrew większości własnego klubu
+- macierz zgodności klub x klub (odsetek głosowań z tym samym stanowiskiem)
+
+Wszystkie wyliczenia to operacje NumPy na całej macierzy (głosowania x posłowie),
+bez pętli po głosowaniach i posłach. Wyniki są przeliczane po imporcie
+głosowań (compute_all_analytics) i zapisywane w modelu AnalyticsResult,
+a endpointy czytają je przez cache Django.
+"""
+import os
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+from .models import AnalyticsResult, Deputy
+from .vote_matrix import NO_CLUB, VOTE_CODES, _atomic_write, load_vote_matrix
+
+logger = logging.getLogger(__name__)
+
+FOR = VOTE_CODES['ZA']
+AGAINST = VOTE_CODES['PRZECIW']
+ABSTAIN = VOTE_CODES['WSTRZYMAŁ']
+# Stanowiska brane pod uwagę przy ustalaniu większości klubu
+POSITIONS = (FOR, AGAINST, ABSTAIN)
+NUM_CODES = max(VOTE_CODES.values()) + 1
+
+CACHE_TIMEOUT = 60 * 60
+
+# Stanowiska klubów (głosowania x kluby) zapisywane obok macierzy głosów
+POSITIONS_FILE = 'club_positions.npz'
+
+
+def club_vote_counts(matrix):
+    """
+    Liczba głosów każdego rodzaju dla każdego klubu w każdym głosowaniu
+
+    Returns:
+        np.ndarray: Tablica (głosowania x kluby x kody głosów)
+    """
+    n_bills = matrix.votes.shape[0]
+    n_clubs = len(matrix.club_names)
+    clubs = np.asarray(matrix.clubs)
+    votes = np.asarray(matrix.votes)
+
+    present = clubs != NO_CLUB
+    rows = np.broadcast_to(np.arange(n_bills)[:, None], clubs.shape)[present]
+    flat_index = (rows * n_clubs + clubs[present]) * NUM_CODES + votes[present]
+    counts = np.bincount(flat_index, minlength=n_bills * n_clubs * NUM_CODES)
+    return counts.reshape(n_bills, n_clubs, NUM_CODES)
+
+
+def club_positions(counts):
+    """
+    Stanowisko większości klubu w każdym głosowaniu
+
+    Returns:
+        np.ndarray: (głosowania x kluby) z kodem głosu większości albo 0,
+            gdy klub nie głosował lub był remis
+    """
+    position_counts = counts[:, :, POSITIONS]
+    best = position_counts.argmax(axis=2)
+    top = np.take_along_axis(position_counts, best[:, :, None], axis=2)[:, :, 0]
+    ties = (position_counts == top[:, :, None]).sum(axis=2) > 1
+    positions = np.asarray(POSITIONS, dtype=np.int8)[best]
+    positions[(top == 0) | ties] = 0
+    return positions
+
+
+def rice_index(counts):
+    """
+    Indeks Rice'a klubów
+
+    Returns:
+        np.ndarray: (głosowania x kluby), NaN gdy w klubie nikt nie głosował za ani przeciw
+    """
+    votes_for = counts[:, :, FOR].astype(np.float64)
+    votes_against = counts[:, :, AGAINST].astype(np.float64)
+    total = votes_for + votes_against
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, np.abs(votes_for - votes_against) / total, np.nan)
+
+
+def compute_cohesion(matrix, counts):
+    """Średni indeks Rice'a i liczba głosowań dla każdego klubu"""
+    rice = rice_index(counts)
+    voted = ~np.isnan(rice)
+    voting_counts = voted.sum(axis=0)
+    mean_rice = np.nansum(rice, axis=0) / np.maximum(voting_counts, 1)
+
+    # Liczba różnych posłów, którzy głosowali w barwach klubu
+    clubs_matrix = np.asarray(matrix.clubs)
+    present = clubs_matrix != NO_CLUB
+    columns = np.broadcast_to(np.arange(clubs_matrix.shape[1]), clubs_matrix.shape)[present]
+    pairs = np.unique(clubs_matrix[present].astype(np.int64) * clubs_matrix.shape[1] + columns)
+    members = np.bincount(pairs // clubs_matrix.shape[1], minlength=len(matrix.club_names))
+
+    clubs = []
+    for club_number, club_name in enumerate(matrix.club_names):
+        if not voting_counts[club_number]:
+            continue
+        clubs.append({
+            'club': club_name,
+            'rice_index': round(float(mean_rice[club_number]), 4),
+            'votings': int(voting_counts[club_number]),
+            'members': int(members[club_number]),
+        })
+    clubs.sort(key=lambda club: club['rice_index'], reverse=True)
+    return {'clubs': clubs, 'votings': len(matrix.bill_ids)}
+
+
+def compute_rebels(matrix, positions, limit=50):
+    """Posłowie najczęściej głosujący wbrew większości własnego klubu"""
+    votes = np.asarray(matrix.votes)
+    clubs = np.asarray(matrix.clubs)
+    present = clubs != NO_CLUB
+
+    # Stanowisko klubu posła w każdym głosowaniu (gather po numerze klubu)
+    rows = np.arange(votes.shape[0])[:, None]
+    own_position = np.where(present, positions[rows, np.where(present, clubs, 0)], 0)
+
+    counted = present & (own_position != 0) & np.isin(votes, POSITIONS)
+    rebel = counted & (votes != own_position)
+    counted_totals = counted.sum(axis=0)
+    rebel_totals = rebel.sum(axis=0)
+
+    order = np.lexsort((-counted_totals, -rebel_totals))
+    order = [column for column in order if rebel_totals[column] > 0][:limit]
+    deputies = Deputy.objects.in_bulk([matrix.deputy_ids[column] for column in order])
+
+    rebels = []
+    for column in order:
+        deputy = deputies.get(matrix.deputy_ids[column])
+        if deputy is None:
+            continue
+        rebels.append({
+            'deputy_id': deputy.id,
+            'first_name': deputy.first_name,
+            'last_name': deputy.last_name,
+            'club': deputy.club,
+            'rebel_votes': int(rebel_totals[column]),
+            'votes': int(counted_totals[column]),
+            'rebel_rate': round(float(rebel_totals[column] / counted_totals[column]), 4),
+        })
+    return {'deputies': rebels}
+
+
+def compute_club_agreement(matrix, positions):
+    """
+    Macierz zgodności klubów
+
+    Dla każdej pary klubów: odsetek głosowań, w których oba kluby miały
+    stanowisko większości i było ono takie samo.
+    """
+    both_decided = (positions != 0).astype(np.int32)
+    agree = np.zeros((positions.shape[1], positions.shape[1]), dtype=np.int64)
+    for position in POSITIONS:
+        same = (positions == position).astype(np.int32)
+        agree += same.T @ same
+    shared = both_decided.T @ both_decided
+    with np.errstate(invalid='ignore', divide='ignore'):
+        agreement = np.where(shared > 0, agree / np.maximum(shared, 1), np.nan)
+
+    active = [number for number in range(len(matrix.club_names)) if shared[number, number] > 0]
+    return {
+        'clubs': [matrix.club_names[number] for number in active],
+        'agreement': [
+            [None if np.isnan(agreement[a, b]) else round(float(agreement[a, b]), 4) for b in active]
+            for a in active
+        ],
+        'shared_votings': [[int(shared[a, b]) for b in active] for a in active],
+    }
+
+
+ANALYTICS = ('cohesion', 'rebels', 'club_agreement')
+
+
+def compute_all_analytics(matrix=None):
+    """
+    Przelicza wszystkie analizy i zapisuje je w bazie oraz w cache
+
+    Returns:
+        dict: Czas wyliczeń w milisekundach dla każdej analizy
+    """
+    matrix = matrix or load_vote_matrix()
+    if matrix is None or not matrix.bill_ids:
+        logger.warning("Brak macierzy głosów - pomijam analizy klubów")
+        return {}
+
+    timings = {}
+    start = time.perf_counter()
+    counts = club_vote_counts(matrix)
+    positions = club_positions(counts)
+    shared_ms = (time.perf_counter() - start) * 1000
+    save_club_positions(matrix, positions)
+
+    computations = {
+        'cohesion': lambda: compute_cohesion(matrix, counts),
+        'rebels': lambda: compute_rebels(matrix, positions),
+        'club_agreement': lambda: compute_club_agreement(matrix, positions),
+    }
+    for key, compute in computations.items():
+        start = time.perf_counter()
+        data = compute()
+        duration_ms = shared_ms + (time.perf_counter() - start) * 1000
+        timings[key] = round(duration_ms, 1)
+        AnalyticsResult.objects.update_or_create(
+            key=key,
+            defaults={'data': data, 'votings': len(matrix.bill_ids), 'duration_ms': duration_ms}
+        )
+        cache.set(f'analytics:{key}', data, CACHE_TIMEOUT)
+
+    logger.info(f"Przeliczono analizy klubów: {timings}")
+    return timings
+
+
+def save_club_positions(matrix, positions, matrix_dir=None):
+    """Zapisuje stanowiska klubów razem ze znacznikiem wersji macierzy głosów"""
+    matrix_dir = str(matrix_dir or settings.VOTE_MATRIX_DIR)
+    os.makedirs(matrix_dir, exist_ok=True)
+    _atomic_write(
+        matrix_dir, POSITIONS_FILE,
+        lambda f: np.savez(f, positions=positions, built_at=np.float64(matrix.built_at or 0))
+    )
+
+
+def load_club_positions(matrix, matrix_dir=None):
+    """
+    Stanowiska klubów dla podanej macierzy głosów
+
+    Używa zapisanego pliku, jeśli pochodzi z tej samej wersji macierzy,
+    w przeciwnym razie liczy je od nowa.
+    """
+    path = os.path.join(str(matrix_dir or settings.VOTE_MATRIX_DIR), POSITIONS_FILE)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            if float(data['built_at']) == float(matrix.built_at or 0):
+                return data['positions']
+    return club_positions(club_vote_counts(matrix))
+
+
+def get_analytics(key):
+    """Zwraca wynik analizy z cache albo z bazy (None, jeśli nie był przeliczony)"""
+    data = cache.get(f'analytics:{key}')
+    if data is None:
+        result = AnalyticsResult.objects.filter(key=key).first()
+        if result is None:
+            return None
+        data = result.data
+        cache.set(f'analytics:{key}', data, CACHE_TIMEOUT)
+    return data
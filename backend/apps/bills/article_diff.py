@@ -0,0 +1,91 @@
+"""
+Porównanie wersji tekstu projektu na poziomie artykułów
+
+Przy analizie zapisywane są teksty artykułów wersji, którą analizowano
+(PrintSetAnalysis.analysis_source, dla projektów bez druków
+Bill.ai_analysis_source). Gdy pojawi się nowa wersja druku (autopoprawka,
+sprawozdanie komisji), porównywane są artykuły obu wersji i do AI trafiają
+tylko zmiany razem z poprzednią analizą - koszt ponownej analizy zależy od
+wielkości zmiany, a nie od długości projektu.
+"""
+import difflib
+
+from .legal_structure import article_texts, is_current, segment_text
+
+
+def extract_articles(text, structure=None):
+    """
+    Teksty artykułów projektu bez numerów druków: {'Art. 5': tekst}
+
+    Nowa wersja projektu ma zwykle inny numer druku (np. 12-A), więc
+    artykuły dopasowywane są po oznaczeniu i kolejności wystąpienia.
+    Zapisana struktura tekstu jest używana, jeśli jest aktualna.
+    """
+    if not is_current(structure, text):
+        structure = segment_text(text)
+    return article_texts(structure, text, with_print=False)
+
+
+def diff_articles(old_articles, new_articles):
+    """
+    Artykuły dodane, usunięte i zmienione między wersjami
+
+    Returns:
+        dict: added / removed / modified (listy oznaczeń), unchanged (liczba),
+            changed_chars i total_chars (do oceny, czy zmiana jest mała)
+    """
+    added = [key for key in new_articles if key not in old_articles]
+    removed = [key for key in old_articles if key not in new_articles]
+    modified = [
+        key for key in new_articles
+        if key in old_articles and _normalize(old_articles[key]) != _normalize(new_articles[key])
+    ]
+    changed_chars = (
+        sum(len(new_articles[key]) for key in added + modified)
+        + sum(len(old_articles[key]) for key in removed)
+    )
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'unchanged': len(new_articles) - len(added) - len(modified),
+        'changed_chars': changed_chars,
+        'total_chars': sum(len(text) for text in new_articles.values()),
+    }
+
+
+def has_changes(diff):
+    return bool(diff['added'] or diff['removed'] or diff['modified'])
+
+
+def change_share(diff):
+    """Udział zmienionego tekstu w całym projekcie (0-1)"""
+    if not diff['total_chars']:
+        return 1.0
+    return min(diff['changed_chars'] / diff['total_chars'], 1.0)
+
+
+def _normalize(text):
+    # Różnice w białych znakach (np. inne łamanie linii po OCR) nie są zmianą treści
+    return ' '.join(text.split())
+
+
+def _lines(text):
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def format_changes(old_articles, new_articles, diff):
+    """Opis zmian dla AI: diff zmienionych artykułów, pełny tekst dodanych, lista usuniętych"""
+    parts = []
+    for key in diff['modified']:
+        lines = difflib.unified_diff(
+            _lines(old_articles[key]), _lines(new_articles[key]),
+            fromfile=f'{key} (poprzednia wersja)', tofile=f'{key} (nowa wersja)',
+            n=1, lineterm=''
+        )
+        parts.append(f"=== ZMIENIONY: {key} ===\n" + '\n'.join(lines))
+    for key in diff['added']:
+        parts.append(f"=== DODANY: {key} ===\n{new_articles[key].strip()}")
+    if diff['removed']:
+        parts.append("=== USUNIĘTE: " + ', '.join(diff['removed']) + " ===")
+    return '\n\n'.join(parts)
@@ -0,0 +1,95 @@
+"""
+Dzielenie długich tekstów prawnych na fragmenty mieszczące się w oknie modelu
+
+Tekst dzielony jest na jednostki na granicach struktury aktu (druk, dział,
+rozdział, artykuł, paragraf - legal_structure), a jednostki łączone są we fragmenty o
+ograniczonej liczbie tokenów. Granica fragmentu zależy od treści jednostki
+(hash), a nie od łącznej długości tekstu przed nią - zmiana jednego artykułu
+zmienia zwykle tylko jeden fragment, więc streszczenia pozostałych
+fragmentów trafiają w cache odpowiedzi.
+"""
+import hashlib
+import re
+
+from .legal_structure import is_current, segment_text, unit_starts
+from .llm import CHARS_PER_TOKEN, estimate_tokens
+
+# Średnio co który koniec jednostki (powyżej minimalnego rozmiaru) zamyka fragment
+BOUNDARY_MODULUS = 4
+
+
+def split_units(text, structure=None):
+    """
+    Dzieli tekst na jednostki (druki, rozdziały, artykuły) - bez gubienia znaków
+
+    Granice pochodzą ze struktury tekstu (legal_structure); zapisaną
+    strukturę można przekazać, żeby nie parsować tekstu ponownie.
+    """
+    if not is_current(structure, text):
+        structure = segment_text(text)
+    starts = unit_starts(structure)
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    starts.append(len(text))
+    return [text[start:end] for start, end in zip(starts, starts[1:]) if text[start:end].strip()]
+
+
+def _split_oversized(unit, max_tokens):
+    """Dzieli zbyt długą jednostkę na akapity, a w ostateczności na równe kawałki"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    current = ''
+    for paragraph in re.split(r'(?<=\n\n)', unit):
+        if len(current) + len(paragraph) <= max_chars:
+            current += paragraph
+            continue
+        if current:
+            pieces.append(current)
+        while len(paragraph) > max_chars:
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        current = paragraph
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+def _is_content_boundary(unit):
+    digest = hashlib.sha1(unit.strip().encode('utf-8')).digest()
+    return digest[0] % BOUNDARY_MODULUS == 0
+
+
+def chunk_text(text, max_tokens, structure=None):
+    """
+    Łączy jednostki tekstu we fragmenty o co najwyżej max_tokens tokenach
+
+    Fragment zamykany jest po jednostce, której hash wyznacza granicę (gdy
+    fragment ma już co najmniej połowę limitu), albo gdy następna jednostka
+    przekroczyłaby limit.
+
+    Returns:
+        list: Lista fragmentów tekstu
+    """
+    units = []
+    for unit in split_units(text, structure):
+        if estimate_tokens(unit) > max_tokens:
+            units.extend(_split_oversized(unit, max_tokens))
+        else:
+            units.append(unit)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+        if current_tokens >= max_tokens // 2 and _is_content_boundary(unit):
+            chunks.append(''.join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append(''.join(current))
+    return chunks
@@ -0,0 +1,78 @@
+"""
+Zapis głosów posłów sparsowanych z PDF-ów głosowań
+
+Głosy zapisywane są przy imporcie głosowania (fetch_hybrid_bills) albo
+odtwarzane z zapisanych wyników klubów (backfill_deputy_votes), dzięki
+czemu endpointy czytają je jednym zapytaniem po indeksie zamiast parsować
+PDF przy każdym wyświetleniu.
+"""
+from django.db import transaction
+import logging
+
+from .models import Deputy, DeputyVote
+
+logger = logging.getLogger(__name__)
+
+VALID_VOTES = {choice for choice, _ in DeputyVote.VOTE_CHOICES}
+
+
+def deputies_from_club_results(club_results):
+    """Odtwarza listę posłów (w kolejności z PDF-a) z wyników klubów"""
+    deputies = []
+    for club in club_results or []:
+        deputies.extend(club.get('deputies', []))
+    return deputies
+
+
+@transaction.atomic
+def save_deputy_votes(bill, deputies):
+    """
+    Zastępuje zapisane głosy posłów w głosowaniu
+
+    Args:
+        bill: Instancja modelu Bill (głosowanie)
+        deputies: Lista słowników party/first_name/last_name/vote
+
+    Returns:
+        int: Liczba zapisanych głosów
+    """
+    rows = []
+    seen = set()
+    for deputy in deputies:
+        key = (deputy['last_name'], deputy['first_name'])
+        if key in seen or deputy['vote'] not in VALID_VOTES:
+            continue
+        seen.add(key)
+        rows.append((key, deputy['party'], deputy['vote']))
+
+    known = {
+        (deputy.last_name, deputy.first_name): deputy
+        for deputy in Deputy.objects.filter(last_name__in={key[0] for key in seen})
+    }
+    missing = [
+        Deputy(last_name=key[0], first_name=key[1], club=club)
+        for key, club, _ in rows if key not in known
+    ]
+    if missing:
+        Deputy.objects.bulk_create(missing, ignore_conflicts=True)
+        known.update({
+            (deputy.last_name, deputy.first_name): deputy
+            for deputy in Deputy.objects.filter(last_name__in={d.last_name for d in missing})
+        })
+
+    # Klub posła to klub z ostatnio zapisanego głosowania
+    changed = []
+    for key, club, _ in rows:
+        if known[key].club != club:
+            known[key].club = club
+            changed.append(known[key])
+    if changed:
+        Deputy.objects.bulk_update(changed, ['club'])
+
+    DeputyVote.objects.filter(bill=bill).delete()
+    DeputyVote.objects.bulk_create([
+        DeputyVote(bill=bill, deputy=known[key], club=club, vote=vote, position=position)
+        for position, (key, club, vote) in enumerate(rows)
+    ])
+    logger.info(f"Zapisano {len(rows)} głosów posłów dla głosowania {bill.number}")
+    return len(rows)
@@ -0,0 +1,133 @@
+"""
+Zadania analizy AI wykonywane w tle
+
+Endpoint generowania analizy tworzy rekord AnalysisJob i od razu zwraca
+202 - pobieranie druków, OCR i zapytanie do OpenAI wykonuje pula wątków
+procesu (AI_ANALYSIS_WORKERS), a nie worker obsługujący żądanie. Dla
+projektu (i dla zestawu druków wspólnego z innymi głosowaniami) może
+istnieć tylko jedno aktywne zadanie; kolejne żądania dołączają do niego.
+Postęp (etap) zapisywany jest w rekordzie zadania.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+import logging
+
+from .models import AnalysisJob, PrintSetAnalysis
+from .prints import get_print_set
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TooManyJobs(Exception):
+    """Użytkownik ma już maksymalną liczbę aktywnych zadań"""
+
+
+def get_executor():
+    """Pula wątków wykonujących zadania analizy (jedna na proces)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.AI_ANALYSIS_WORKERS,
+                    thread_name_prefix='ai-analysis'
+                )
+    return _executor
+
+
+def expire_stale_jobs():
+    """Oznacza jako nieudane zadania aktywne dłużej niż AI_ANALYSIS_JOB_TIMEOUT (np. po restarcie procesu)"""
+    deadline = timezone.now() - timedelta(seconds=settings.AI_ANALYSIS_JOB_TIMEOUT)
+    return AnalysisJob.objects.filter(
+        status__in=AnalysisJob.ACTIVE_STATUSES, created_at__lt=deadline
+    ).update(status='failed', error='Przekroczono limit czasu zadania', finished_at=timezone.now())
+
+
+def enqueue_analysis(bill, user=None):
+    """
+    Zleca analizę projektu albo zwraca zadanie, które już trwa
+
+    Returns:
+        tuple: (AnalysisJob, czy utworzono nowe zadanie)
+
+    Raises:
+        TooManyJobs: Użytkownik przekroczył AI_ANALYSIS_MAX_JOBS_PER_USER
+    """
+    expire_stale_jobs()
+
+    # Analiza zestawu druków jest wspólna - zadanie innego głosowania nad tymi drukami też się liczy
+    same_text = Q(bill=bill)
+    print_set = get_print_set(bill)
+    if print_set is not None:
+        same_text |= Q(bill__print_set=print_set)
+
+    try:
+        with transaction.atomic():
+            if print_set is not None:
+                # Blokada wiersza zestawu szereguje zlecenia głosowań nad tymi samymi drukami
+                # (unikalność aktywnego zadania w bazie obejmuje tylko pojedynczy projekt)
+                list(PrintSetAnalysis.objects.select_for_update().filter(id=print_set.id).values_list('id', flat=True))
+            active = AnalysisJob.objects.filter(same_text, status__in=AnalysisJob.ACTIVE_STATUSES).first()
+            if active is not None:
+                return active, False
+
+            if user is not None and AnalysisJob.objects.filter(
+                requested_by=user, status__in=AnalysisJob.ACTIVE_STATUSES
+            ).count() >= settings.AI_ANALYSIS_MAX_JOBS_PER_USER:
+                raise TooManyJobs()
+
+            job = AnalysisJob.objects.create(bill=bill, requested_by=user)
+    except IntegrityError:
+        # Równoległe żądanie zdążyło utworzyć zadanie dla tego projektu
+        active = AnalysisJob.objects.filter(bill=bill, status__in=AnalysisJob.ACTIVE_STATUSES).first()
+        if active is not None:
+            return active, False
+        # Zwycięskie zadanie zdążyło się już zakończyć - zleć analizę ponownie
+        return enqueue_analysis(bill, user)
+
+    transaction.on_commit(lambda: get_executor().submit(run_analysis_job, job.id))
+    return job, True
+
+
+def set_stage(job_id, stage):
+    AnalysisJob.objects.filter(id=job_id).update(stage=stage)
+
+
+def run_analysis_job(job_id):
+    """Wykonuje zadanie analizy (w wątku puli)"""
+    from .services import AIAnalysisService
+
+    try:
+        updated = AnalysisJob.objects.filter(id=job_id, status='queued').update(
+            status='running', stage='extraction', started_at=timezone.now()
+        )
+        if not updated:
+            return
+        job = AnalysisJob.objects.select_related('bill').get(id=job_id)
+
+        ai_service = AIAnalysisService(fetch_prints=True, progress=lambda stage: set_stage(job_id, stage))
+        analysis = ai_service.analyze_bill(job.bill)
+        if analysis is None:
+            raise RuntimeError('Brak tekstu do analizy')
+        if 'error' in analysis:
+            raise RuntimeError(analysis['error'])
+
+        set_stage(job_id, 'save')
+        if not ai_service.save_analysis_to_bill(job.bill, analysis):
+            raise RuntimeError('Błąd podczas zapisywania analizy')
+
+        AnalysisJob.objects.filter(id=job_id).update(status='done', stage='done', finished_at=timezone.now())
+    except Exception as e:
+        logger.error(f"Zadanie analizy AI {job_id} nieudane: {str(e)}")
+        AnalysisJob.objects.filter(id=job_id).update(status='failed', error=str(e), finished_at=timezone.now())
+    finally:
+        connection.close()
@@ -0,0 +1,273 @@
+"""
+Jednoprzebiegowy podział tekstu aktu prawnego na strukturę
+
+Tekst czytany jest linia po linii; początek każdej linii porównywany jest
+z zakotwiczonymi wzorcami jednostek (druk, dział, rozdział, artykuł,
+paragraf, ustęp, punkt, litera, uzasadnienie, załącznik), bez wyrażeń
+z leniwym `.*?` po całym tekście. Wynik to drzewo jednostek z zakresami
+znaków (start, end) w tekście, zapisywane obok tekstu (Print.structure,
+Bill.structure) - skracanie, podświetlanie wyników wyszukiwania i porównywanie
+wersji korzystają z niego bez ponownego parsowania.
+
+Format:
+    {'version': 1, 'text_hash': '...', 'length': 1234, 'nodes': [
+        {'type': 'article', 'label': '5', 'start': 100, 'end': 400, 'children': [...]},
+    ]}
+"""
+import hashlib
+import re
+
+STRUCTURE_VERSION = 1
+
+# Poziom zagnieżdżenia - jednostka zamyka wszystkie otwarte jednostki o poziomie >= swojemu
+LEVELS = {
+    'print': 0,
+    'justification': 1,
+    'annex': 1,
+    'division': 2,
+    'chapter': 3,
+    'article': 4,
+    'section': 4,
+    'paragraph': 5,
+    'point': 6,
+    'letter': 7,
+}
+# Jednostki, które mogą wystąpić tylko wewnątrz artykułu / paragrafu (inaczej to zwykły tekst)
+NESTED_TYPES = ('paragraph', 'point', 'letter')
+
+LINE_PATTERNS = [
+    ('print', re.compile(r'=== DRUK NR (\S+) ===')),
+    ('justification', re.compile(r'U\s?Z\s?A\s?S\s?A\s?D\s?N\s?I\s?E\s?N\s?I\s?E\b')),
+    ('annex', re.compile(r'(?:Załącznik|ZAŁĄCZNIK)(?:\s+(?:nr|Nr|NR)\s*(\d+[a-z]?))?\b')),
+    ('division', re.compile(r'DZIAŁ\s+([IVXLC]+[a-z]?|\d+[a-z]?)\b')),
+    ('chapter', re.compile(r'Rozdział\s+([IVXLC]+[a-z]?|\d+[a-z]?)\b')),
+    # Kropka po numerze odróżnia nagłówek artykułu od odwołania ("Art. 5 ust. 2" w uzasadnieniu)
+    ('article', re.compile(r'Art\.\s{0,3}(\d{1,4}[a-z]{0,3})\.(?=\s|$)')),
+    ('section', re.compile(r'§\s{0,3}(\d{1,4}[a-z]{0,3})\.(?=\s|$)')),
+    ('paragraph', re.compile(r'(\d{1,3}[a-z]{0,2})\.\s')),
+    ('point', re.compile(r'(\d{1,3}[a-z]{0,2})\)\s')),
+    ('letter', re.compile(r'([a-z]{1,2})\)\s')),
+]
+
+# Nagłówek druku w tekście złożonym z kilku druków i separator druków
+PRINT_HEADER = '=== DRUK NR {number} ===\n'
+PRINT_SEPARATOR = '\n\n'
+
+LABEL_PREFIXES = {
+    'print': 'Druk nr ',
+    'justification': 'Uzasadnienie',
+    'annex': 'Załącznik ',
+    'division': 'Dział ',
+    'chapter': 'Rozdział ',
+    'article': 'Art. ',
+    'section': '§ ',
+    'paragraph': 'ust. ',
+    'point': 'pkt ',
+    'letter': 'lit. ',
+}
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _match_line(line, inside_unit):
+    stripped = line.lstrip()
+    for unit_type, pattern in LINE_PATTERNS:
+        if unit_type in NESTED_TYPES and not inside_unit:
+            continue
+        match = pattern.match(stripped)
+        if match:
+            return unit_type, (match.group(1) or '') if match.groups() else ''
+    return None, None
+
+
+def segment_text(text):
+    """
+    Dzieli tekst na drzewo jednostek w jednym przejściu
+
+    Returns:
+        dict: Struktura z polem nodes (lista węzłów z type, label, start, end, children)
+    """
+    root = {'children': []}
+    stack = []
+    offset = 0
+
+    for line in text.splitlines(keepends=True):
+        inside_unit = any(node['type'] in ('article', 'section') for node in stack)
+        unit_type, label = _match_line(line, inside_unit)
+        if unit_type:
+            level = LEVELS[unit_type]
+            while stack and LEVELS[stack[-1]['type']] >= level:
+                stack.pop()['end'] = offset
+            start = offset + len(line) - len(line.lstrip())
+            node = {'type': unit_type, 'label': label, 'start': start, 'end': None, 'children': []}
+            (stack[-1] if stack else root)['children'].append(node)
+            stack.append(node)
+        offset += len(line)
+
+    while stack:
+        stack.pop()['end'] = offset
+
+    return {
+        'version': STRUCTURE_VERSION,
+        'text_hash': text_hash(text),
+        'length': len(text),
+        'nodes': root['children'],
+    }
+
+
+def is_current(structure, text):
+    """Czy zapisana struktura odpowiada tekstowi (wersja parsera i hash treści)"""
+    return (
+        bool(structure)
+        and structure.get('version') == STRUCTURE_VERSION
+        and structure.get('text_hash') == text_hash(text)
+    )
+
+
+def ensure_structure(obj, text_field='text', save=True):
+    """
+    Zwraca aktualną strukturę tekstu obiektu (Print / Bill), parsując go tylko po zmianie
+
+    Args:
+        obj: Obiekt z polem structure i polem tekstu
+        text_field: Nazwa pola z tekstem ('text' dla Print, 'full_text' dla Bill)
+    """
+    text = getattr(obj, text_field) or ''
+    if is_current(obj.structure, text):
+        return obj.structure
+    obj.structure = segment_text(text)
+    if save and obj.pk:
+        obj.save(update_fields=['structure'])
+    return obj.structure
+
+
+def _shift_nodes(nodes, offset, end=None, new_end=None):
+    """Kopia węzłów przesunięta o offset; węzły kończące się na end kończą się na new_end"""
+    shifted = []
+    for node in nodes:
+        node_end = node['end'] + offset
+        if end is not None and node_end == end:
+            node_end = new_end
+        shifted.append(dict(
+            node, start=node['start'] + offset, end=node_end,
+            children=_shift_nodes(node['children'], offset, end, new_end),
+        ))
+    return shifted
+
+
+def join_prints(prints):
+    """
+    Łączy teksty druków nagłówkami "=== DRUK NR ... ===" i składa strukturę całości
+
+    Struktura złożona jest z zapisanych struktur druków (Print.structure)
+    przesuniętych o pozycję druku - jest taka sama jak wynik segment_text()
+    dla połączonego tekstu, ale parsowane są tylko druki bez aktualnej struktury.
+
+    Args:
+        prints: Lista (numer druku, tekst, zapisana struktura albo None)
+
+    Returns:
+        tuple: (połączony tekst, struktura)
+    """
+    parts = []
+    sections = []
+    offset = 0
+    for number, text, structure in prints:
+        if not is_current(structure, text):
+            structure = segment_text(text)
+        if parts:
+            offset += len(PRINT_SEPARATOR)
+        header = PRINT_HEADER.format(number=number)
+        sections.append((number, offset, offset + len(header), len(text), structure['nodes']))
+        parts.append(header + text)
+        offset += len(header) + len(text)
+    combined = PRINT_SEPARATOR.join(parts)
+
+    nodes = []
+    for index, (number, start, text_start, length, print_nodes) in enumerate(sections):
+        # Jak w segment_text: jednostki otwarte na końcu druku sięgają do nagłówka następnego
+        end = sections[index + 1][1] if index + 1 < len(sections) else len(combined)
+        shifted = _shift_nodes(print_nodes, text_start, text_start + length, end)
+        # Nagłówek druku wewnątrz tekstu zamyka jednostkę druku - kolejne są jej rodzeństwem
+        inner = next((i for i, node in enumerate(shifted) if node['type'] == 'print'), len(shifted))
+        nodes.append({
+            'type': 'print', 'label': str(number), 'start': start,
+            'end': shifted[inner]['start'] if inner < len(shifted) else end,
+            'children': shifted[:inner],
+        })
+        nodes.extend(shifted[inner:])
+    return combined, {
+        'version': STRUCTURE_VERSION,
+        'text_hash': text_hash(combined),
+        'length': len(combined),
+        'nodes': nodes,
+    }
+
+
+def iter_nodes(nodes, depth=0):
+    """Przechodzi drzewo w kolejności tekstu, zwracając (węzeł, głębokość)"""
+    for node in nodes:
+        yield node, depth
+        yield from iter_nodes(node['children'], depth + 1)
+
+
+def unit_starts(structure, max_level=LEVELS['article']):
+    """Początki jednostek do poziomu artykułu włącznie - granice fragmentów tekstu"""
+    return sorted({
+        node['start'] for node, _ in iter_nodes(structure['nodes'])
+        if LEVELS[node['type']] <= max_level
+    })
+
+
+def node_label(node):
+    return f"{LABEL_PREFIXES[node['type']]}{node['label']}".strip()
+
+
+def locate(structure, offset):
+    """
+    Ścieżka jednostek zawierających pozycję w tekście, np. ['Art. 5', 'ust. 2', 'pkt 3']
+
+    Do podświetlania wyników wyszukiwania i cytowania fragmentów.
+    """
+    path = []
+    nodes = structure['nodes']
+    while nodes:
+        containing = next((node for node in nodes if node['start'] <= offset < node['end']), None)
+        if containing is None:
+            break
+        path.append(node_label(containing))
+        nodes = containing['children']
+    return path
+
+
+def article_texts(structure, text, with_print=True):
+    """
+    Tekst każdego artykułu / paragrafu projektu: {'Druk nr 12 / Art. 5': tekst}
+
+    Pomija uzasadnienie i załączniki. Powtórzone oznaczenie (np. artykuł
+    cytowany w przepisie zmieniającym albo ten sam artykuł w kolejnym
+    druku przy with_print=False) dostaje kolejny numer wystąpienia.
+    """
+    articles = {}
+
+    def walk(nodes, print_label):
+        for node in nodes:
+            if node['type'] in ('justification', 'annex'):
+                continue
+            if node['type'] == 'print':
+                walk(node['children'], node_label(node) if with_print else '')
+            elif node['type'] in ('article', 'section'):
+                key = ' / '.join(part for part in (print_label, node_label(node)) if part)
+                occurrence = 2
+                unique_key = key
+                while unique_key in articles:
+                    unique_key = f"{key} #{occurrence}"
+                    occurrence += 1
+                articles[unique_key] = text[node['start']:node['end']]
+            else:
+                walk(node['children'], print_label)
+
+    walk(structure['nodes'], '')
+    return articles
@@ -0,0 +1,233 @@
+"""
+Współdzielony klient OpenAI i limiter zapytań
+
+Jeden klient (z pulą połączeń HTTP) na proces zamiast nowego klienta dla
+każdej instancji AIAnalysisService. Limiter pilnuje limitów konta OpenAI -
+zapytań i tokenów na minutę - także gdy analizy działają równolegle
+w wielu wątkach.
+
+Odpowiedzi można buforować w bazie (LLMResponseCache) pod kluczem będącym
+hashem modelu, wersji szablonu promptu i treści wiadomości - powtórna
+analiza identycznego wejścia nie wywołuje API.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+
+import httpx
+import openai
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+import logging
+
+from .models import LLMResponseCache
+from .telemetry import count, stage
+
+logger = logging.getLogger(__name__)
+
+# Przybliżenie liczby tokenów dla tekstu polskiego (bez tokenizera)
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text):
+    """Szacunkowa liczba tokenów tekstu"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class RateLimiter:
+    """
+    Limiter zapytań i tokenów w oknie przesuwnym 60 s (bezpieczny wątkowo)
+
+    acquire() blokuje do chwili, gdy kolejne zapytanie o podanej liczbie
+    tokenów zmieści się w obu limitach. Po odpowiedzi można skorygować
+    szacunek o faktyczne zużycie (adjust).
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = deque()
+        self._token_entries = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _expire(self, now):
+        while self._requests and now - self._requests[0] >= self.WINDOW:
+            self._requests.popleft()
+        while self._token_entries and now - self._token_entries[0][0] >= self.WINDOW:
+            _, tokens = self._token_entries.popleft()
+            self._tokens -= tokens
+
+    def acquire(self, tokens):
+        # Pojedyncze zapytanie większe niż limit i tak musi przejść
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                if len(self._requests) < self.rpm and self._tokens + tokens <= self.tpm:
+                    self._requests.append(now)
+                    self._token_entries.append((now, tokens))
+                    self._tokens += tokens
+                    return
+                # Czekaj do wygaśnięcia najstarszego wpisu w oknie
+                starts = []
+                if self._requests:
+                    starts.append(self._requests[0])
+                if self._token_entries:
+                    starts.append(self._token_entries[0][0])
+                wait = self.WINDOW - (now - min(starts)) if starts else 0.1
+            wait = max(wait, 0.05)
+            self.waited += wait
+            time.sleep(wait)
+
+    def adjust(self, tokens):
+        """Dolicza różnicę między faktycznym a szacowanym zużyciem tokenów"""
+        with self._lock:
+            self._token_entries.append((time.monotonic(), tokens))
+            self._tokens += tokens
+
+
+_client = None
+_limiter = None
+_init_lock = threading.Lock()
+
+
+def get_openai_client():
+    """Zwraca współdzielony klient OpenAI"""
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                limits = httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+                )
+                _client = openai.OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL or None,
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    timeout=60.0,
+                    http_client=httpx.Client(limits=limits, timeout=60.0)
+                )
+    return _client
+
+
+def get_rate_limiter():
+    """Zwraca współdzielony limiter zapytań do OpenAI"""
+    global _limiter
+    if _limiter is None:
+        with _init_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(settings.OPENAI_RPM_LIMIT, settings.OPENAI_TPM_LIMIT)
+    return _limiter
+
+
+def reset_openai_client():
+    """
+    Zamyka współdzielony klient i limiter - kolejne wywołanie utworzy je od nowa
+    z bieżących ustawień (np. po podmianie OPENAI_BASE_URL w benchmarku)
+    """
+    global _client, _limiter
+    with _init_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _limiter = None
+
+
+def chat_completion(messages, max_tokens, temperature=0.7, model=None):
+    """
+    Wywołanie chat.completions przez współdzielony klient z limiterem
+
+    Returns:
+        tuple: (treść odpowiedzi, liczba zużytych tokenów)
+    """
+    limiter = get_rate_limiter()
+    estimated = sum(estimate_tokens(message['content']) for message in messages) + max_tokens
+    with stage('rate_limit'):
+        limiter.acquire(estimated)
+
+    with stage('llm'):
+        response = get_openai_client().chat.completions.create(
+            model=model or settings.OPENAI_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+    used = response.usage.total_tokens if response.usage else estimated
+    if used != estimated:
+        limiter.adjust(used - estimated)
+
+    count('llm_calls')
+    if response.usage:
+        count('prompt_tokens', response.usage.prompt_tokens)
+        count('completion_tokens', response.usage.completion_tokens)
+    return response.choices[0].message.content, used
+
+
+def response_cache_key(messages, max_tokens, template_version, temperature, model):
+    """Klucz cache: SHA-256 modelu, wersji szablonu, parametrów i wiadomości"""
+    payload = json.dumps(
+        [model, template_version, max_tokens, temperature, messages],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cached_chat_completion(messages, max_tokens, template_version, temperature=0.7, model=None, use_cache=True):
+    """
+    chat_completion z cache odpowiedzi w bazie
+
+    Zmiana wersji szablonu (template_version) lub treści wejścia daje nowy
+    klucz, więc unieważniane są tylko odpowiedzi, których zmiana dotyczy.
+
+    Returns:
+        tuple: (treść odpowiedzi, liczba zużytych tokenów, czy z cache)
+    """
+    model = model or settings.OPENAI_MODEL
+    key = response_cache_key(messages, max_tokens, template_version, temperature, model)
+
+    if use_cache:
+        cached = LLMResponseCache.objects.filter(key=key).only('id', 'response').first()
+        if cached is not None:
+            LLMResponseCache.objects.filter(id=cached.id).update(hits=F('hits') + 1, last_hit_at=timezone.now())
+            count('cache_hits')
+            return cached.response, 0, True
+
+    content, used = chat_completion(messages, max_tokens, temperature=temperature, model=model)
+    entries = LLMResponseCache.objects.filter(key=key)
+    fields = {'model': model, 'template_version': template_version, 'response': content, 'tokens': used}
+    if not entries.update(misses=F('misses') + 1, **fields):
+        try:
+            LLMResponseCache.objects.create(key=key, misses=1, **fields)
+        except IntegrityError:
+            # Równoległe wywołanie z tym samym kluczem zdążyło zapisać odpowiedź
+            entries.update(misses=F('misses') + 1)
+    return content, used, False
+
+
+def llm_cache_stats():
+    """Statystyki cache odpowiedzi: wpisy, trafienia, chybienia (wywołania API) i zaoszczędzone tokeny"""
+    totals = LLMResponseCache.objects.aggregate(
+        entries=Count('id'),
+        total_hits=Sum('hits'),
+        total_misses=Sum('misses'),
+        tokens_saved=Sum(F('hits') * F('tokens'))
+    )
+    hits = totals['total_hits'] or 0
+    misses = totals['total_misses'] or 0
+    return {
+        'entries': totals['entries'],
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        'tokens_saved': totals['tokens_saved'] or 0,
+    }
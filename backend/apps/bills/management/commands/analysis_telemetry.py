@@ -0,0 +1,114 @@
+"""
+Raport telemetrii analizy AI: percentyle czasów etapów, tokenów i kosztu przebiegów
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.bills.models import AnalysisRun
+from apps.bills.telemetry import STAGES
+
+PERCENTILES = (50, 90, 99)
+COUNTERS = ('pages_ocr', 'chars_in', 'chars_out', 'llm_calls', 'prompt_tokens', 'completion_tokens')
+
+
+class Command(BaseCommand):
+    help = 'Percentyle czasu etapów, tokenów i kosztu przebiegów analizy AI oraz najwolniejsze i najdroższe projekty'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Okres raportu w dniach (domyślnie 30)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['full', 'incremental', 'unchanged'],
+            help='Tylko przebiegi w danym trybie'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=5,
+            help='Liczba najwolniejszych i najdroższych przebiegów (domyślnie 5)'
+        )
+
+    def handle(self, *args, **options):
+        runs = AnalysisRun.objects.filter(
+            created_at__gte=timezone.now() - timedelta(days=options['days'])
+        ).select_related('bill')
+        if options['mode']:
+            runs = runs.filter(mode=options['mode'])
+        runs = list(runs)
+        if not runs:
+            self.stdout.write(self.style.WARNING('Brak przebiegów analizy AI w wybranym okresie'))
+            return
+
+        errors = sum(1 for run in runs if run.status == 'error')
+        llm_calls = sum(run.llm_calls for run in runs)
+        cache_hits = sum(run.cache_hits for run in runs)
+        total_cost = sum(run.cost_usd for run in runs)
+        self.stdout.write(f'\n=== PRZEBIEGI ANALIZY AI (ostatnie {options["days"]} dni) ===')
+        self.stdout.write(f'Przebiegi: {len(runs)}, błędy: {errors}')
+        self.stdout.write(
+            f'Zapytania do modelu: {llm_calls}, trafienia cache: {cache_hits} '
+            f'({cache_hits / max(llm_calls + cache_hits, 1):.0%})'
+        )
+        self.stdout.write(
+            f'Tokeny: {sum(run.total_tokens for run in runs)}, koszt: {total_cost:.4f} USD '
+            f'(średnio {total_cost / len(runs):.4f} USD na przebieg)'
+        )
+
+        self.write_percentiles(runs)
+        self.write_stage_shares(runs)
+        self.write_modes(runs)
+        self.write_top(runs, 'NAJWOLNIEJSZE', lambda run: run.total_seconds, options['top'])
+        self.write_top(runs, 'NAJDROŻSZE', lambda run: run.cost_usd, options['top'])
+
+    def write_percentiles(self, runs):
+        header = ''.join(f'p{p:<11}' for p in PERCENTILES)
+        self.stdout.write(f'\n{"Metryka":<20} {header}{"max":<12}')
+
+        rows = [('czas [s]', [run.total_seconds for run in runs])]
+        rows += [(f'  {stage}', [run.stages.get(stage, 0.0) for run in runs]) for stage in STAGES]
+        rows += [(counter, [getattr(run, counter) for run in runs]) for counter in COUNTERS]
+        rows.append(('koszt [USD]', [float(run.cost_usd) for run in runs]))
+
+        for name, values in rows:
+            values = np.asarray(values, dtype=float)
+            if not values.any():
+                continue
+            cells = ''.join(f'{value:<12.4g}' for value in np.percentile(values, PERCENTILES))
+            self.stdout.write(f'{name:<20} {cells}{values.max():<12.4g}')
+
+    def write_stage_shares(self, runs):
+        """Udział etapów w łącznym czasie wszystkich przebiegów"""
+        totals = {stage: sum(run.stages.get(stage, 0.0) for run in runs) for stage in STAGES}
+        total = sum(totals.values())
+        if not total:
+            return
+        self.stdout.write('\nUdział etapów w czasie: ' + ', '.join(
+            f'{stage} {seconds / total:.0%}' for stage, seconds in sorted(totals.items(), key=lambda item: -item[1])
+            if seconds
+        ))
+
+    def write_modes(self, runs):
+        self.stdout.write(f'\n{"Tryb":<14} {"Przebiegi":<10} {"p50 czas [s]":<14} {"Śr. koszt [USD]":<16}')
+        modes = sorted({run.mode for run in runs})
+        for mode in modes:
+            selected = [run for run in runs if run.mode == mode]
+            median = np.percentile([run.total_seconds for run in selected], 50)
+            mean_cost = sum(run.cost_usd for run in selected) / len(selected)
+            self.stdout.write(f'{mode or "-":<14} {len(selected):<10} {median:<14.2f} {mean_cost:<16.4f}')
+
+    def write_top(self, runs, name, key, limit):
+        self.stdout.write(f'\n=== {name} ===')
+        for run in sorted(runs, key=key, reverse=True)[:limit]:
+            slowest_stage = max(run.stages.items(), key=lambda item: item[1], default=('-', 0))
+            self.stdout.write(
+                f'{run.bill.number:<12} {run.total_seconds:>8.2f} s {run.cost_usd:>10.4f} USD  '
+                f'{run.mode or run.status:<12} najdłużej: {slowest_stage[0]} ({slowest_stage[1]:.2f} s)  '
+                f'{run.bill.title[:50]}'
+            )
@@ -0,0 +1,38 @@
+"""
+Odtwarza tabelę głosów posłów z wyników klubów zapisanych w głosowaniach
+"""
+from django.core.management.base import BaseCommand
+from apps.bills.deputy_votes import deputies_from_club_results, save_deputy_votes
+from apps.bills.models import Bill
+
+
+class Command(BaseCommand):
+    help = 'Zapisuje głosy posłów (DeputyVote) na podstawie club_results istniejących głosowań'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Nadpisz głosy także dla głosowań, które już je mają'
+        )
+
+    def handle(self, *args, **options):
+        bills = Bill.objects.exclude(club_results__isnull=True)
+        if not options['force']:
+            bills = bills.filter(deputy_votes__isnull=True)
+
+        # Od najstarszych - klub posła to klub z ostatniego głosowania
+        bills = bills.order_by('voting_date', 'voting_number').distinct()
+
+        bill_count = 0
+        vote_count = 0
+        for bill in bills.iterator():
+            deputies = deputies_from_club_results(bill.club_results)
+            if not deputies:
+                continue
+            vote_count += save_deputy_votes(bill, deputies)
+            bill_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Zapisano {vote_count} głosów posłów w {bill_count} głosowaniach'
+        ))
@@ -0,0 +1,160 @@
+"""
+Benchmark offline warstwy zapytań do modelu: współbieżność, ponawianie i cache odpowiedzi
+
+Komenda uruchamia w tle serwer stub zgodny z API OpenAI (apps.bills.openai_stub)
+i kieruje do niego współdzielony klient z apps.bills.llm, więc mierzony jest
+ten sam kod co w analizie (limiter, ponawianie 429/500, cache w bazie) bez
+klucza i bez sieci.
+"""
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from apps.bills.llm import cached_chat_completion, reset_openai_client
+from apps.bills.models import LLMResponseCache
+from apps.bills.openai_stub import start_stub_server
+from apps.bills.telemetry import RunTelemetry, bind
+
+
+class Command(BaseCommand):
+    help = 'Mierzy przepustowość, ponawianie i cache zapytań do modelu na lokalnym serwerze stub (offline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Liczba różnych zapytań w przebiegu (domyślnie 50)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Liczba równoległych wątków (domyślnie 8)'
+        )
+        parser.add_argument(
+            '--passes',
+            type=int,
+            default=2,
+            help='Liczba przebiegów tych samych zapytań - kolejne trafiają w cache (domyślnie 2)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Wyłącz cache odpowiedzi (każdy przebieg wywołuje API)'
+        )
+        parser.add_argument(
+            '--max-retries',
+            type=int,
+            default=settings.OPENAI_MAX_RETRIES,
+            help=f'Liczba ponowień klienta OpenAI (domyślnie {settings.OPENAI_MAX_RETRIES})'
+        )
+        parser.add_argument(
+            '--client-rpm',
+            type=int,
+            default=settings.OPENAI_RPM_LIMIT,
+            help=f'Limit zapytań na minutę limitera klienta (domyślnie {settings.OPENAI_RPM_LIMIT})'
+        )
+        parser.add_argument('--latency', type=float, default=0.2, help='Opóźnienie stubu w sekundach (domyślnie 0.2)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Losowe dodatkowe opóźnienie 0..jitter sekund')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Odsetek odpowiedzi 500 stubu (0-1)')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Odsetek losowych odpowiedzi 429 (0-1)')
+        parser.add_argument(
+            '--rpm',
+            type=int,
+            default=0,
+            help='Limit zapytań na minutę stubu - nadmiarowe dostają 429 (0 = bez limitu)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Ziarno generatora losowego stubu (domyślnie 0)')
+
+    def handle(self, *args, **options):
+        # Logi każdego zapytania HTTP zasłaniałyby tabelę wyników
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+        server, base_url = start_stub_server(
+            port=0,
+            model=settings.OPENAI_MODEL,
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            rpm=options['rpm'],
+            seed=options['seed'],
+        )
+        # Osobna wersja szablonu - wpisy cache benchmarku nie mieszają się z analizami
+        template_version = f'benchmark-{uuid.uuid4().hex[:8]}'
+        overrides = {
+            'OPENAI_BASE_URL': base_url,
+            'OPENAI_API_KEY': 'stub',
+            'OPENAI_MAX_RETRIES': options['max_retries'],
+            'OPENAI_RPM_LIMIT': options['client_rpm'],
+            'OPENAI_MAX_CONNECTIONS': max(options['concurrency'], 1),
+        }
+        self.stdout.write(f'Serwer stub: {base_url}')
+        self.stdout.write(
+            '\nPrzebieg  Czas [s]  Zapytania/min  Cache  API  Zapytania stubu  Ponowienia  429  500  Nieudane'
+        )
+
+        reset_openai_client()
+        try:
+            with override_settings(**overrides):
+                for number in range(1, options['passes'] + 1):
+                    self.run_pass(number, server, template_version, options)
+        finally:
+            reset_openai_client()
+            server.shutdown()
+            server.server_close()
+            LLMResponseCache.objects.filter(template_version=template_version).delete()
+
+    def run_pass(self, number, server, template_version, options):
+        """Jeden przebieg wszystkich zapytań w puli wątków"""
+        before = server.stats.snapshot()
+        telemetry = RunTelemetry()
+        results = {'cached': 0, 'api': 0, 'failed': 0}
+
+        with telemetry.activate():
+            call = bind(self.call)
+            with ThreadPoolExecutor(options['concurrency'], thread_name_prefix='benchmark') as pool:
+                outcomes = pool.map(
+                    lambda index: call(index, template_version, not options['no_cache']),
+                    range(options['requests'])
+                )
+                for outcome in outcomes:
+                    results[outcome] += 1
+
+        after = server.stats.snapshot()
+        stub = {key: after[key] - before[key] for key in after}
+        # Każde zapytanie stubu ponad liczbę wywołań API to ponowienie klienta
+        retries = stub['requests'] - results['api'] - results['failed']
+        elapsed = telemetry.wall_time
+        self.stdout.write(
+            f'{number:<9} {elapsed:<9.2f} {options["requests"] / max(elapsed / 60, 1e-9):<14.0f} '
+            f'{results["cached"]:<6} {results["api"]:<4} {stub["requests"]:<16} {max(retries, 0):<11} '
+            f'{stub["rate_limited"]:<4} {stub["errors"]:<4} {results["failed"]}'
+        )
+        stages = telemetry.stage_times()
+        self.stdout.write(
+            f'          czas oczekiwania na limiter: {stages.get("rate_limit", 0.0):.2f} s, '
+            f'na model: {stages.get("llm", 0.0):.2f} s (suma wątków)'
+        )
+
+    def call(self, index, template_version, use_cache):
+        """Jedno zapytanie przez cached_chat_completion - zwraca 'cached', 'api' albo 'failed'"""
+        messages = [{
+            'role': 'user',
+            'content': f'Przeanalizuj projekt ustawy "Projekt testowy {index}" i wskaż jego dobre strony oraz zagrożenia.'
+        }]
+        try:
+            _, _, cached = cached_chat_completion(
+                messages, 200, template_version, temperature=0.0, use_cache=use_cache
+            )
+            return 'cached' if cached else 'api'
+        except Exception as e:
+            self.stderr.write(f'Zapytanie {index}: {e}')
+            return 'failed'
+        finally:
+            connection.close()
@@ -0,0 +1,143 @@
+"""
+Benchmark pamięci przy wyciąganiu tekstu z bardzo długich PDF-ów
+
+Generuje syntetyczny PDF (domyślnie 1000 stron) i porównuje zużycie pamięci:
+- naive: klasyczna pętla po pdf.pages (strony i ich cache żyją do końca)
+- stream: iter_page_texts (cache strony zwalniany po jej przetworzeniu)
+
+Każdy tryb uruchamiany jest w osobnym procesie, żeby szczytowe RSS było
+mierzone niezależnie.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def write_synthetic_pdf(path, pages, lines_per_page=45):
+    """Zapisuje prosty tekstowy PDF o zadanej liczbie stron"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # drzewo stron uzupełniane na końcu
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page_number in range(pages):
+        lines = [b"BT /F1 10 Tf 40 800 Td 12 TL"]
+        for line_number in range(lines_per_page):
+            lines.append(
+                f"(Art. {page_number * lines_per_page + line_number}. Ustawa o zmianie ustawy - "
+                f"strona {page_number + 1}, wiersz {line_number + 1}.) '".encode('ascii')
+            )
+        lines.append(b"ET")
+        stream = b"\n".join(lines)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    with open(path, 'wb') as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+
+
+def current_rss_mb():
+    """Aktualne RSS procesu (Linux)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_mode(mode, pdf_path, sample_every):
+    """Przetwarza PDF w danym trybie i wypisuje próbki RSS"""
+    import pdfplumber
+    from apps.bills.text_extraction import iter_page_texts
+
+    def naive_pages():
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_number, page in enumerate(pdf.pages):
+                yield page_number, page.extract_text() or ''
+
+    pages = iter_page_texts(pdf_path) if mode == 'stream' else naive_pages()
+    start = time.perf_counter()
+    chars = 0
+    samples = []
+    for page_number, text in pages:
+        chars += len(text)
+        if (page_number + 1) % sample_every == 0:
+            samples.append(f"{page_number + 1}:{current_rss_mb():.0f}")
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode}|{elapsed:.1f}|{chars}|{peak_mb:.0f}|{' '.join(samples)}")
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pamięci wyciągania tekstu z długich PDF-ów (syntetyczny dokument)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=1000,
+            help='Liczba stron syntetycznego PDF-a (domyślnie 1000)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['naive', 'stream'],
+            help='Uruchom tylko jeden tryb w bieżącym procesie'
+        )
+        parser.add_argument(
+            '--pdf',
+            type=str,
+            help='Użyj istniejącego pliku PDF zamiast generować syntetyczny'
+        )
+
+    def handle(self, *args, **options):
+        pages = options['pages']
+        sample_every = max(pages // 10, 1)
+
+        if options['mode']:
+            # Tryb pojedynczy uruchamiany jest przez proces nadrzędny z wygenerowanym plikiem
+            if not options['pdf']:
+                raise CommandError('--mode wymaga --pdf (ścieżki do pliku PDF)')
+            run_mode(options['mode'], options['pdf'], sample_every)
+            return
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = options['pdf']
+            if not pdf_path:
+                pdf_path = os.path.join(tmp_dir, 'synthetic.pdf')
+                write_synthetic_pdf(pdf_path, pages)
+                self.stdout.write(f'Wygenerowano PDF: {pages} stron, {os.path.getsize(pdf_path) / 1024 / 1024:.1f} MB')
+
+            for mode in ('naive', 'stream'):
+                result = subprocess.run(
+                    [sys.executable, sys.argv[0], 'benchmark_pdf_memory', '--mode', mode,
+                     '--pdf', pdf_path, '--pages', str(pages)],
+                    capture_output=True, text=True, check=True
+                )
+                line = result.stdout.strip().splitlines()[-1]
+                _, elapsed, chars, peak_mb, samples = line.split('|')
+                self.stdout.write(f'\n=== {mode} ===')
+                self.stdout.write(f'Czas: {elapsed} s, znaków: {chars}, szczytowe RSS: {peak_mb} MB')
+                self.stdout.write(f'RSS po stronach (strona:MB): {samples}')
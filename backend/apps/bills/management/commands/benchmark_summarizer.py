@@ -0,0 +1,125 @@
+"""
+Benchmark lokalnego streszczenia ekstrakcyjnego na tekstach druków
+"""
+import re
+import time
+
+from django.core.management.base import BaseCommand
+from apps.bills.llm import estimate_tokens
+from apps.bills.models import Print
+from apps.bills.prints import DEFAULT_TERM, get_print_text
+from apps.bills.services import AIAnalysisService
+from apps.bills.summarizer import KEY_PHRASES, split_sentences, summarize_text
+
+ARTICLE_NUMBER = re.compile(r'(?m)^\s*Art\.\s*(\d+[a-z]*)')
+
+
+class Command(BaseCommand):
+    help = 'Mierzy redukcję tokenów, czas i pokrycie streszczenia ekstrakcyjnego na tekstach druków'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--print',
+            action='append',
+            dest='prints',
+            help='Numer druku (można podać kilka razy); domyślnie druki z pełnym tekstem w bazie'
+        )
+        parser.add_argument(
+            '--term',
+            type=int,
+            default=DEFAULT_TERM,
+            help=f'Kadencja Sejmu (domyślnie {DEFAULT_TERM})'
+        )
+        parser.add_argument(
+            '--fetch',
+            action='store_true',
+            help='Pobierz brakujące druki z API Sejmu'
+        )
+        parser.add_argument(
+            '--file',
+            action='append',
+            dest='files',
+            help='Plik tekstowy do streszczenia (np. wyeksportowany tekst druku)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Liczba druków z bazy, gdy nie podano numerów (domyślnie 10)'
+        )
+        parser.add_argument(
+            '--budget',
+            type=int,
+            help='Docelowa długość tekstu w znakach (domyślnie budżet jednego zapytania analizy); '
+                 'krótsze teksty nie są skracane'
+        )
+
+    def handle(self, *args, **options):
+        texts = self.load_texts(options)
+        if not texts:
+            self.stdout.write(self.style.WARNING('Brak tekstów druków - użyj --print z --fetch albo --file'))
+            return
+
+        self.stdout.write(
+            '\nDruk         Tokeny przed  Tokeny po  Redukcja  Czas [ms]  Artykuły  Kluczowe zdania'
+        )
+        target_length = options['budget'] or AIAnalysisService.analysis_text_budget()
+        self.stdout.write(f'Budżet: {target_length} znaków')
+        totals = {'before': 0, 'after': 0, 'time': 0.0}
+        for name, text in texts:
+            start = time.perf_counter()
+            summary = summarize_text(text, target_length) if len(text) > target_length else text
+            elapsed = time.perf_counter() - start
+
+            before = estimate_tokens(text)
+            after = estimate_tokens(summary)
+            totals['before'] += before
+            totals['after'] += after
+            totals['time'] += elapsed
+            self.stdout.write(
+                f'{name:<12} {before:<13} {after:<10} {1 - after / before:<9.0%} {elapsed * 1000:<10.1f} '
+                f'{self.article_coverage(text, summary):<9} {self.key_sentence_coverage(text, summary)}'
+            )
+
+        self.stdout.write(f'\n=== PODSUMOWANIE ({len(texts)} tekstów) ===')
+        self.stdout.write(
+            f'Tokeny: {totals["before"]} -> {totals["after"]} '
+            f'({1 - totals["after"] / max(totals["before"], 1):.0%} mniej)'
+        )
+        self.stdout.write(f'Łączny czas streszczania: {totals["time"] * 1000:.0f} ms')
+
+    def load_texts(self, options):
+        texts = []
+        for path in options['files'] or []:
+            with open(path, encoding='utf-8') as f:
+                texts.append((path[-12:], f.read()))
+
+        if options['prints']:
+            for number in options['prints']:
+                text = get_print_text(number, term=options['term'], fetch=options['fetch'])
+                if text:
+                    texts.append((f'druk {number}', text))
+                else:
+                    self.stdout.write(self.style.WARNING(f'Brak tekstu druku {number}'))
+        elif not texts:
+            prints = Print.objects.filter(
+                term=options['term'], exists=True, text_budget__isnull=True
+            ).exclude(text='').order_by('-text_extracted_at')[:options['limit']]
+            texts = [(f'druk {print_obj.number}', print_obj.text) for print_obj in prints]
+        return texts
+
+    def article_coverage(self, text, summary):
+        """Odsetek artykułów oryginału, których pierwsze zdanie (Art. N) trafiło do streszczenia"""
+        articles = set(ARTICLE_NUMBER.findall(text))
+        if not articles:
+            return '-'
+        kept = set(ARTICLE_NUMBER.findall(summary))
+        return f'{len(kept & articles) / len(articles):.0%}'
+
+    def key_sentence_coverage(self, text, summary):
+        """Odsetek zdań z kluczowymi frazami (wejście w życie, zmiany, kary...) zachowanych w streszczeniu"""
+        key_sentences = [sentence for sentence in split_sentences(text) if KEY_PHRASES.search(sentence)]
+        if not key_sentences:
+            return '-'
+        kept = sum(1 for sentence in key_sentences if sentence in summary)
+        return f'{kept / len(key_sentences):.0%}'
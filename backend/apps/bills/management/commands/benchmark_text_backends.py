@@ -0,0 +1,64 @@
+"""
+Benchmark backendów wyciągania tekstu z PDF-ów (strony na sekundę)
+"""
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from apps.bills.text_extraction import BACKENDS, is_backend_available, iter_page_texts
+
+from .benchmark_pdf_memory import write_synthetic_pdf
+
+
+class Command(BaseCommand):
+    help = 'Porównuje szybkość backendów ekstrakcji tekstu (pdfplumber, poppler, pdfium)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages',
+            type=int,
+            default=200,
+            help='Liczba stron syntetycznego PDF-a (domyślnie 200)'
+        )
+        parser.add_argument(
+            '--pdf',
+            type=str,
+            help='Użyj istniejącego pliku PDF (np. prawdziwego druku) zamiast syntetycznego'
+        )
+        parser.add_argument(
+            '--backend',
+            action='append',
+            choices=list(BACKENDS),
+            help='Testuj tylko wybrane backendy (można podać kilka razy)'
+        )
+
+    def handle(self, *args, **options):
+        backends = options['backend'] or list(BACKENDS)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = options['pdf']
+            if not pdf_path:
+                pdf_path = os.path.join(tmp_dir, 'synthetic.pdf')
+                write_synthetic_pdf(pdf_path, options['pages'])
+                self.stdout.write(f'Wygenerowano PDF: {options["pages"]} stron')
+
+            results = []
+            for backend in backends:
+                if not is_backend_available(backend):
+                    self.stdout.write(self.style.WARNING(f'{backend}: niedostępny - pomijam'))
+                    continue
+
+                start = time.perf_counter()
+                pages = chars = 0
+                for _, text in iter_page_texts(pdf_path, backend):
+                    pages += 1
+                    chars += len(text)
+                elapsed = time.perf_counter() - start
+                results.append((backend, pages, chars, elapsed))
+
+        self.stdout.write('\nBackend      Stron   Znaków      Czas [s]   Stron/s')
+        for backend, pages, chars, elapsed in results:
+            self.stdout.write(
+                f'{backend:<12} {pages:<7} {chars:<11} {elapsed:<10.2f} {pages / elapsed if elapsed else 0:.1f}'
+            )
@@ -0,0 +1,40 @@
+"""
+Buduje macierz głosów posłów (int8, mmap) z tabeli DeputyVote
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.bills.vote_matrix import build_vote_matrix, load_vote_matrix
+
+
+class Command(BaseCommand):
+    help = 'Buduje macierz głosów posłów (głosowania x posłowie) dla analiz'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Pokaż rozmiar i czas wczytania istniejącej macierzy'
+        )
+
+    def handle(self, *args, **options):
+        if not options['stats']:
+            start = time.perf_counter()
+            matrix = build_vote_matrix()
+            self.stdout.write(self.style.SUCCESS(
+                f'Zbudowano macierz {matrix.shape[0]} głosowań x {matrix.shape[1]} posłów '
+                f'w {time.perf_counter() - start:.2f} s'
+            ))
+
+        start = time.perf_counter()
+        matrix = load_vote_matrix()
+        if matrix is None:
+            self.stdout.write(self.style.WARNING('Macierz nie została jeszcze zbudowana'))
+            return
+        # Wymuś odczyt całej macierzy, żeby czas obejmował dane, a nie tylko mmap
+        total = int((matrix.votes != 0).sum())
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            f'Macierz: {matrix.shape[0]} x {matrix.shape[1]}, {matrix.votes.nbytes / 1024:.0f} KB, '
+            f'{total} głosów, wczytanie: {elapsed_ms:.1f} ms'
+        )
@@ -0,0 +1,20 @@
+"""
+Przelicza od zera zgodność głosów obywateli z głosowaniami w Sejmie
+"""
+from django.core.management.base import BaseCommand
+from apps.bills.alignment import get_alignment_summary, rebuild_alignment
+from apps.bills.models import Bill
+
+
+class Command(BaseCommand):
+    help = 'Przelicza tabele zgodności obywateli z Sejmem i klubami (np. po imporcie historycznych danych)'
+
+    def handle(self, *args, **options):
+        count = rebuild_alignment(Bill.objects.all().iterator())
+        summary = get_alignment_summary()
+
+        self.stdout.write(self.style.SUCCESS(f'Przeliczono zgodność dla {count} projektów'))
+        sejm = summary['sejm']
+        self.stdout.write(f'Sejm: {sejm["aligned_votings"]}/{sejm["compared_votings"]} zgodnych głosowań')
+        for club in summary['clubs']:
+            self.stdout.write(f'{club["club"]:<20} {club["aligned_votings"]}/{club["compared_votings"]} ({club["alignment_rate"]:.0%})')
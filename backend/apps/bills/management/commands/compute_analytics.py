@@ -0,0 +1,44 @@
+"""
+Przelicza analizy głosowań klubów (spójność, buntownicy, zgodność klubów)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.bills.analytics import compute_all_analytics
+from apps.bills.similarity import update_deputy_similarity
+from apps.bills.vote_matrix import build_vote_matrix, load_vote_matrix
+
+
+class Command(BaseCommand):
+    help = 'Przelicza analizy klubów na macierzy głosów posłów'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-matrix',
+            action='store_true',
+            help='Najpierw przebuduj macierz głosów z tabeli DeputyVote'
+        )
+        parser.add_argument(
+            '--rebuild-similarity',
+            action='store_true',
+            help='Przelicz podobieństwo posłów od zera zamiast przyrostowo'
+        )
+
+    def handle(self, *args, **options):
+        matrix = build_vote_matrix() if options['rebuild_matrix'] else load_vote_matrix()
+        if matrix is None:
+            self.stdout.write(self.style.WARNING('Brak macierzy głosów - użyj --rebuild-matrix'))
+            return
+
+        start = time.perf_counter()
+        timings = compute_all_analytics(matrix)
+        similarity_start = time.perf_counter()
+        added = update_deputy_similarity(matrix, rebuild=options['rebuild_similarity'])
+        timings['deputy_similarity'] = round((time.perf_counter() - similarity_start) * 1000, 1)
+        self.stdout.write(f'Podobieństwo posłów: dodano {added} głosowań')
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(f'Macierz: {matrix.shape[0]} głosowań x {matrix.shape[1]} posłów')
+        for key, duration_ms in timings.items():
+            self.stdout.write(f'{key:<16} {duration_ms:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Analizy przeliczone w {elapsed_ms:.1f} ms'))
@@ -2,7 +2,10 @@ import requests
 import json
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from apps.bills.alignment import update_bill_alignment
+from apps.bills.deputy_votes import deputies_from_club_results, save_deputy_votes
 from apps.bills.models import Bill
+from apps.bills.prints import sync_bill_prints
 from apps.bills.services import AIAnalysisService
 from datetime import datetime
 import re
@@ -87,12 +90,25 @@ class Command(BaseCommand):
             updated_count = 0
             
             for bill_data in sejm_bills:
-                bill, created = self.create_or_update_bill(bill_data, force_update, ai_service)
+                bill, created = self.create_or_update_bill(bill_data, force_update, ai_service, term)
                 if created:
                     created_count += 1
                 elif not created and force_update:
                     updated_count += 1
             
+            # Przebuduj macierz głosów posłów i przelicz analizy klubów
+            if created_count or updated_count:
+                from apps.bills.analytics import compute_all_analytics
+                from apps.bills.vote_matrix import build_vote_matrix
+                matrix = build_vote_matrix()
+                self.stdout.write(f'Macierz głosów: {matrix.shape[0]} głosowań x {matrix.shape[1]} posłów')
+                timings = compute_all_analytics(matrix)
+                self.stdout.write(f'Analizy klubów przeliczone: {timings}')
+                # Nadpisane głosowania wymagają przeliczenia podobieństwa posłów od zera
+                from apps.bills.similarity import update_deputy_similarity
+                added = update_deputy_similarity(matrix, rebuild=bool(updated_count))
+                self.stdout.write(f'Podobieństwo posłów: dodano {added} głosowań')
+            
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Pobieranie zakończone. Utworzono: {created_count}, Zaktualizowano: {updated_count}'
@@ -164,24 +180,19 @@ class Command(BaseCommand):
             return None
             
         try:
-            import requests
-            import pdfplumber
-            import io
-            import re
+            from apps.bills.pdf_store import get_pdf_store
+            from apps.bills.text_extraction import LAYOUT_BACKEND, iter_page_texts
             
-            # Pobierz PDF
-            response = requests.get(pdf_link, timeout=30)
-            response.raise_for_status()
+            # Pobierz PDF (przez współdzielony magazyn, strumieniowo na dysk)
+            pdf_path = get_pdf_store().get_path(pdf_link)
             
-            # Przetwórz PDF
+            # Przetwórz PDF strona po stronie (tabela głosów wymaga analizy layoutu)
             deputies = []
-            with pdfplumber.open(io.BytesIO(response.content)) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        # Parsuj dane posłów
-                        page_deputies = self.parse_deputies_from_text(text)
-                        deputies.extend(page_deputies)
+            for _, text in iter_page_texts(pdf_path, LAYOUT_BACKEND):
+                if text:
+                    # Parsuj dane posłów
+                    page_deputies = self.parse_deputies_from_text(text)
+                    deputies.extend(page_deputies)
             
             # Grupuj według klubów
             club_results = self.group_deputies_by_club(deputies)
@@ -408,7 +419,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f'Błąd przetwarzania danych głosowania: {str(e)}'))
             return None
 
-    def create_or_update_bill(self, bill_data, force_update=False, ai_service=None):
+    def create_or_update_bill(self, bill_data, force_update=False, ai_service=None, term=SEJM_TERM):
         """Tworzy lub aktualizuje projekt ustawy w bazie danych"""
         sejm_id = bill_data.get('sejm_id', '')
         
@@ -429,18 +440,34 @@ class Command(BaseCommand):
                 setattr(bill, key, value)
             bill.save()
         
+        # Zapisz głosy posłów - /pdf-data/ i historia posła czytają je z bazy
+        if (created or force_update) and bill.club_results:
+            save_deputy_votes(bill, deputies_from_club_results(bill.club_results))
+        
+        # Wynik Sejmu zmienił się - przelicz zgodność z głosami obywateli
+        if created or force_update:
+            update_bill_alignment(bill)
+        
+        # Zapisz druki z tytułu głosowania (metadane i tekst) - endpointy i analiza AI czytają je z bazy
+        if created or force_update:
+            prints = sync_bill_prints(bill, term=term, force=force_update)
+            if prints:
+                self.stdout.write(f'Zapisano druki: {", ".join(p.number for p in prints if p.exists)}')
+        
         # Generuj analizę AI jeśli włączona i projekt nowy lub nie ma analizy
         if ai_service and (created or not bill.ai_analysis):
-            if bill.full_text:
-                self.stdout.write(f'Generuję analizę AI dla projektu: {bill.title[:50]}...')
-                try:
-                    analysis = ai_service.analyze_bill(bill.full_text, bill.title)
-                    bill.ai_analysis = analysis
-                    bill.ai_analysis_date = timezone.now()
-                    bill.save()
+            self.stdout.write(f'Generuję analizę AI dla projektu: {bill.title[:50]}...')
+            try:
+                # Tekst druków, a bez nich pełny tekst albo opis; None = brak tekstu
+                analysis = ai_service.analyze_bill(bill)
+                if analysis is None:
+                    self.stdout.write(f'Projekt {bill.number} nie ma tekstu do analizy - pomijam')
+                elif 'error' in analysis:
+                    self.stdout.write(self.style.WARNING(f'Błąd generowania analizy AI: {analysis["error"]}'))
+                elif ai_service.save_analysis_to_bill(bill, analysis):
                     self.stdout.write(self.style.SUCCESS('✓ Analiza AI wygenerowana'))
-                except Exception as e:
-                    self.stdout.write(self.style.WARNING(f'Błąd generowania analizy AI: {str(e)}'))
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f'Błąd generowania analizy AI: {str(e)}'))
         
         return bill, created
 
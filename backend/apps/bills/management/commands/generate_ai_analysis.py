@@ -1,8 +1,14 @@
 """
 Management command do generowania analiz AI dla projektów ustaw
 """
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from django.core.management.base import BaseCommand
+from django.db import connection
+from apps.bills.llm import get_rate_limiter, llm_cache_stats
 from apps.bills.models import Bill
+from apps.bills.prints import get_print_set
 from apps.bills.services import AIAnalysisService
 
 
@@ -31,13 +37,32 @@ class Command(BaseCommand):
             type=str,
             help='Analizuj tylko projekty o określonym statusie'
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Liczba równoległych analiz (przygotowanie tekstu nakłada się z zapytaniami do OpenAI)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Zawsze wywołuj OpenAI, nawet dla wejścia z zapisaną odpowiedzią'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Zawsze analizuj cały tekst (bez analizy przyrostowej zmienionych artykułów)'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write('Rozpoczynam generowanie analiz AI...')
         
         # Inicjalizuj serwis AI
         try:
-            ai_service = AIAnalysisService()
+            # Komenda działa poza ścieżką żądań - brakujące druki może pobrać z API Sejmu
+            ai_service = AIAnalysisService(
+                fetch_prints=True, use_cache=not options['no_cache'], incremental=not options['full']
+            )
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Błąd inicjalizacji serwisu AI: {str(e)}')
@@ -57,7 +82,9 @@ class Command(BaseCommand):
             # Pomiń projekty które już mają analizę
             bills_query = bills_query.filter(ai_analysis__isnull=True)
         
-        bills = bills_query[:options['limit']]
+        bills = self.one_per_print_set(
+            list(bills_query[:options['limit']]), options['force'], fetch=ai_service.fetch_prints
+        )
         
         if not bills:
             self.stdout.write('Brak projektów do analizy.')
@@ -65,24 +92,29 @@ class Command(BaseCommand):
         
         self.stdout.write(f'Znaleziono {len(bills)} projektów do analizy.')
         
+        if options['concurrency'] > 1:
+            self.run_concurrent(ai_service, list(bills), options['concurrency'])
+            return
+        
         # Analizuj każdy projekt
         success_count = 0
         error_count = 0
+        skipped_count = 0
         
         for bill in bills:
             self.stdout.write(f'\n=== Analizuję projekt {bill.number}: {bill.title[:50]}... ===')
             
             try:
-                # Sprawdź czy projekt ma tekst do analizy
-                if not bill.full_text and not bill.description:
+                # Wygeneruj analizę (tekst druków, a bez nich pełny tekst albo opis)
+                analysis = ai_service.analyze_bill(bill)
+                
+                if analysis is None:
                     self.stdout.write(
                         self.style.WARNING(f'Projekt {bill.number} nie ma tekstu do analizy - pomijam')
                     )
+                    skipped_count += 1
                     continue
                 
-                # Wygeneruj analizę
-                analysis = ai_service.analyze_bill(bill)
-                
                 if 'error' in analysis:
                     self.stdout.write(
                         self.style.ERROR(f'Błąd analizy: {analysis["error"]}')
@@ -120,7 +152,8 @@ class Command(BaseCommand):
         # Podsumowanie
         self.stdout.write(f'\n=== PODSUMOWANIE ===')
         self.stdout.write(f'Pomyślnie przeanalizowano: {success_count} projektów')
-        self.stdout.write(f'Błędy: {error_count} projektów')
+        self.stdout.write(f'Błędy: {error_count} projektów, pominięte (brak tekstu): {skipped_count}')
+        self.write_cache_stats()
         
         if success_count > 0:
             self.stdout.write(
@@ -130,3 +163,130 @@ class Command(BaseCommand):
             self.stdout.write(
                 self.style.ERROR('Nie udało się przeanalizować żadnego projektu.')
             )
+
+    def one_per_print_set(self, bills, force, fetch=False):
+        """
+        Zostawia jeden projekt na zestaw druków
+
+        Pozostałe głosowania nad tymi samymi drukami dostaną kopię wspólnej
+        analizy przy zapisie; projekty, których zestaw ma już analizę, dostają
+        ją od razu (bez --force nie są analizowane ponownie). Przy fetch numery
+        z tytułów nieznane w bazie sprawdzane są w API Sejmu.
+        """
+        selected = []
+        seen = set()
+        reused = 0
+        for bill in bills:
+            had_analysis = bool(bill.ai_analysis)
+            print_set = get_print_set(bill, fetch=fetch)
+            if print_set is not None:
+                if not force and not had_analysis and bill.ai_analysis:
+                    reused += 1
+                    continue
+                if print_set.id in seen:
+                    continue
+                seen.add(print_set.id)
+            selected.append(bill)
+
+        duplicates = len(bills) - len(selected) - reused
+        if reused:
+            self.stdout.write(f'Przypisano istniejącą analizę druków do {reused} projektów')
+        if duplicates:
+            self.stdout.write(f'Pominięto {duplicates} głosowań nad tymi samymi drukami - dostaną wspólną analizę')
+        return selected
+
+    def run_concurrent(self, ai_service, bills, concurrency):
+        """
+        Analizuje projekty równolegle
+
+        Dwie pule wątków: przygotowanie tekstu (druki, OCR, skracanie) i zapytania
+        do OpenAI. Tekst trafia do puli OpenAI zaraz po przygotowaniu, więc
+        przygotowanie kolejnych projektów trwa w czasie oczekiwania na odpowiedzi.
+        Limity zapytań i tokenów na minutę pilnuje współdzielony limiter.
+        """
+        start = time.perf_counter()
+        stats = {'success': 0, 'error': 0, 'skipped': 0, 'tokens': 0, 'prepare_time': 0.0, 'llm_time': 0.0}
+
+        with ThreadPoolExecutor(concurrency, thread_name_prefix='prepare') as prepare_pool, \
+                ThreadPoolExecutor(concurrency, thread_name_prefix='llm') as llm_pool:
+            prepare_futures = {
+                prepare_pool.submit(self.prepare_bill, ai_service, bill): bill
+                for bill in bills
+            }
+            llm_futures = {}
+            for future in as_completed(prepare_futures):
+                bill = prepare_futures[future]
+                prepared, elapsed, error = future.result()
+                stats['prepare_time'] += elapsed
+                if error:
+                    self.stdout.write(self.style.ERROR(f'Błąd przygotowania projektu {bill.number}: {error}'))
+                    stats['error'] += 1
+                elif not prepared:
+                    self.stdout.write(self.style.WARNING(f'Projekt {bill.number} nie ma tekstu do analizy - pomijam'))
+                    stats['skipped'] += 1
+                else:
+                    llm_futures[llm_pool.submit(self.analyze_prepared, ai_service, bill, prepared)] = bill
+
+            for future in as_completed(llm_futures):
+                bill = llm_futures[future]
+                tokens, elapsed, error = future.result()
+                stats['llm_time'] += elapsed
+                stats['tokens'] += tokens
+                if error:
+                    self.stdout.write(self.style.ERROR(f'Błąd analizy projektu {bill.number}: {error}'))
+                    stats['error'] += 1
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'Analiza zapisana dla projektu {bill.number} ({tokens} tokenów)'))
+                    stats['success'] += 1
+
+        self.report_throughput(stats, time.perf_counter() - start, len(llm_futures))
+
+    def prepare_bill(self, ai_service, bill):
+        """Przygotowuje wejście analizy w wątku puli - zwraca (wejście, czas, błąd)"""
+        start = time.perf_counter()
+        try:
+            # None (brak tekstu druków i pełnego tekstu / opisu) liczone jest jako pominięcie
+            return ai_service.prepare_analysis(bill), time.perf_counter() - start, None
+        except Exception as e:
+            return None, time.perf_counter() - start, str(e)
+        finally:
+            connection.close()
+
+    def analyze_prepared(self, ai_service, bill, prepared):
+        """Analizuje przygotowane wejście przez OpenAI i zapisuje analizę - zwraca (tokeny, czas, błąd)"""
+        start = time.perf_counter()
+        try:
+            analysis, tokens = ai_service.run_prepared_analysis(bill, prepared)
+            if 'error' in analysis:
+                return tokens, time.perf_counter() - start, analysis['error']
+            if not ai_service.save_analysis_to_bill(bill, analysis):
+                return tokens, time.perf_counter() - start, 'błąd zapisywania analizy'
+            return tokens, time.perf_counter() - start, None
+        except Exception as e:
+            return 0, time.perf_counter() - start, str(e)
+        finally:
+            connection.close()
+
+    def report_throughput(self, stats, elapsed, llm_calls):
+        """Wypisuje podsumowanie i przepustowość trybu równoległego"""
+        processed = stats['success'] + stats['error'] + stats['skipped']
+        minutes = max(elapsed / 60, 1e-9)
+        self.stdout.write(f'\n=== PODSUMOWANIE ===')
+        self.stdout.write(f'Pomyślnie przeanalizowano: {stats["success"]} projektów')
+        self.stdout.write(f'Błędy: {stats["error"]}, pominięte: {stats["skipped"]}')
+        self.stdout.write(f'Czas całkowity: {elapsed:.1f} s')
+        self.stdout.write(f'Przepustowość: {processed / minutes:.1f} projektów/min, {stats["tokens"] / minutes:.0f} tokenów/min')
+        if processed:
+            self.stdout.write(f'Średni czas przygotowania tekstu: {stats["prepare_time"] / processed:.2f} s')
+        if llm_calls:
+            self.stdout.write(f'Średni czas zapytania do OpenAI: {stats["llm_time"] / llm_calls:.2f} s')
+        self.stdout.write(f'Oczekiwanie na limity OpenAI (łącznie): {get_rate_limiter().waited:.1f} s')
+        self.write_cache_stats()
+
+    def write_cache_stats(self):
+        stats = llm_cache_stats()
+        hit_rate = f'{stats["hit_rate"] * 100:.1f}%' if stats['hit_rate'] is not None else '-'
+        self.stdout.write(
+            f'Cache odpowiedzi AI: {stats["hits"]} trafień, {stats["misses"]} chybień ({hit_rate}), '
+            f'zaoszczędzone tokeny: {stats["tokens_saved"]}'
+        )
@@ -0,0 +1,56 @@
+"""
+Przypisuje projekty do zestawów druków i przenosi istniejące analizy AI do zestawów
+"""
+from django.core.management.base import BaseCommand
+from apps.bills.models import Bill, PrintSetAnalysis
+from apps.bills.prints import DEFAULT_TERM, get_print_set
+
+
+class Command(BaseCommand):
+    help = 'Łączy głosowania nad tymi samymi drukami we wspólne zestawy z jedną analizą AI'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--term',
+            type=int,
+            default=DEFAULT_TERM,
+            help=f'Kadencja Sejmu (domyślnie {DEFAULT_TERM})'
+        )
+        parser.add_argument(
+            '--fetch',
+            action='store_true',
+            help='Sprawdź w API Sejmu numery z tytułów, których nie ma jeszcze w bazie druków'
+        )
+
+    def handle(self, *args, **options):
+        linked = 0
+        for bill in Bill.objects.exclude(api_data__isnull=True).select_related('print_set').iterator():
+            if get_print_set(bill, term=options['term'], fetch=options['fetch']) is not None:
+                linked += 1
+
+        adopted = shared = 0
+        print_sets = PrintSetAnalysis.objects.filter(term=options['term'], analysis__isnull=True)
+        for print_set in print_sets.iterator():
+            # Najnowsza analiza tekstu druków któregoś z głosowań staje się analizą zestawu
+            # (analiza pełnego tekstu albo opisu dotyczy tylko swojego projektu)
+            source_bill = print_set.bills.filter(
+                ai_analysis__isnull=False, ai_analysis_date__isnull=False, ai_analysis_source__origin='prints'
+            ).order_by('-ai_analysis_date').first()
+            if source_bill is None or 'error' in source_bill.ai_analysis:
+                continue
+
+            print_set.analysis = source_bill.ai_analysis
+            print_set.analysis_date = source_bill.ai_analysis_date
+            print_set.analysis_source = source_bill.ai_analysis_source
+            print_set.save(update_fields=['analysis', 'analysis_date', 'analysis_source', 'updated_at'])
+            adopted += 1
+            shared += print_set.bills.filter(ai_analysis__isnull=True).update(
+                ai_analysis=print_set.analysis, ai_analysis_date=print_set.analysis_date
+            )
+
+        total_sets = PrintSetAnalysis.objects.filter(term=options['term'], bills__isnull=False).distinct().count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Projekty z drukami: {linked}, zestawy druków: {total_sets} '
+            f'(analiz AI potrzebnych: {total_sets} zamiast {linked})'
+        ))
+        self.stdout.write(f'Przeniesiono analizy do {adopted} zestawów, skopiowano do {shared} projektów bez analizy')
@@ -3,141 +3,387 @@ Cache'owanie OCR dla PDF-ów projektów ustaw
 """
 import os
 import hashlib
-import json
+import heapq
+import sqlite3
+import threading
 import time
-from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+OCR_DPI = 300
+OCR_LANG = 'pol'
+
+_engine_version = None
+
+
+def get_ocr_engine_version():
+    """Zwraca wersję Tesseracta (część klucza cache - nowa wersja unieważnia wyniki)"""
+    global _engine_version
+    if _engine_version is None:
+        try:
+            import pytesseract
+            _engine_version = f"tesseract-{pytesseract.get_tesseract_version()}"
+        except Exception as e:
+            logger.warning(f"Nie udało się ustalić wersji Tesseracta: {e}")
+            _engine_version = 'tesseract-unknown'
+    return _engine_version
+
+
+def ocr_pdf_page(pdf_path, content_hash, page_number, cache=None, dpi=OCR_DPI, lang=OCR_LANG):
+    """
+    OCR pojedynczej strony PDF-a z cache'owaniem po treści pliku
+
+    Identyczne pliki (niezależnie od numeru druku) są rozpoznawane tylko raz.
+    Poppler czyta plik z dysku i rasteryzuje tylko tę jedną stronę.
+    """
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    cache = cache or OCRCache()
+    cached_text = cache.get_cached_text(content_hash, page_number, dpi=dpi, lang=lang)
+    if cached_text is not None:
+        logger.info(f"Używam cache OCR dla {content_hash[:12]}, strona {page_number + 1}")
+        return cached_text
+
+    logger.info(f"Używam OCR dla {content_hash[:12]}, strona {page_number + 1}")
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)
+    if not images:
+        return None
+
+    text = pytesseract.image_to_string(images[0], lang=lang).strip()
+    # Zapisujemy także pusty wynik, żeby nie powtarzać OCR pustych stron
+    cache.save_to_cache(content_hash, text, page_number, dpi=dpi, lang=lang)
+    return text
+
+
 class OCRCache:
-    """Klasa do zarządzania cache'em OCR"""
-    
-    def __init__(self):
-        self.cache_dir = os.path.join(settings.BASE_DIR, 'ocr_cache')
+    """
+    Klasa do zarządzania cache'em OCR
+
+    Teksty trzymane są w shardach SQLite (shard_XX.sqlite3) razem z indeksem
+    (klucz, rozmiar, ostatni dostęp, liczba trafień). Wszystkie strony jednego
+    dokumentu trafiają do tego samego sharda, a liczniki plików i rozmiaru
+    utrzymywane są przez triggery, więc statystyki nie wymagają skanowania.
+
+    Klucze wyprowadzane są z hasha treści PDF-a, numeru strony, DPI, języka
+    i wersji silnika OCR. Osobna tabela aliasów (aliases.sqlite3) wiąże
+    numery druków z hashem ich aktualnej wersji.
+    """
+
+    ALIASES_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS aliases (
+            print_number TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS aliases_content_hash ON aliases(content_hash);
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            doc TEXT NOT NULL,
+            text TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS entries_doc ON entries(doc);
+        CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+        CREATE TABLE IF NOT EXISTS stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            files INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hits INTEGER NOT NULL,
+            misses INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO stats (id, files, size, hits, misses) VALUES (1, 0, 0, 0, 0);
+        CREATE TRIGGER IF NOT EXISTS entries_after_insert AFTER INSERT ON entries BEGIN
+            UPDATE stats SET files = files + 1, size = size + NEW.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_after_delete AFTER DELETE ON entries BEGIN
+            UPDATE stats SET files = files - 1, size = size - OLD.size WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_after_resize AFTER UPDATE OF size ON entries BEGIN
+            UPDATE stats SET size = size - OLD.size + NEW.size WHERE id = 1;
+        END;
+    """
+
+    def __init__(self, cache_dir=None, shards=None):
+        self.cache_dir = str(cache_dir or settings.OCR_CACHE_DIR)
         os.makedirs(self.cache_dir, exist_ok=True)
-    
-    def get_cache_key(self, print_number, page_number=None):
-        """Generuje klucz cache dla danego druku i strony"""
-        if page_number is not None:
-            return f"druk_{print_number}_page_{page_number}.txt"
-        else:
-            return f"druk_{print_number}_full.txt"
-    
-    def get_cached_text(self, print_number, page_number=None):
-        """Pobiera tekst z cache"""
-        cache_key = self.get_cache_key(print_number, page_number)
-        cache_path = os.path.join(self.cache_dir, cache_key)
-        
-        if os.path.exists(cache_path):
-            try:
-                with open(cache_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            except Exception as e:
-                logger.warning(f"Błąd odczytu cache {cache_key}: {e}")
-                return None
-        return None
-    
-    def save_to_cache(self, print_number, text, page_number=None):
+        self.shards = self._load_shard_count(shards or settings.OCR_CACHE_SHARDS)
+        self._local = threading.local()
+
+    def _load_shard_count(self, requested):
+        """Liczba shardów jest ustalana przy tworzeniu cache i później się nie zmienia"""
+        shards_file = os.path.join(self.cache_dir, 'SHARDS')
+        if os.path.exists(shards_file):
+            with open(shards_file, 'r', encoding='utf-8') as f:
+                return int(f.read().strip())
+        with open(shards_file, 'w', encoding='utf-8') as f:
+            f.write(str(requested))
+        return requested
+
+    def _connection(self, shard):
+        """Zwraca połączenie do sharda (osobne dla każdego wątku)"""
+        connections = getattr(self._local, 'connections', None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(shard)
+        if conn is None:
+            path = os.path.join(self.cache_dir, f'shard_{shard:02d}.sqlite3')
+            conn = sqlite3.connect(path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            connections[shard] = conn
+        return conn
+
+    def _aliases_connection(self):
+        conn = getattr(self._local, 'aliases', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.cache_dir, 'aliases.sqlite3'), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(self.ALIASES_SCHEMA)
+            self._local.aliases = conn
+        return conn
+
+    def _shard_for(self, doc):
+        digest = hashlib.md5(doc.encode('utf-8')).hexdigest()
+        return int(digest[:8], 16) % self.shards
+
+    def _all_connections(self):
+        return [self._connection(shard) for shard in range(self.shards)]
+
+    def get_cache_key(self, content_hash, page_number=None, dpi=OCR_DPI, lang=OCR_LANG, engine=None):
+        """Generuje klucz cache dla danej treści PDF-a i strony"""
+        engine = engine or get_ocr_engine_version()
+        page = f"page_{page_number}" if page_number is not None else "full"
+        return f"{content_hash}:{page}:dpi{dpi}:{lang}:{engine}"
+
+    def get_cached_text(self, content_hash, page_number=None, dpi=OCR_DPI, lang=OCR_LANG):
+        """Pobiera tekst z cache (i odnotowuje dostęp dla LRU)"""
+        cache_key = self.get_cache_key(content_hash, page_number, dpi, lang)
+        return self._get(content_hash, cache_key)
+
+    def save_to_cache(self, content_hash, text, page_number=None, dpi=OCR_DPI, lang=OCR_LANG):
         """Zapisuje tekst do cache"""
-        cache_key = self.get_cache_key(print_number, page_number)
-        cache_path = os.path.join(self.cache_dir, cache_key)
-        
+        cache_key = self.get_cache_key(content_hash, page_number, dpi, lang)
+        self._put(content_hash, cache_key, text)
+
+    def set_alias(self, print_number, content_hash):
+        """Wiąże numer druku z hashem aktualnej wersji jego PDF-a"""
+        conn = self._aliases_connection()
+        with conn:
+            previous = conn.execute(
+                'SELECT content_hash FROM aliases WHERE print_number = ?', (str(print_number),)
+            ).fetchone()
+            conn.execute(
+                """
+                INSERT INTO aliases (print_number, content_hash, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(print_number) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    updated_at = excluded.updated_at
+                """,
+                (str(print_number), content_hash, time.time())
+            )
+        if previous and previous[0] != content_hash:
+            logger.info(f"Druk {print_number} ma nową wersję PDF-a ({previous[0][:12]} -> {content_hash[:12]})")
+
+    def get_alias(self, print_number):
+        """Zwraca hash treści przypisany do numeru druku"""
+        row = self._aliases_connection().execute(
+            'SELECT content_hash FROM aliases WHERE print_number = ?', (str(print_number),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _get(self, doc, cache_key):
+        try:
+            conn = self._connection(self._shard_for(doc))
+            row = conn.execute('SELECT text FROM entries WHERE key = ?', (cache_key,)).fetchone()
+            with conn:
+                if row is None:
+                    conn.execute('UPDATE stats SET misses = misses + 1 WHERE id = 1')
+                    return None
+                conn.execute(
+                    'UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?',
+                    (time.time(), cache_key)
+                )
+                conn.execute('UPDATE stats SET hits = hits + 1 WHERE id = 1')
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Błąd odczytu cache {cache_key}: {e}")
+            return None
+
+    def _put(self, doc, cache_key, text):
+        now = time.time()
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                f.write(text)
+            conn = self._connection(self._shard_for(doc))
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO entries (key, doc, text, size, created_at, last_access, hits)
+                    VALUES (?, ?, ?, ?, ?, ?, 0)
+                    ON CONFLICT(key) DO UPDATE SET
+                        text = excluded.text,
+                        size = excluded.size,
+                        created_at = excluded.created_at,
+                        last_access = excluded.last_access
+                    """,
+                    (cache_key, doc, text, len(text.encode('utf-8')), now, now)
+                )
             logger.info(f"Zapisano do cache: {cache_key}")
-        except Exception as e:
+        except sqlite3.Error as e:
             logger.error(f"Błąd zapisu cache {cache_key}: {e}")
-    
+
     def clear_cache(self, print_number=None):
         """Czyści cache - opcjonalnie dla konkretnego druku"""
         if print_number:
-            # Usuń cache dla konkretnego druku
-            pattern = f"druk_{print_number}_"
-            for filename in os.listdir(self.cache_dir):
-                if filename.startswith(pattern):
-                    os.remove(os.path.join(self.cache_dir, filename))
-                    logger.info(f"Usunięto cache: {filename}")
-        else:
-            # Usuń cały cache
-            for filename in os.listdir(self.cache_dir):
-                os.remove(os.path.join(self.cache_dir, filename))
-                logger.info(f"Usunięto cache: {filename}")
-    
+            # Usuń alias druku; wpisy wersji PDF-a (jeden shard, indeks po dokumencie)
+            # tylko gdy żaden inny druk nie wskazuje tej samej treści
+            doc = self.get_alias(print_number)
+            if not doc:
+                return 0
+            aliases = self._aliases_connection()
+            with aliases:
+                aliases.execute('DELETE FROM aliases WHERE print_number = ?', (str(print_number),))
+                shared = aliases.execute(
+                    'SELECT COUNT(*) FROM aliases WHERE content_hash = ?', (doc,)
+                ).fetchone()[0]
+            if shared:
+                logger.info(
+                    f"Usunięto alias druku {print_number} - wpisy {doc[:12]} zostają "
+                    f"(liczba innych druków z tą treścią: {shared})"
+                )
+                return 0
+            conn = self._connection(self._shard_for(doc))
+            with conn:
+                deleted = conn.execute('DELETE FROM entries WHERE doc = ?', (doc,)).rowcount
+            logger.info(f"Usunięto cache dla druku {print_number} ({doc[:12]}): {deleted} wpisów")
+            return deleted
+
+        # Usuń cały cache
+        deleted = 0
+        for conn in self._all_connections():
+            with conn:
+                deleted += conn.execute('DELETE FROM entries').rowcount
+                conn.execute('UPDATE stats SET hits = 0, misses = 0 WHERE id = 1')
+        aliases = self._aliases_connection()
+        with aliases:
+            aliases.execute('DELETE FROM aliases')
+        self.remove_legacy_files()
+        logger.info(f"Usunięto cały cache: {deleted} wpisów")
+        return deleted
+
+    def legacy_files(self):
+        """
+        Pliki starego formatu cache (druk_<numer>_page_<n>.txt / druk_<numer>_full.txt)
+
+        Były kluczowane numerem druku bez hasha treści, DPI i wersji silnika,
+        więc nie da się ich bezpiecznie przenieść do indeksu - nowe klucze
+        nigdy ich nie trafią, a triggery rozmiaru ich nie widzą.
+        """
+        return [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+            if name.startswith('druk_') and name.endswith('.txt')
+        ]
+
+    def remove_legacy_files(self):
+        """Usuwa pliki starego formatu cache - zwraca liczbę usuniętych plików"""
+        deleted = 0
+        for path in self.legacy_files():
+            try:
+                os.remove(path)
+                deleted += 1
+            except OSError as e:
+                logger.error(f"Błąd usuwania {path}: {e}")
+        if deleted:
+            logger.info(f"Usunięto {deleted} plików starego formatu cache OCR")
+        return deleted
+
     def get_cache_stats(self):
-        """Zwraca statystyki cache"""
-        files = os.listdir(self.cache_dir)
-        total_files = len(files)
-        total_size = sum(os.path.getsize(os.path.join(self.cache_dir, f)) for f in files)
-        
+        """Zwraca statystyki cache (odczyt liczników z indeksu, bez skanowania)"""
+        total_files = total_size = hits = misses = 0
+        for conn in self._all_connections():
+            files, size, shard_hits, shard_misses = conn.execute(
+                'SELECT files, size, hits, misses FROM stats WHERE id = 1'
+            ).fetchone()
+            total_files += files
+            total_size += size
+            hits += shard_hits
+            misses += shard_misses
+
+        aliases = self._aliases_connection().execute('SELECT COUNT(*) FROM aliases').fetchone()[0]
+        legacy = self.legacy_files()
+
+        lookups = hits + misses
         return {
             'total_files': total_files,
+            'aliases': aliases,
             'total_size_mb': round(total_size / (1024 * 1024), 2),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups * 100, 1) if lookups else 0,
+            'shards': self.shards,
+            'legacy_files': len(legacy),
+            'legacy_size_mb': round(sum(os.path.getsize(path) for path in legacy) / (1024 * 1024), 2),
             'cache_dir': self.cache_dir
         }
-    
+
     def clean_old_cache(self, days=30):
-        """Czyści cache starszy niż X dni"""
-        if not os.path.exists(self.cache_dir):
-            return 0
-        
+        """Czyści wpisy nieużywane od X dni"""
         cutoff_time = time.time() - (days * 24 * 60 * 60)
         deleted_count = 0
-        
-        for filename in os.listdir(self.cache_dir):
-            file_path = os.path.join(self.cache_dir, filename)
-            if os.path.isfile(file_path):
-                file_mtime = os.path.getmtime(file_path)
-                if file_mtime < cutoff_time:
-                    try:
-                        os.remove(file_path)
-                        deleted_count += 1
-                        logger.info(f"Usunięto stary cache: {filename}")
-                    except Exception as e:
-                        logger.error(f"Błąd usuwania {filename}: {e}")
-        
+
+        for conn in self._all_connections():
+            with conn:
+                deleted_count += conn.execute(
+                    'DELETE FROM entries WHERE last_access < ?', (cutoff_time,)
+                ).rowcount
+
+        if deleted_count:
+            logger.info(f"Usunięto {deleted_count} nieużywanych wpisów cache")
         return deleted_count
-    
+
     def clean_by_size(self, max_size_mb=100):
-        """Czyści cache gdy przekroczy określony rozmiar (usuwając najstarsze pliki)"""
-        if not os.path.exists(self.cache_dir):
-            return 0
-        
-        # Pobierz wszystkie pliki z czasem modyfikacji
-        files_with_time = []
-        for filename in os.listdir(self.cache_dir):
-            file_path = os.path.join(self.cache_dir, filename)
-            if os.path.isfile(file_path):
-                files_with_time.append((filename, os.path.getmtime(file_path), os.path.getsize(file_path)))
-        
-        # Sortuj według czasu modyfikacji (najstarsze pierwsze)
-        files_with_time.sort(key=lambda x: x[1])
-        
-        # Oblicz aktualny rozmiar
-        current_size = sum(size for _, _, size in files_with_time)
+        """Czyści cache gdy przekroczy określony rozmiar (usuwając najdawniej używane wpisy)"""
+        connections = self._all_connections()
+        current_size = sum(
+            conn.execute('SELECT size FROM stats WHERE id = 1').fetchone()[0]
+            for conn in connections
+        )
         max_size_bytes = max_size_mb * 1024 * 1024
-        
+
         if current_size <= max_size_bytes:
             return 0
-        
-        # Usuń najstarsze pliki aż rozmiar będzie OK
-        deleted_count = 0
-        for filename, _, size in files_with_time:
+
+        # Scal indeksy last_access wszystkich shardów i wybierz najdawniej używane wpisy
+        def shard_entries(shard, conn):
+            for key, last_access, size in conn.execute(
+                'SELECT key, last_access, size FROM entries ORDER BY last_access'
+            ):
+                yield last_access, shard, key, size
+
+        to_delete = {}
+        for _, shard, key, size in heapq.merge(*(shard_entries(i, c) for i, c in enumerate(connections))):
             if current_size <= max_size_bytes:
                 break
-            
-            file_path = os.path.join(self.cache_dir, filename)
-            try:
-                os.remove(file_path)
-                current_size -= size
-                deleted_count += 1
-                logger.info(f"Usunięto cache (limit rozmiaru): {filename}")
-            except Exception as e:
-                logger.error(f"Błąd usuwania {filename}: {e}")
-        
+            to_delete.setdefault(shard, []).append((key,))
+            current_size -= size
+
+        deleted_count = 0
+        for shard, keys in to_delete.items():
+            conn = connections[shard]
+            with conn:
+                conn.executemany('DELETE FROM entries WHERE key = ?', keys)
+            deleted_count += len(keys)
+
+        logger.info(f"Usunięto {deleted_count} wpisów cache (limit rozmiaru)")
         return deleted_count
 
 
@@ -152,7 +398,6 @@ class Command(BaseCommand):
         )
         parser.add_argument(
             '--clear-druk',
-            type=int,
             help='Wyczyść cache dla konkretnego druku'
         )
         parser.add_argument(
@@ -175,7 +420,12 @@ class Command(BaseCommand):
         parser.add_argument(
             '--auto-clean',
             action='store_true',
-            help='Automatyczne czyszczenie (stare + rozmiar)'
+            help='Automatyczne czyszczenie (stare + rozmiar + pliki starego formatu)'
+        )
+        parser.add_argument(
+            '--remove-legacy',
+            action='store_true',
+            help='Usuń pliki starego formatu cache (druk_*.txt) - nie są już odczytywane'
         )
     
     def handle(self, *args, **options):
@@ -186,28 +436,45 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('Wyczyszczono cały cache OCR'))
         
         elif options['clear_druk']:
-            cache.clear_cache(options['clear_druk'])
-            self.stdout.write(self.style.SUCCESS(f'Wyczyszczono cache dla druku {options["clear_druk"]}'))
+            deleted = cache.clear_cache(options['clear_druk'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Wyczyszczono cache dla druku {options["clear_druk"]} ({deleted} wpisów)'
+            ))
+
+        elif options['remove_legacy']:
+            deleted = cache.remove_legacy_files()
+            self.stdout.write(self.style.SUCCESS(f'Usunięto {deleted} plików starego formatu cache'))
         
         elif options['clean_old']:
             days = options['clean_old']
             deleted = cache.clean_old_cache(days)
-            self.stdout.write(self.style.SUCCESS(f'Usunięto {deleted} plików starszych niż {days} dni'))
+            self.stdout.write(self.style.SUCCESS(f'Usunięto {deleted} wpisów nieużywanych od {days} dni'))
         
         elif options['clean_size']:
             max_mb = options['clean_size']
             deleted = cache.clean_by_size(max_mb)
-            self.stdout.write(self.style.SUCCESS(f'Usunięto {deleted} plików (limit {max_mb} MB)'))
+            self.stdout.write(self.style.SUCCESS(f'Usunięto {deleted} wpisów (limit {max_mb} MB)'))
         
         elif options['auto_clean']:
             # Automatyczne czyszczenie: stare pliki + limit rozmiaru
             deleted_old = cache.clean_old_cache(30)  # 30 dni
             deleted_size = cache.clean_by_size(100)  # 100 MB
-            self.stdout.write(self.style.SUCCESS(f'Auto-clean: usunięto {deleted_old} starych + {deleted_size} z limitem rozmiaru'))
+            deleted_legacy = cache.remove_legacy_files()
+            self.stdout.write(self.style.SUCCESS(
+                f'Auto-clean: usunięto {deleted_old} starych + {deleted_size} z limitem rozmiaru '
+                f'+ {deleted_legacy} plików starego formatu'
+            ))
         
         elif options['stats']:
             stats = cache.get_cache_stats()
-            self.stdout.write(f'Cache OCR - Pliki: {stats["total_files"]}, Rozmiar: {stats["total_size_mb"]} MB')
+            self.stdout.write(f'Cache OCR - Wpisy: {stats["total_files"]}, Rozmiar: {stats["total_size_mb"]} MB')
+            self.stdout.write(f'Trafienia: {stats["hits"]}, Chybienia: {stats["misses"]} ({stats["hit_rate"]}%)')
+            self.stdout.write(f'Aliasy druków: {stats["aliases"]}, Shardy: {stats["shards"]}')
+            if stats['legacy_files']:
+                self.stdout.write(self.style.WARNING(
+                    f'Pliki starego formatu: {stats["legacy_files"]} ({stats["legacy_size_mb"]} MB) '
+                    f'- usuń je przez --remove-legacy'
+                ))
             self.stdout.write(f'Katalog: {stats["cache_dir"]}')
         
         else:
@@ -0,0 +1,94 @@
+"""
+Lokalny serwer zgodny z API OpenAI (chat.completions) do testów i benchmarków analizy AI
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.bills.openai_stub import create_stub_server
+
+
+class Command(BaseCommand):
+    help = 'Uruchamia lokalny serwer zgodny z API OpenAI (odpowiedzi z szablonu, opóźnienia, błędy, 429)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Adres nasłuchiwania (domyślnie 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=8089, help='Port (domyślnie 8089)')
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.5,
+            help='Stałe opóźnienie odpowiedzi w sekundach (domyślnie 0.5)'
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0.0,
+            help='Losowe dodatkowe opóźnienie 0..jitter sekund'
+        )
+        parser.add_argument(
+            '--latency-per-token',
+            type=float,
+            default=0.0,
+            help='Opóźnienie na wygenerowany token w sekundach (symulacja generowania)'
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Odsetek odpowiedzi 500 (0-1)'
+        )
+        parser.add_argument(
+            '--rate-limit-rate',
+            type=float,
+            default=0.0,
+            help='Odsetek losowych odpowiedzi 429 (0-1)'
+        )
+        parser.add_argument(
+            '--rpm',
+            type=int,
+            default=0,
+            help='Limit zapytań na minutę - nadmiarowe dostają 429 z Retry-After (0 = bez limitu)'
+        )
+        parser.add_argument(
+            '--response-file',
+            help='Plik ze stałą treścią odpowiedzi (zamiast analizy z szablonu)'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Ziarno generatora losowego (domyślnie 0)')
+        parser.add_argument('--verbose', action='store_true', help='Loguj każde zapytanie')
+
+    def handle(self, *args, **options):
+        response = None
+        if options['response_file']:
+            with open(options['response_file'], encoding='utf-8') as f:
+                response = f.read()
+
+        server = create_stub_server(
+            host=options['host'],
+            port=options['port'],
+            model=settings.OPENAI_MODEL,
+            verbose=options['verbose'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            latency_per_token=options['latency_per_token'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            rpm=options['rpm'],
+            response=response,
+            seed=options['seed'],
+        )
+        host, port = server.server_address[:2]
+        self.stdout.write(self.style.SUCCESS(f'Serwer stub OpenAI: http://{host}:{port}/v1'))
+        self.stdout.write(f'Ustaw OPENAI_BASE_URL=http://{host}:{port}/v1 i dowolny OPENAI_API_KEY; Ctrl+C kończy')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+        stats = server.stats.snapshot()
+        self.stdout.write(f'\n=== PODSUMOWANIE ===')
+        self.stdout.write(
+            f'Zapytania: {stats["requests"]}, poprawne: {stats["ok"]}, 429: {stats["rate_limited"]}, '
+            f'błędy 500: {stats["errors"]}, tokeny: {stats["tokens"]}'
+        )
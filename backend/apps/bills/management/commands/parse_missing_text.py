@@ -3,12 +3,16 @@ Komenda do ponownego parsowania projektów bez pełnego tekstu
 """
 from django.core.management.base import BaseCommand
 from django.db import models
+from apps.bills.legal_structure import segment_text
 from apps.bills.models import Bill
+from apps.bills.pdf_store import get_pdf_store
+from apps.bills.text_extraction import (
+    FAST_BACKEND, extract_document_text, get_attachment_format, iter_page_texts,
+    open_document, rank_attachments
+)
 import requests
-import io
-import pdfplumber
-from pdf2image import convert_from_bytes
-import pytesseract
+
+from .ocr_cache import OCRCache, ocr_pdf_page
 
 class Command(BaseCommand):
     help = 'Ponownie parsuje projekty bez pełnego tekstu używając OCR'
@@ -47,36 +51,22 @@ class Command(BaseCommand):
                 self.stdout.write(f'Brak załączników dla {bill.number}')
                 continue
             
-            # Pobierz pierwszy PDF załącznik
-            pdf_attachment = None
-            for attachment in bill.attachments:
-                if attachment.endswith('.pdf'):
-                    pdf_attachment = attachment
-                    break
-            
-            if not pdf_attachment:
-                self.stdout.write(f'Brak PDF załączników dla {bill.number}')
+            # Załączniki w kolejności preferencji - DOCX/ODT przed PDF-em, OCR na końcu
+            ranked_attachments = rank_attachments(bill.attachments)
+            if not ranked_attachments:
+                self.stdout.write(f'Brak obsługiwanych załączników dla {bill.number}')
                 continue
             
-            # Pobierz PDF z API
-            api_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{bill.sejm_id}/{pdf_attachment}"
-            
             try:
-                response = requests.get(api_url, timeout=60)
-                if response.status_code != 200:
-                    self.stdout.write(f'Błąd pobierania PDF dla {bill.number}: {response.status_code}')
-                    continue
-                
-                # Spróbuj standardowego parsowania
-                text = self.parse_pdf_standard(response.content)
-                
-                # Jeśli brak tekstu, spróbuj OCR
-                if not text:
-                    self.stdout.write(f'Brak tekstu w PDF, próba OCR...')
-                    text = self.parse_pdf_ocr(response.content)
+                text = None
+                for attachment in ranked_attachments:
+                    text = self.parse_attachment(bill, attachment)
+                    if text:
+                        break
                 
                 if text:
                     bill.full_text = text
+                    bill.structure = segment_text(text)
                     bill.save()
                     self.stdout.write(self.style.SUCCESS(f'Pomyślnie sparsowano {bill.number}: {len(text)} znaków'))
                 else:
@@ -85,31 +75,60 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Błąd przetwarzania {bill.number}: {str(e)}'))
     
-    def parse_pdf_standard(self, pdf_content):
+    def parse_attachment(self, bill, attachment):
+        """Wyciąga tekst z jednego załącznika projektu"""
+        attachment_format = get_attachment_format(attachment)
+        api_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{bill.sejm_id}/{attachment}"
+        
+        store = get_pdf_store()
+        try:
+            path = store.get_path(api_url)
+        except requests.exceptions.HTTPError as e:
+            self.stdout.write(f'Błąd pobierania {attachment} dla {bill.number}: {e.response.status_code}')
+            return None
+        
+        if attachment_format != 'pdf':
+            # Tekst prosto z XML-a dokumentu edytowalnego
+            try:
+                return extract_document_text(path, attachment_format)
+            except Exception as e:
+                self.stdout.write(f'Błąd odczytu {attachment}: {str(e)}')
+                return None
+        
+        # Spróbuj standardowego parsowania
+        text = self.parse_pdf_standard(path)
+        
+        # Jeśli brak tekstu, spróbuj OCR
+        if not text:
+            self.stdout.write(f'Brak tekstu w PDF, próba OCR...')
+            text = self.parse_pdf_ocr(path, store.get_content_hash(api_url), bill.sejm_id)
+        return text
+    
+    def parse_pdf_standard(self, pdf_path):
         """Standardowe parsowanie PDF"""
         try:
-            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                return text.strip() if text.strip() else None
+            text = "\n".join(page_text for _, page_text in iter_page_texts(pdf_path, FAST_BACKEND) if page_text)
+            return text.strip() if text.strip() else None
         except Exception as e:
             self.stdout.write(f'Błąd standardowego parsowania: {str(e)}')
             return None
     
-    def parse_pdf_ocr(self, pdf_content):
-        """Parsowanie PDF używając OCR"""
+    def parse_pdf_ocr(self, pdf_path, content_hash, print_number=None):
+        """Parsowanie PDF używając OCR (cache po treści pliku)"""
         try:
-            # Konwertuj PDF na obrazy (pierwsze 5 stron)
-            images = convert_from_bytes(pdf_content, first_page=1, last_page=5)
+            cache = OCRCache()
+            if print_number:
+                cache.set_alias(print_number, content_hash)
+            
+            # OCR pierwszych 5 stron
+            with open_document(pdf_path, FAST_BACKEND) as document:
+                page_count = min(len(document), 5)
             
             text = ""
-            for i, image in enumerate(images):
+            for i in range(page_count):
                 try:
-                    page_text = pytesseract.image_to_string(image, lang='pol')
-                    if page_text.strip():
+                    page_text = ocr_pdf_page(pdf_path, content_hash, i, cache)
+                    if page_text:
                         text += page_text + "\n"
                         self.stdout.write(f'OCR strona {i+1}: {len(page_text)} znaków')
                 except Exception as e:
@@ -0,0 +1,49 @@
+"""
+Zarządzanie lokalnym magazynem PDF-ów
+"""
+from django.core.management.base import BaseCommand
+from apps.bills.pdf_store import PDFBlobStore
+
+
+class Command(BaseCommand):
+    help = 'Zarządzanie magazynem PDF-ów'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Pokaż statystyki magazynu'
+        )
+        parser.add_argument(
+            '--fetch',
+            type=str,
+            metavar='URL',
+            help='Pobierz PDF do magazynu'
+        )
+        parser.add_argument(
+            '--clean-work',
+            type=int,
+            metavar='DAYS',
+            help='Usuń rozpakowane kopie robocze nieużywane od X dni'
+        )
+
+    def handle(self, *args, **options):
+        store = PDFBlobStore()
+
+        if options['fetch']:
+            sha256 = store.fetch(options['fetch'])
+            self.stdout.write(self.style.SUCCESS(f'PDF w magazynie: {sha256}'))
+
+        elif options['clean_work'] is not None:
+            deleted = store.clean_work_copies(options['clean_work'])
+            self.stdout.write(self.style.SUCCESS(f'Usunięto {deleted} kopii roboczych'))
+
+        elif options['stats']:
+            stats = store.get_stats()
+            self.stdout.write(f'Magazyn PDF - URL-e: {stats["urls"]}, Pliki: {stats["blobs"]}')
+            self.stdout.write(f'Rozmiar: {stats["size_mb"]} MB (na dysku: {stats["stored_size_mb"]} MB)')
+            self.stdout.write(f'Kopie robocze: {stats["work_size_mb"]} MB')
+            self.stdout.write(f'Katalog: {stats["store_dir"]}')
+
+        else:
+            self.stdout.write('Użyj --help aby zobaczyć dostępne opcje')
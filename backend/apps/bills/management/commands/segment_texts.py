@@ -0,0 +1,44 @@
+"""
+Zapisuje strukturę (drzewo artykułów, ustępów, punktów) dla tekstów druków i projektów
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from apps.bills.legal_structure import ensure_structure, iter_nodes
+from apps.bills.models import Bill, Print
+
+
+class Command(BaseCommand):
+    help = 'Parsuje strukturę tekstów druków i projektów ustaw, które jej nie mają lub mają nieaktualną'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maksymalna liczba rekordów każdego rodzaju'
+        )
+
+    def handle(self, *args, **options):
+        targets = [
+            ('druki', Print.objects.exclude(text=''), 'text'),
+            ('projekty', Bill.objects.exclude(full_text__isnull=True).exclude(full_text=''), 'full_text'),
+        ]
+        for name, queryset, text_field in targets:
+            if options['limit']:
+                queryset = queryset[:options['limit']]
+
+            start = time.perf_counter()
+            updated = nodes = chars = 0
+            for obj in queryset.iterator():
+                structure_before = obj.structure
+                structure = ensure_structure(obj, text_field)
+                if structure is not structure_before:
+                    updated += 1
+                    nodes += sum(1 for _ in iter_nodes(structure['nodes']))
+                    chars += structure['length']
+            elapsed = time.perf_counter() - start
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: zaktualizowano {updated} ({nodes} jednostek, {chars} znaków) w {elapsed:.1f} s'
+            ))
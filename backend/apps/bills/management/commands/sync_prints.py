@@ -0,0 +1,84 @@
+"""
+Zapisuje w bazie druki sejmowe (metadane, załączniki, tekst) dla głosowań
+"""
+from django.core.management.base import BaseCommand
+from apps.bills.models import Bill
+from apps.bills.prints import DEFAULT_TERM, extract_print_text, sync_bill_prints, sync_print
+
+
+class Command(BaseCommand):
+    help = 'Synchronizuje druki sejmowe z API Sejmu do bazy danych'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--print',
+            action='append',
+            dest='print_numbers',
+            metavar='NUMER',
+            help='Synchronizuj wybrany druk (można podać kilka razy)'
+        )
+        parser.add_argument(
+            '--bill-id',
+            type=int,
+            help='Synchronizuj druki wybranego głosowania'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maksymalna liczba głosowań do przetworzenia'
+        )
+        parser.add_argument(
+            '--term',
+            type=int,
+            default=DEFAULT_TERM,
+            help=f'Numer kadencji Sejmu (domyślnie {DEFAULT_TERM})'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Pobierz metadane i tekst ponownie (ze sprawdzeniem załączników na serwerze), także dla druków oznaczonych jako nieistniejące'
+        )
+        parser.add_argument(
+            '--no-text',
+            action='store_true',
+            help='Zapisz tylko metadane i listę załączników (bez wyciągania tekstu)'
+        )
+
+    def handle(self, *args, **options):
+        term = options['term']
+        force = options['force']
+        with_text = not options['no_text']
+
+        if options['print_numbers']:
+            for print_number in options['print_numbers']:
+                print_obj = sync_print(print_number, term, force=force)
+                if not print_obj.exists:
+                    self.stdout.write(self.style.WARNING(f'Druk {print_number} nie istnieje'))
+                    continue
+                if with_text:
+                    extract_print_text(print_obj, refresh=force)
+                self.stdout.write(self.style.SUCCESS(
+                    f'Druk {print_number}: {len(print_obj.attachments or [])} załączników, '
+                    f'{len(print_obj.text)} znaków ({print_obj.extraction_method or "brak tekstu"})'
+                ))
+            return
+
+        bills = Bill.objects.exclude(api_data__isnull=True).order_by('-created_at')
+        if options['bill_id']:
+            bills = bills.filter(id=options['bill_id'])
+        if options['limit']:
+            bills = bills[:options['limit']]
+
+        synced_count = 0
+        missing_count = 0
+        for bill in bills:
+            for print_obj in sync_bill_prints(bill, term=term, with_text=with_text, force=force):
+                if print_obj.exists:
+                    synced_count += 1
+                else:
+                    missing_count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Zsynchronizowano druków: {synced_count}, nieistniejących: {missing_count}'
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0012_clubcolor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Print',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.PositiveSmallIntegerField(default=10, verbose_name='Kadencja')),
+                ('number', models.CharField(max_length=20, verbose_name='Numer druku')),
+                ('title', models.CharField(blank=True, max_length=1000, verbose_name='Tytuł')),
+                ('metadata', models.JSONField(blank=True, help_text='Odpowiedź API Sejmu dla druku', null=True, verbose_name='Metadane')),
+                ('attachments', models.JSONField(blank=True, help_text='Lista załączników w kolejności preferencji (DOCX/ODT przed PDF)', null=True, verbose_name='Załączniki')),
+                ('text', models.TextField(blank=True, verbose_name='Tekst')),
+                ('text_budget', models.PositiveIntegerField(blank=True, help_text='Limit, z jakim wyciągnięto tekst (puste = pełny tekst)', null=True, verbose_name='Limit znaków')),
+                ('extraction_method', models.CharField(blank=True, choices=[('', 'Brak'), ('docx', 'DOCX'), ('odt', 'ODT'), ('pdf_text', 'PDF (warstwa tekstowa)'), ('pdf_ocr', 'PDF (OCR)')], default='', max_length=10, verbose_name='Metoda ekstrakcji')),
+                ('content_hash', models.CharField(blank=True, help_text='SHA-256 załącznika, z którego pochodzi tekst', max_length=64, verbose_name='Hash treści')),
+                ('text_extracted_at', models.DateTimeField(blank=True, null=True, verbose_name='Data ekstrakcji tekstu')),
+                ('exists', models.BooleanField(default=True, help_text='Fałsz, jeśli API Sejmu zwróciło 404', verbose_name='Istnieje')),
+                ('checked_at', models.DateTimeField(blank=True, null=True, verbose_name='Data sprawdzenia w API')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Druk sejmowy',
+                'verbose_name_plural': 'Druki sejmowe',
+                'ordering': ['term', 'number'],
+                'unique_together': {('term', 'number')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0013_print'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Deputy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(max_length=100, verbose_name='Imię')),
+                ('last_name', models.CharField(db_index=True, max_length=100, verbose_name='Nazwisko')),
+                ('club', models.CharField(blank=True, help_text='Klub z ostatniego zapisanego głosowania', max_length=100, verbose_name='Klub')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Poseł',
+                'verbose_name_plural': 'Posłowie',
+                'ordering': ['last_name', 'first_name'],
+                'unique_together': {('last_name', 'first_name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DeputyVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('club', models.CharField(db_index=True, help_text='Klub posła w chwili głosowania', max_length=100, verbose_name='Klub')),
+                ('vote', models.CharField(choices=[('ZA', 'Za'), ('PRZECIW', 'Przeciw'), ('WSTRZYMAŁ', 'Wstrzymał się'), ('NIE GŁOSOWAŁ', 'Nie głosował'), ('OBECNY', 'Obecny')], max_length=15, verbose_name='Głos')),
+                ('position', models.PositiveIntegerField(default=0, help_text='Kolejność posła w PDF-ie głosowania', verbose_name='Pozycja')),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deputy_votes', to='bills.bill', verbose_name='Głosowanie')),
+                ('deputy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='votes', to='bills.deputy', verbose_name='Poseł')),
+            ],
+            options={
+                'verbose_name': 'Głos posła',
+                'verbose_name_plural': 'Głosy posłów',
+                'ordering': ['bill', 'position'],
+                'indexes': [models.Index(fields=['bill', 'position'], name='bills_deput_bill_id_ce35d3_idx'), models.Index(fields=['deputy', 'bill'], name='bills_deput_deputy__e96d9f_idx')],
+                'unique_together': {('bill', 'deputy')},
+            },
+        ),
+    ]
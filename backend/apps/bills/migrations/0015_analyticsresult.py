@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0014_deputy_deputyvote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True, verbose_name='Analiza')),
+                ('data', models.JSONField(verbose_name='Wynik')),
+                ('votings', models.PositiveIntegerField(default=0, help_text='Liczba głosowań w macierzy użytej do wyliczeń', verbose_name='Liczba głosowań')),
+                ('duration_ms', models.FloatField(default=0, verbose_name='Czas wyliczeń [ms]')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Data przeliczenia')),
+            ],
+            options={
+                'verbose_name': 'Wynik analizy',
+                'verbose_name_plural': 'Wyniki analiz',
+                'ordering': ['key'],
+            },
+        ),
+    ]
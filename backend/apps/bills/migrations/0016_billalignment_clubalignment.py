@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0015_analyticsresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClubAlignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('club', models.CharField(max_length=100, unique=True, verbose_name='Klub')),
+                ('compared_votings', models.PositiveIntegerField(default=0, verbose_name='Porównane głosowania')),
+                ('aligned_votings', models.PositiveIntegerField(default=0, verbose_name='Zgodne głosowania')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Zgodność klubu z obywatelami',
+                'verbose_name_plural': 'Zgodność klubów z obywatelami',
+                'ordering': ['club'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BillAlignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('citizen_support', models.PositiveIntegerField(default=0, verbose_name='Obywatele za')),
+                ('citizen_against', models.PositiveIntegerField(default=0, verbose_name='Obywatele przeciw')),
+                ('citizen_neutral', models.PositiveIntegerField(default=0, verbose_name='Obywatele neutralni')),
+                ('citizen_position', models.CharField(blank=True, choices=[('', 'Brak / remis'), ('support', 'Za'), ('against', 'Przeciw')], max_length=10, verbose_name='Stanowisko obywateli')),
+                ('sejm_yes', models.PositiveIntegerField(default=0, verbose_name='Sejm za')),
+                ('sejm_no', models.PositiveIntegerField(default=0, verbose_name='Sejm przeciw')),
+                ('sejm_position', models.CharField(blank=True, choices=[('', 'Brak / remis'), ('support', 'Za'), ('against', 'Przeciw')], max_length=10, verbose_name='Stanowisko Sejmu')),
+                ('aligned', models.BooleanField(blank=True, db_index=True, help_text='Puste, gdy obywatele lub Sejm nie mają rozstrzygniętego stanowiska', null=True, verbose_name='Zgodność')),
+                ('club_matches', models.JSONField(blank=True, default=dict, help_text='Klub -> czy głosował tak jak obywatele', verbose_name='Zgodność klubów')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='alignment', to='bills.bill', verbose_name='Projekt ustawy')),
+            ],
+            options={
+                'verbose_name': 'Zgodność z obywatelami',
+                'verbose_name_plural': 'Zgodność z obywatelami',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0016_billalignment_clubalignment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMResponseCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 modelu, wersji szablonu promptu i wiadomości', max_length=64, unique=True, verbose_name='Klucz')),
+                ('model', models.CharField(max_length=100, verbose_name='Model')),
+                ('template_version', models.CharField(db_index=True, max_length=50, verbose_name='Wersja szablonu')),
+                ('response', models.TextField(verbose_name='Odpowiedź')),
+                ('tokens', models.PositiveIntegerField(default=0, help_text='Tokeny zużyte przy pierwszym (niezbuforowanym) wywołaniu', verbose_name='Zużyte tokeny')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Trafienia')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True, verbose_name='Ostatnie trafienie')),
+            ],
+            options={
+                'verbose_name': 'Odpowiedź AI (cache)',
+                'verbose_name_plural': 'Odpowiedzi AI (cache)',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bills', '0017_llmresponsecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'W kolejce'), ('running', 'W trakcie'), ('done', 'Zakończone'), ('failed', 'Nieudane')], db_index=True, default='queued', max_length=10, verbose_name='Status')),
+                ('stage', models.CharField(choices=[('queued', 'Oczekiwanie'), ('extraction', 'Pobieranie tekstu druków'), ('ocr', 'OCR skanów'), ('llm', 'Analiza AI'), ('save', 'Zapisywanie'), ('done', 'Gotowe')], default='queued', max_length=20, verbose_name='Etap')),
+                ('error', models.TextField(blank=True, verbose_name='Błąd')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Rozpoczęto')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Zakończono')),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_jobs', to='bills.bill', verbose_name='Projekt ustawy')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Zlecający')),
+            ],
+            options={
+                'verbose_name': 'Zadanie analizy AI',
+                'verbose_name_plural': 'Zadania analizy AI',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='analysisjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('bill',), name='unique_active_analysis_job'),
+        ),
+    ]
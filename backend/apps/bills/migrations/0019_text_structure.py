@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0018_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='structure',
+            field=models.JSONField(blank=True, default=dict, help_text='Drzewo jednostek pełnego tekstu (artykuły, ustępy, punkty) z zakresami znaków', verbose_name='Struktura tekstu'),
+        ),
+        migrations.AddField(
+            model_name='print',
+            name='structure',
+            field=models.JSONField(blank=True, default=dict, help_text='Drzewo jednostek tekstu (artykuły, ustępy, punkty, uzasadnienie) z zakresami znaków', verbose_name='Struktura tekstu'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0019_text_structure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='ai_analysis_source',
+            field=models.JSONField(blank=True, default=dict, help_text='Wersja promptu i teksty artykułów, na podstawie których wykonano analizę (do analizy przyrostowej)', verbose_name='Źródło analizy AI'),
+        ),
+    ]
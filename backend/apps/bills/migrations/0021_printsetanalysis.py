@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 22:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0020_bill_ai_analysis_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrintSetAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.PositiveSmallIntegerField(default=10, verbose_name='Kadencja')),
+                ('print_numbers', models.JSONField(default=list, help_text='Posortowane numery druków zestawu', verbose_name='Numery druków')),
+                ('key', models.CharField(help_text='Kadencja i posortowane numery druków, np. 10:321,322', max_length=255, unique=True, verbose_name='Klucz')),
+                ('analysis', models.JSONField(blank=True, null=True, verbose_name='Analiza AI')),
+                ('analysis_date', models.DateTimeField(blank=True, null=True, verbose_name='Data analizy AI')),
+                ('analysis_source', models.JSONField(blank=True, default=dict, help_text='Wersja promptu i teksty artykułów, na podstawie których wykonano analizę (do analizy przyrostowej)', verbose_name='Źródło analizy AI')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Analiza druków',
+                'verbose_name_plural': 'Analizy druków',
+                'ordering': ['term', 'key'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='print_set',
+            field=models.ForeignKey(blank=True, help_text='Wspólna analiza druków, których dotyczy głosowanie', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bills', to='bills.printsetanalysis', verbose_name='Analiza druków'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0021_printsetanalysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('ok', 'Poprawna'), ('error', 'Błąd')], db_index=True, default='ok', max_length=10, verbose_name='Status')),
+                ('error', models.TextField(blank=True, verbose_name='Błąd')),
+                ('mode', models.CharField(blank=True, help_text='full / incremental / unchanged', max_length=20, verbose_name='Tryb')),
+                ('model', models.CharField(blank=True, max_length=100, verbose_name='Model')),
+                ('total_seconds', models.FloatField(default=0, verbose_name='Czas całkowity [s]')),
+                ('stages', models.JSONField(blank=True, default=dict, help_text='metadata, download, text_layer, ocr, shortening, rate_limit, llm, other', verbose_name='Czasy etapów [s]')),
+                ('pages_ocr', models.PositiveIntegerField(default=0, verbose_name='Strony OCR')),
+                ('chars_in', models.PositiveIntegerField(default=0, verbose_name='Znaki tekstu projektu')),
+                ('chars_out', models.PositiveIntegerField(default=0, help_text='Tekst po skróceniu albo opis zmian (analiza przyrostowa)', verbose_name='Znaki wysłane do analizy')),
+                ('llm_calls', models.PositiveIntegerField(default=0, verbose_name='Zapytania do modelu')),
+                ('cache_hits', models.PositiveIntegerField(default=0, verbose_name='Trafienia cache odpowiedzi')),
+                ('prompt_tokens', models.PositiveIntegerField(default=0, verbose_name='Tokeny promptu')),
+                ('completion_tokens', models.PositiveIntegerField(default=0, verbose_name='Tokeny odpowiedzi')),
+                ('cost_usd', models.DecimalField(decimal_places=6, default=0, max_digits=10, verbose_name='Koszt [USD]')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_runs', to='bills.bill', verbose_name='Projekt ustawy')),
+                ('print_set', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_runs', to='bills.printsetanalysis', verbose_name='Analiza druków')),
+            ],
+            options={
+                'verbose_name': 'Przebieg analizy AI',
+                'verbose_name_plural': 'Przebiegi analizy AI',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:12
+
+from django.db import migrations, models
+
+
+def count_existing_misses(apps, schema_editor):
+    # Każdy istniejący wpis powstał z co najmniej jednego wywołania API
+    LLMResponseCache = apps.get_model('bills', 'LLMResponseCache')
+    LLMResponseCache.objects.update(misses=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0022_analysisrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='llmresponsecache',
+            name='misses',
+            field=models.PositiveIntegerField(default=0, help_text='Wywołania API zakończone zapisem tej odpowiedzi', verbose_name='Chybienia'),
+        ),
+        migrations.RunPython(count_existing_misses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bills', '0023_llmresponsecache_misses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='print',
+            name='predecessor',
+            field=models.ForeignKey(blank=True, help_text='Druk otwierający proces legislacyjny (processPrint), np. projekt dla sprawozdania komisji', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='successors', to='bills.print', verbose_name='Poprzedni druk'),
+        ),
+    ]
@@ -52,12 +52,15 @@ class Bill(models.Model):
     
     # Pełny tekst i załączniki
     full_text = models.TextField(blank=True, null=True, verbose_name="Pełny tekst", help_text="Pełny tekst projektu z załączników")
+    structure = models.JSONField(default=dict, blank=True, verbose_name="Struktura tekstu", help_text="Drzewo jednostek pełnego tekstu (artykuły, ustępy, punkty) z zakresami znaków")
     attachments = models.JSONField(blank=True, null=True, verbose_name="Załączniki", help_text="Lista załączników (PDF, DOCX)")
     attachment_files = models.JSONField(blank=True, null=True, verbose_name="Pliki załączników", help_text="Przechowywane pliki załączników")
     
     # Analiza AI
     ai_analysis = models.JSONField(blank=True, null=True, verbose_name="Analiza AI", help_text="Analiza projektu przez AI (zmiany, zagrożenia, korzyści)")
     ai_analysis_date = models.DateTimeField(blank=True, null=True, verbose_name="Data analizy AI", help_text="Kiedy została wykonana analiza AI")
+    ai_analysis_source = models.JSONField(default=dict, blank=True, verbose_name="Źródło analizy AI", help_text="Wersja promptu i teksty artykułów, na podstawie których wykonano analizę (do analizy przyrostowej)")
+    print_set = models.ForeignKey('PrintSetAnalysis', on_delete=models.SET_NULL, blank=True, null=True, related_name='bills', verbose_name="Analiza druków", help_text="Wspólna analiza druków, których dotyczy głosowanie")
     
     # Głosowania w Sejmie (nowe dane ze strony Sejmu)
     voting_date = models.CharField(max_length=50, blank=True, verbose_name="Data głosowania", help_text="Data głosowania w Sejmie")
@@ -143,6 +146,10 @@ class Bill(models.Model):
         self.neutral_votes = votes.filter(vote='neutral').count()
         self.total_votes = votes.count()
         self.save(update_fields=['support_votes', 'against_votes', 'neutral_votes', 'total_votes'])
+        
+        # Zgodność obywateli z Sejmem liczona przyrostowo dla tego projektu
+        from .alignment import update_bill_alignment
+        update_bill_alignment(self)
 
 
 class BillVote(models.Model):
@@ -214,3 +221,308 @@ class ClubColor(models.Model):
     
     def __str__(self):
         return f"{self.club_name} - {self.color_hex}"
+
+
+class Print(models.Model):
+    """Druk sejmowy z metadanymi z API Sejmu i wyciągniętym tekstem"""
+    
+    EXTRACTION_METHOD_CHOICES = [
+        ('', 'Brak'),
+        ('docx', 'DOCX'),
+        ('odt', 'ODT'),
+        ('pdf_text', 'PDF (warstwa tekstowa)'),
+        ('pdf_ocr', 'PDF (OCR)'),
+    ]
+    
+    term = models.PositiveSmallIntegerField(default=10, verbose_name="Kadencja")
+    number = models.CharField(max_length=20, verbose_name="Numer druku")
+    title = models.CharField(max_length=1000, blank=True, verbose_name="Tytuł")
+    metadata = models.JSONField(blank=True, null=True, verbose_name="Metadane", help_text="Odpowiedź API Sejmu dla druku")
+    attachments = models.JSONField(blank=True, null=True, verbose_name="Załączniki", help_text="Lista załączników w kolejności preferencji (DOCX/ODT przed PDF)")
+    predecessor = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, blank=True, null=True, related_name='successors',
+        verbose_name="Poprzedni druk", help_text="Druk otwierający proces legislacyjny (processPrint), np. projekt dla sprawozdania komisji"
+    )
+    
+    # Wyciągnięty tekst
+    text = models.TextField(blank=True, verbose_name="Tekst")
+    text_budget = models.PositiveIntegerField(blank=True, null=True, verbose_name="Limit znaków", help_text="Limit, z jakim wyciągnięto tekst (puste = pełny tekst)")
+    extraction_method = models.CharField(max_length=10, choices=EXTRACTION_METHOD_CHOICES, blank=True, default='', verbose_name="Metoda ekstrakcji")
+    content_hash = models.CharField(max_length=64, blank=True, verbose_name="Hash treści", help_text="SHA-256 załącznika, z którego pochodzi tekst")
+    text_extracted_at = models.DateTimeField(blank=True, null=True, verbose_name="Data ekstrakcji tekstu")
+    structure = models.JSONField(default=dict, blank=True, verbose_name="Struktura tekstu", help_text="Drzewo jednostek tekstu (artykuły, ustępy, punkty, uzasadnienie) z zakresami znaków")
+    
+    # Negatywny cache - druki nieznane API Sejmu
+    exists = models.BooleanField(default=True, verbose_name="Istnieje", help_text="Fałsz, jeśli API Sejmu zwróciło 404")
+    checked_at = models.DateTimeField(blank=True, null=True, verbose_name="Data sprawdzenia w API")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Druk sejmowy"
+        verbose_name_plural = "Druki sejmowe"
+        unique_together = ['term', 'number']
+        ordering = ['term', 'number']
+    
+    def __str__(self):
+        return f"Druk {self.number} (kadencja {self.term})"
+
+
+class PrintSetAnalysis(models.Model):
+    """
+    Analiza AI zestawu druków - jedna dla wszystkich głosowań nad tymi samymi drukami
+    
+    Drugie czytanie, poprawki i głosowanie nad całością mają w tytułach te same
+    numery druków; analiza wykonywana jest raz dla zestawu (klucz: kadencja
+    i posortowane numery), a głosowania (Bill.print_set) dostają jej kopię.
+    """
+    
+    term = models.PositiveSmallIntegerField(default=10, verbose_name="Kadencja")
+    print_numbers = models.JSONField(default=list, verbose_name="Numery druków", help_text="Posortowane numery druków zestawu")
+    key = models.CharField(max_length=255, unique=True, verbose_name="Klucz", help_text="Kadencja i posortowane numery druków, np. 10:321,322")
+    analysis = models.JSONField(blank=True, null=True, verbose_name="Analiza AI")
+    analysis_date = models.DateTimeField(blank=True, null=True, verbose_name="Data analizy AI")
+    analysis_source = models.JSONField(default=dict, blank=True, verbose_name="Źródło analizy AI", help_text="Wersja promptu i teksty artykułów, na podstawie których wykonano analizę (do analizy przyrostowej)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Analiza druków"
+        verbose_name_plural = "Analizy druków"
+        ordering = ['term', 'key']
+    
+    def __str__(self):
+        return f"Druki {', '.join(self.print_numbers)} (kadencja {self.term})"
+
+
+class Deputy(models.Model):
+    """Poseł rozpoznany w wynikach głosowań (imię i nazwisko jak w PDF-ach Sejmu)"""
+    
+    first_name = models.CharField(max_length=100, verbose_name="Imię")
+    last_name = models.CharField(max_length=100, db_index=True, verbose_name="Nazwisko")
+    club = models.CharField(max_length=100, blank=True, verbose_name="Klub", help_text="Klub z ostatniego zapisanego głosowania")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Poseł"
+        verbose_name_plural = "Posłowie"
+        unique_together = ['last_name', 'first_name']
+        ordering = ['last_name', 'first_name']
+    
+    def __str__(self):
+        return f"{self.last_name} {self.first_name} ({self.club})"
+
+
+class DeputyVote(models.Model):
+    """Głos posła w głosowaniu Sejmu (sparsowany z PDF-a przy imporcie)"""
+    
+    VOTE_CHOICES = [
+        ('ZA', 'Za'),
+        ('PRZECIW', 'Przeciw'),
+        ('WSTRZYMAŁ', 'Wstrzymał się'),
+        ('NIE GŁOSOWAŁ', 'Nie głosował'),
+        ('OBECNY', 'Obecny'),
+    ]
+    
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='deputy_votes', verbose_name="Głosowanie")
+    deputy = models.ForeignKey(Deputy, on_delete=models.CASCADE, related_name='votes', verbose_name="Poseł")
+    club = models.CharField(max_length=100, db_index=True, verbose_name="Klub", help_text="Klub posła w chwili głosowania")
+    vote = models.CharField(max_length=15, choices=VOTE_CHOICES, verbose_name="Głos")
+    position = models.PositiveIntegerField(default=0, verbose_name="Pozycja", help_text="Kolejność posła w PDF-ie głosowania")
+    
+    class Meta:
+        verbose_name = "Głos posła"
+        verbose_name_plural = "Głosy posłów"
+        unique_together = ['bill', 'deputy']
+        ordering = ['bill', 'position']
+        indexes = [
+            models.Index(fields=['bill', 'position']),
+            models.Index(fields=['deputy', 'bill']),
+        ]
+    
+    def __str__(self):
+        return f"{self.deputy.last_name} {self.deputy.first_name} - {self.bill.number}: {self.vote}"
+
+
+class AnalyticsResult(models.Model):
+    """Przeliczony wynik analizy głosowań (spójność klubów, buntownicy, zgodność klubów)"""
+    
+    key = models.CharField(max_length=50, unique=True, verbose_name="Analiza")
+    data = models.JSONField(verbose_name="Wynik")
+    votings = models.PositiveIntegerField(default=0, verbose_name="Liczba głosowań", help_text="Liczba głosowań w macierzy użytej do wyliczeń")
+    duration_ms = models.FloatField(default=0, verbose_name="Czas wyliczeń [ms]")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Data przeliczenia")
+    
+    class Meta:
+        verbose_name = "Wynik analizy"
+        verbose_name_plural = "Wyniki analiz"
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key} ({self.votings} głosowań)"
+
+
+class BillAlignment(models.Model):
+    """Porównanie głosów obywateli z wynikiem głosowania w Sejmie dla projektu"""
+    
+    POSITION_CHOICES = [
+        ('', 'Brak / remis'),
+        ('support', 'Za'),
+        ('against', 'Przeciw'),
+    ]
+    
+    bill = models.OneToOneField(Bill, on_delete=models.CASCADE, related_name='alignment', verbose_name="Projekt ustawy")
+    citizen_support = models.PositiveIntegerField(default=0, verbose_name="Obywatele za")
+    citizen_against = models.PositiveIntegerField(default=0, verbose_name="Obywatele przeciw")
+    citizen_neutral = models.PositiveIntegerField(default=0, verbose_name="Obywatele neutralni")
+    citizen_position = models.CharField(max_length=10, choices=POSITION_CHOICES, blank=True, verbose_name="Stanowisko obywateli")
+    sejm_yes = models.PositiveIntegerField(default=0, verbose_name="Sejm za")
+    sejm_no = models.PositiveIntegerField(default=0, verbose_name="Sejm przeciw")
+    sejm_position = models.CharField(max_length=10, choices=POSITION_CHOICES, blank=True, verbose_name="Stanowisko Sejmu")
+    aligned = models.BooleanField(blank=True, null=True, db_index=True, verbose_name="Zgodność", help_text="Puste, gdy obywatele lub Sejm nie mają rozstrzygniętego stanowiska")
+    club_matches = models.JSONField(default=dict, blank=True, verbose_name="Zgodność klubów", help_text="Klub -> czy głosował tak jak obywatele")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Zgodność z obywatelami"
+        verbose_name_plural = "Zgodność z obywatelami"
+    
+    def __str__(self):
+        return f"{self.bill.number}: obywatele {self.citizen_position or '-'}, Sejm {self.sejm_position or '-'}"
+
+
+class ClubAlignment(models.Model):
+    """Jak często klub głosuje tak, jak większość obywateli (liczniki aktualizowane przyrostowo)"""
+    
+    club = models.CharField(max_length=100, unique=True, verbose_name="Klub")
+    compared_votings = models.PositiveIntegerField(default=0, verbose_name="Porównane głosowania")
+    aligned_votings = models.PositiveIntegerField(default=0, verbose_name="Zgodne głosowania")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Zgodność klubu z obywatelami"
+        verbose_name_plural = "Zgodność klubów z obywatelami"
+        ordering = ['club']
+    
+    def __str__(self):
+        return f"{self.club}: {self.aligned_votings}/{self.compared_votings}"
+    
+    @property
+    def alignment_rate(self):
+        if self.compared_votings == 0:
+            return None
+        return round(self.aligned_votings / self.compared_votings, 4)
+
+
+class LLMResponseCache(models.Model):
+    """Zapisana odpowiedź modelu językowego dla danego wejścia (klucz = hash modelu, wersji promptu i treści)"""
+    
+    key = models.CharField(max_length=64, unique=True, verbose_name="Klucz", help_text="SHA-256 modelu, wersji szablonu promptu i wiadomości")
+    model = models.CharField(max_length=100, verbose_name="Model")
+    template_version = models.CharField(max_length=50, db_index=True, verbose_name="Wersja szablonu")
+    response = models.TextField(verbose_name="Odpowiedź")
+    tokens = models.PositiveIntegerField(default=0, verbose_name="Zużyte tokeny", help_text="Tokeny zużyte przy pierwszym (niezbuforowanym) wywołaniu")
+    hits = models.PositiveIntegerField(default=0, verbose_name="Trafienia")
+    misses = models.PositiveIntegerField(default=0, verbose_name="Chybienia", help_text="Wywołania API zakończone zapisem tej odpowiedzi")
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(blank=True, null=True, verbose_name="Ostatnie trafienie")
+    
+    class Meta:
+        verbose_name = "Odpowiedź AI (cache)"
+        verbose_name_plural = "Odpowiedzi AI (cache)"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.template_version} / {self.model}: {self.key[:12]} ({self.hits} trafień)"
+
+
+class AnalysisJob(models.Model):
+    """Zadanie wygenerowania analizy AI projektu, wykonywane w tle"""
+    
+    STATUS_CHOICES = [
+        ('queued', 'W kolejce'),
+        ('running', 'W trakcie'),
+        ('done', 'Zakończone'),
+        ('failed', 'Nieudane'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    STAGE_CHOICES = [
+        ('queued', 'Oczekiwanie'),
+        ('extraction', 'Pobieranie tekstu druków'),
+        ('ocr', 'OCR skanów'),
+        ('llm', 'Analiza AI'),
+        ('save', 'Zapisywanie'),
+        ('done', 'Gotowe'),
+    ]
+    
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='analysis_jobs', verbose_name="Projekt ustawy")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='analysis_jobs', verbose_name="Zlecający")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', db_index=True, verbose_name="Status")
+    stage = models.CharField(max_length=20, choices=STAGE_CHOICES, default='queued', verbose_name="Etap")
+    error = models.TextField(blank=True, verbose_name="Błąd")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="Rozpoczęto")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="Zakończono")
+    
+    class Meta:
+        verbose_name = "Zadanie analizy AI"
+        verbose_name_plural = "Zadania analizy AI"
+        ordering = ['-created_at']
+        constraints = [
+            # Co najwyżej jedno aktywne zadanie na projekt - kolejne żądania dołączają do niego
+            models.UniqueConstraint(
+                fields=['bill'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_analysis_job'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.bill.number}: {self.get_status_display()} ({self.get_stage_display()})"
+    
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+
+class AnalysisRun(models.Model):
+    """Telemetria jednego przebiegu analizy AI: czasy etapów, tokeny, koszt"""
+    
+    STATUS_CHOICES = [
+        ('ok', 'Poprawna'),
+        ('error', 'Błąd'),
+    ]
+    
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='analysis_runs', verbose_name="Projekt ustawy")
+    print_set = models.ForeignKey(PrintSetAnalysis, on_delete=models.SET_NULL, blank=True, null=True, related_name='analysis_runs', verbose_name="Analiza druków")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ok', db_index=True, verbose_name="Status")
+    error = models.TextField(blank=True, verbose_name="Błąd")
+    mode = models.CharField(max_length=20, blank=True, verbose_name="Tryb", help_text="full / incremental / unchanged")
+    model = models.CharField(max_length=100, blank=True, verbose_name="Model")
+    
+    total_seconds = models.FloatField(default=0, verbose_name="Czas całkowity [s]")
+    stages = models.JSONField(default=dict, blank=True, verbose_name="Czasy etapów [s]", help_text="metadata, download, text_layer, ocr, shortening, rate_limit, llm, other")
+    pages_ocr = models.PositiveIntegerField(default=0, verbose_name="Strony OCR")
+    chars_in = models.PositiveIntegerField(default=0, verbose_name="Znaki tekstu projektu")
+    chars_out = models.PositiveIntegerField(default=0, verbose_name="Znaki wysłane do analizy", help_text="Tekst po skróceniu albo opis zmian (analiza przyrostowa)")
+    llm_calls = models.PositiveIntegerField(default=0, verbose_name="Zapytania do modelu")
+    cache_hits = models.PositiveIntegerField(default=0, verbose_name="Trafienia cache odpowiedzi")
+    prompt_tokens = models.PositiveIntegerField(default=0, verbose_name="Tokeny promptu")
+    completion_tokens = models.PositiveIntegerField(default=0, verbose_name="Tokeny odpowiedzi")
+    cost_usd = models.DecimalField(max_digits=10, decimal_places=6, default=0, verbose_name="Koszt [USD]")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = "Przebieg analizy AI"
+        verbose_name_plural = "Przebiegi analizy AI"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.bill.number}: {self.mode or self.status} ({self.total_seconds:.1f} s, {self.cost_usd} USD)"
+    
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
@@ -0,0 +1,249 @@
+"""
+Lokalny serwer zgodny z API chat.completions OpenAI - do testów i benchmarków bez klucza
+
+Odpowiada na POST /v1/chat/completions (i GET /v1/models) deterministycznymi
+odpowiedziami: analizą w formacie oczekiwanym przez AIAnalysisService
+(sekcje O CZYM JEST / DOBRE STRONY / ZAGROŻENIA), streszczeniem fragmentu
+dla etapu map albo stałą treścią z pliku. Opóźnienie, odsetek błędów 500
+i odpowiedzi 429 (losowe albo po przekroczeniu limitu zapytań na minutę)
+są konfigurowalne, więc współbieżność, ponawianie zapytań i cache
+odpowiedzi można mierzyć offline.
+
+Użycie: OPENAI_BASE_URL=http://127.0.0.1:8089/v1 i dowolny OPENAI_API_KEY.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Moduł nie importuje Django (ani apps.bills.llm, który ładuje modele) - serwer
+# można uruchomić przed django.setup(), np. w osobnym procesie benchmarku.
+# Przybliżenie liczby tokenów takie samo jak w apps.bills.llm
+CHARS_PER_TOKEN = 3
+
+ANALYSIS_MARKER = '**O CZYM JEST TEN PROJEKT:**'
+TITLE_PATTERN = re.compile(r'projektu ustawy "([^"]*)"|TYTUŁ PROJEKTU: (.*)')
+CHUNK_MARKER = 'Poniżej znajduje się fragment projektu ustawy'
+
+
+def estimate_tokens(text):
+    """Szacunkowa liczba tokenów tekstu"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class StubStats:
+    """Liczniki zapytań serwera (bezpieczne wątkowo)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0, 'tokens': 0}
+
+    def add(self, **values):
+        with self._lock:
+            for key, value in values.items():
+                self.counts[key] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+class StubBehaviour:
+    """
+    Zachowanie serwera: opóźnienia, błędy, limity i treść odpowiedzi
+
+    Args:
+        latency: Stałe opóźnienie odpowiedzi (s)
+        jitter: Losowe dodatkowe opóźnienie 0..jitter (s)
+        latency_per_token: Opóźnienie na wygenerowany token (s) - symulacja generowania
+        error_rate: Odsetek odpowiedzi 500 (0-1)
+        rate_limit_rate: Odsetek losowych odpowiedzi 429 (0-1)
+        rpm: Limit zapytań na minutę - nadmiarowe dostają 429 z Retry-After (0 = bez limitu)
+        response: Stała treść odpowiedzi (zamiast szablonu)
+        seed: Ziarno generatora losowego (powtarzalne przebiegi)
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, latency=0.0, jitter=0.0, latency_per_token=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, rpm=0, response=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_token = latency_per_token
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.response = response
+        self._random = random.Random(seed)
+        self._requests = deque()
+        self._lock = threading.Lock()
+
+    def decide(self):
+        """
+        Wynik kolejnego zapytania: ('ok' | 'rate_limited' | 'error', retry_after, opóźnienie)
+        """
+        with self._lock:
+            now = time.monotonic()
+            while self._requests and now - self._requests[0] >= self.WINDOW:
+                self._requests.popleft()
+            if self.rpm and len(self._requests) >= self.rpm:
+                return 'rate_limited', self.WINDOW - (now - self._requests[0]), 0.0
+            self._requests.append(now)
+
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 'rate_limited', 1.0, 0.0
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 'error', None, delay
+        return 'ok', None, delay
+
+    def completion_text(self, messages, max_tokens):
+        """Treść odpowiedzi - stała albo z szablonu zależnego od rodzaju promptu"""
+        if self.response is not None:
+            return self.response
+
+        prompt = messages[-1].get('content', '') if messages else ''
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        title_match = TITLE_PATTERN.search(prompt)
+        title = (title_match.group(1) or title_match.group(2)).strip() if title_match else 'projekt'
+
+        if ANALYSIS_MARKER not in prompt and CHUNK_MARKER in prompt:
+            text = (
+                f"Streszczenie fragmentu projektu [{digest}]: "
+                f"fragment zmienia przepisy, określa terminy i nowe obowiązki."
+            )
+        else:
+            text = (
+                f"{ANALYSIS_MARKER}\n"
+                f"Projekt \"{title}\" wprowadza zmiany w przepisach [{digest}].\n\n"
+                f"**DOBRE STRONY PROJEKTU:**\n"
+                f"- Porządkuje obowiązujące regulacje.\n\n"
+                f"**ZAGROŻENIA Z PROJEKTU:**\n"
+                f"- Koszty wdrożenia dla administracji."
+            )
+        # Odpowiedź nie dłuższa niż max_tokens (jak w prawdziwym API)
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+
+def build_completion(model, messages, content):
+    prompt_tokens = sum(estimate_tokens(message.get('content', '')) for message in messages)
+    completion_tokens = estimate_tokens(content)
+    return {
+        'id': f"chatcmpl-stub-{hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Obsługa zapytań - zachowanie i liczniki w atrybutach serwera"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, error_type, code=None, headers=None):
+        self.send_json(status, {'error': {'message': message, 'type': error_type, 'param': None, 'code': code}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self.send_json(200, {'object': 'list', 'data': [
+                {'id': self.server.model, 'object': 'model', 'created': 0, 'owned_by': 'stub'}
+            ]})
+        else:
+            self.send_error_json(404, f'Nieznana ścieżka {self.path}', 'invalid_request_error')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_error_json(400, 'Niepoprawny JSON', 'invalid_request_error')
+            return
+
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error_json(404, f'Nieznana ścieżka {self.path}', 'invalid_request_error')
+            return
+
+        stats = self.server.stats
+        behaviour = self.server.behaviour
+        stats.add(requests=1)
+        outcome, retry_after, delay = behaviour.decide()
+
+        if outcome == 'rate_limited':
+            stats.add(rate_limited=1)
+            self.send_error_json(
+                429, 'Rate limit reached for requests (stub)', 'requests', code='rate_limit_exceeded',
+                headers={'Retry-After': f'{max(retry_after, 0.0):.2f}'}
+            )
+            return
+
+        messages = payload.get('messages') or []
+        content = behaviour.completion_text(messages, payload.get('max_tokens') or 1000)
+        completion = build_completion(payload.get('model') or self.server.model, messages, content)
+        time.sleep(delay + behaviour.latency_per_token * completion['usage']['completion_tokens'])
+
+        if outcome == 'error':
+            stats.add(errors=1)
+            self.send_error_json(500, 'The server had an error while processing your request (stub)', 'server_error')
+            return
+
+        stats.add(ok=1, tokens=completion['usage']['total_tokens'])
+        self.send_json(200, completion)
+
+
+def create_stub_server(host='127.0.0.1', port=8089, model='gpt-3.5-turbo', verbose=False, **behaviour):
+    """
+    Tworzy serwer stub (ThreadingHTTPServer - każde zapytanie w osobnym wątku)
+
+    Port 0 wybiera wolny port (server.server_address). Pozostałe argumenty
+    trafiają do StubBehaviour.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.model = model
+    server.verbose = verbose
+    server.behaviour = StubBehaviour(**behaviour)
+    server.stats = StubStats()
+    return server
+
+
+def start_stub_server(**options):
+    """
+    Uruchamia serwer stub w wątku w tle (np. w skrypcie benchmarku)
+
+    Returns:
+        tuple: (serwer, base_url) - zatrzymanie: server.shutdown()
+    """
+    server = create_stub_server(**options)
+    threading.Thread(target=server.serve_forever, name='openai-stub', daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f'http://{host}:{port}/v1'
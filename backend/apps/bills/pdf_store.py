@@ -0,0 +1,386 @@
+"""
+Lokalny magazyn PDF-ów adresowany treścią (SHA-256)
+
+Każdy PDF (druki, wyniki głosowań) pobierany jest raz - niezależnie od tego,
+która ścieżka kodu i który proces go potrzebuje. Indeks SQLite mapuje URL na
+hash treści, pliki trzymane są skompresowane (gdy to się opłaca), a pobieranie
+jest chronione blokadą pliku, więc równoległe procesy nie ściągają tego samego
+pliku kilka razy.
+
+Pobieranie i kompresja działają strumieniowo (po kawałkach), a konsumenci
+dostają ścieżkę do pliku lub mmap - PDF nigdy nie ląduje w całości na stercie.
+Skompresowane pliki rozpakowywane są na żądanie do katalogu roboczego, którego
+rozmiar ograniczony jest przez PDF_STORE_WORK_MAX_MB (usuwane są kopie
+najdawniej używane według last_access z indeksu, a nie atime systemu plików).
+Załączniki DOCX/ODT trzymane są z własnym rozszerzeniem.
+
+Wpis URL -> hash jest ponownie sprawdzany warunkowym GET-em (ETag /
+Last-Modified) po PDF_STORE_REVALIDATE_SECONDS albo na żądanie (refresh) -
+druk wydany ponownie pod tym samym adresem dostaje nowy hash, co unieważnia
+wyciągnięty z niego tekst i cache OCR.
+"""
+import fcntl
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_PATTERN = re.compile(r'^[a-z0-9]{1,5}$')
+
+
+def url_extension(url):
+    """Rozszerzenie pliku z URL-a (pdf, docx, odt...) - domyślnie pdf"""
+    extension = os.path.splitext(urlparse(url).path)[1].lstrip('.').lower()
+    return extension if EXTENSION_PATTERN.match(extension) else 'pdf'
+
+
+class PDFBlobStore:
+    """Magazyn PDF-ów z indeksem URL -> SHA-256"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS urls (
+            url TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            etag TEXT,
+            last_modified TEXT
+        );
+        CREATE INDEX IF NOT EXISTS urls_sha256 ON urls(sha256);
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            compressed INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            extension TEXT NOT NULL DEFAULT 'pdf'
+        );
+    """
+
+    # Kompresujemy tylko gdy zysk jest wyraźny (PDF-y zwykle mają już skompresowane strumienie)
+    MIN_COMPRESSION_GAIN = 0.1
+    CHUNK_SIZE = 1024 * 1024
+    # Kopie robocze używane w ostatnich sekundach nie są usuwane (ścieżka mogła właśnie trafić do czytelnika)
+    WORK_GRACE_SECONDS = 300
+
+    def __init__(self, store_dir=None, timeout=60, revalidate_after=None, work_max_bytes=None):
+        self.store_dir = str(store_dir or settings.PDF_STORE_DIR)
+        self.timeout = timeout
+        # Limit rozmiaru katalogu roboczego z rozpakowanymi kopiami (0 = bez limitu)
+        self.work_max_bytes = (
+            settings.PDF_STORE_WORK_MAX_MB * 1024 * 1024 if work_max_bytes is None else work_max_bytes
+        )
+        # Po ilu sekundach wpis URL -> hash jest sprawdzany ponownie (0 = tylko przy refresh)
+        self.revalidate_after = (
+            settings.PDF_STORE_REVALIDATE_SECONDS if revalidate_after is None else revalidate_after
+        )
+        for subdir in ('blobs', 'work', 'locks', 'tmp'):
+            os.makedirs(os.path.join(self.store_dir, subdir), exist_ok=True)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.store_dir, 'index.sqlite3'), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            # Indeksy sprzed dodania walidatorów HTTP
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(urls)')}
+            for column in ('etag', 'last_modified'):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE urls ADD COLUMN {column} TEXT')
+            # Indeksy sprzed zapisywania rozszerzeń - wszystkie pliki były PDF-ami
+            if 'extension' not in {row[1] for row in conn.execute('PRAGMA table_info(blobs)')}:
+                conn.execute("ALTER TABLE blobs ADD COLUMN extension TEXT NOT NULL DEFAULT 'pdf'")
+            self._local.conn = conn
+        return conn
+
+    def _blob_path(self, sha256, compressed, extension='pdf'):
+        suffix = f'.{extension}.gz' if compressed else f'.{extension}'
+        return os.path.join(self.store_dir, 'blobs', sha256[:2], sha256 + suffix)
+
+    def _work_path(self, sha256, extension='pdf'):
+        return os.path.join(self.store_dir, 'work', f'{sha256}.{extension}')
+
+    @contextmanager
+    def _lock(self, url):
+        """Blokada pliku - działa między wątkami i procesami"""
+        name = hashlib.md5(url.encode('utf-8')).hexdigest()
+        with open(os.path.join(self.store_dir, 'locks', name + '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _lookup(self, url):
+        """Zwraca (sha256, compressed, extension) dla URL-a, jeśli plik jest w magazynie"""
+        row = self._connection().execute(
+            """
+            SELECT blobs.sha256, blobs.compressed, blobs.extension FROM urls
+            JOIN blobs ON blobs.sha256 = urls.sha256
+            WHERE urls.url = ?
+            """,
+            (url,)
+        ).fetchone()
+        if row and os.path.exists(self._blob_path(row[0], row[1], row[2])):
+            return row[0], bool(row[1]), row[2]
+        return None
+
+    def _validators(self, url):
+        """Zwraca (fetched_at, etag, last_modified) wpisu URL-a"""
+        return self._connection().execute(
+            'SELECT fetched_at, etag, last_modified FROM urls WHERE url = ?', (url,)
+        ).fetchone() or (0, None, None)
+
+    def _is_fresh(self, url):
+        if not self.revalidate_after:
+            return True
+        return time.time() - self._validators(url)[0] < self.revalidate_after
+
+    def fetch(self, url, refresh=False):
+        """
+        Zapewnia, że PDF spod URL-a jest w magazynie i zwraca jego SHA-256
+
+        Args:
+            url: Adres PDF-a
+            refresh: Sprawdź plik na serwerze (warunkowy GET) nawet jeśli wpis jest świeży
+        """
+        if not refresh:
+            found = self._lookup(url)
+            if found and self._is_fresh(url):
+                self._touch(found[0])
+                return found[0]
+
+        with self._lock(url):
+            found = self._lookup(url)
+            # Inny proces mógł pobrać albo sprawdzić plik w czasie oczekiwania na blokadę
+            if found and not refresh and self._is_fresh(url):
+                self._touch(found[0])
+                return found[0]
+            if found:
+                return self._revalidate(url, found[0])
+            return self._download(url)
+
+    def _revalidate(self, url, sha256):
+        """Warunkowy GET - 304 potwierdza zapisany plik, 200 zapisuje nową wersję"""
+        _, etag, last_modified = self._validators(url)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            return self._download(url, headers=headers, current_sha256=sha256)
+        except requests.RequestException as e:
+            # Bez sieci zostaje zapisana wersja - sprawdzimy ją przy następnej okazji
+            logger.warning(f"Nie udało się sprawdzić aktualności {url}: {str(e)}")
+            self._touch(sha256)
+            return sha256
+
+    def _tmp_file(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.store_dir, 'tmp'))
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def _download(self, url, headers=None, current_sha256=None):
+        logger.info(f"Pobieram PDF do magazynu: {url}")
+        digest = hashlib.sha256()
+        size = 0
+        out, tmp_path = self._tmp_file()
+        try:
+            with out, requests.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and current_sha256:
+                    self._save_url(url, current_sha256, response)
+                    return current_sha256
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    out.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            self._store(sha256, tmp_path, size, url_extension(url))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if current_sha256 and sha256 != current_sha256:
+            logger.info(f"Nowa wersja PDF-a pod {url}")
+        self._save_url(url, sha256, response)
+        return sha256
+
+    def _save_url(self, url, sha256, response):
+        """Zapisuje wpis URL -> hash z walidatorami HTTP odpowiedzi"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO urls (url, sha256, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    sha256 = excluded.sha256, fetched_at = excluded.fetched_at,
+                    etag = COALESCE(excluded.etag, urls.etag),
+                    last_modified = COALESCE(excluded.last_modified, urls.last_modified)
+                """,
+                (url, sha256, time.time(), response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            )
+
+    def _store(self, sha256, raw_path, size, extension='pdf'):
+        """Przenosi pobrany plik do magazynu pod jego hashem (jeśli jeszcze go nie ma)"""
+        conn = self._connection()
+        row = conn.execute('SELECT compressed, extension FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()
+        if row and os.path.exists(self._blob_path(sha256, row[0], row[1])):
+            return
+
+        out, packed_path = self._tmp_file()
+        with out, open(raw_path, 'rb') as src, gzip.GzipFile(fileobj=out, mode='wb', compresslevel=6) as gz:
+            shutil.copyfileobj(src, gz, self.CHUNK_SIZE)
+        stored_size = os.path.getsize(packed_path)
+        compressed = stored_size < size * (1 - self.MIN_COMPRESSION_GAIN)
+
+        blob_path = self._blob_path(sha256, compressed, extension)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        if compressed:
+            # Oryginał usuwa _download - kopia robocza powstaje dopiero przy get_path
+            os.replace(packed_path, blob_path)
+        else:
+            os.remove(packed_path)
+            os.replace(raw_path, blob_path)
+            stored_size = size
+
+        now = time.time()
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO blobs (sha256, size, stored_size, compressed, created_at, last_access, extension)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (sha256, size, stored_size, int(compressed), now, now, extension)
+            )
+
+    def _touch(self, sha256):
+        conn = self._connection()
+        with conn:
+            conn.execute('UPDATE blobs SET last_access = ? WHERE sha256 = ?', (time.time(), sha256))
+
+    def get_content_hash(self, url, refresh=False):
+        """Zwraca SHA-256 PDF-a spod URL-a (pobierając go w razie potrzeby)"""
+        return self.fetch(url, refresh=refresh)
+
+    def get_path(self, url, refresh=False):
+        """Zwraca ścieżkę do nieskompresowanego pliku"""
+        sha256 = self.fetch(url, refresh=refresh)
+        found = self._lookup(url)
+        compressed, extension = (found[1], found[2]) if found else (False, url_extension(url))
+        if not compressed:
+            return self._blob_path(sha256, False, extension)
+
+        # Skompresowane pliki rozpakowujemy do katalogu roboczego (raz, do usunięcia przez limit rozmiaru)
+        work_path = self._work_path(sha256, extension)
+        if not os.path.exists(work_path):
+            with self._lock(sha256):
+                if not os.path.exists(work_path):
+                    out, tmp_path = self._tmp_file()
+                    with out, gzip.open(self._blob_path(sha256, True, extension), 'rb') as src:
+                        shutil.copyfileobj(src, out, self.CHUNK_SIZE)
+                    os.replace(tmp_path, work_path)
+            self._evict_work_copies()
+        return work_path
+
+    @contextmanager
+    def open_mmap(self, url):
+        """Udostępnia PDF jako mmap (tylko do odczytu)"""
+        with open(self.get_path(url), 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapped
+            finally:
+                mapped.close()
+
+    def _work_copies(self):
+        """Kopie robocze od najdawniej używanej: (last_access z indeksu, rozmiar, ścieżka)"""
+        work_dir = os.path.join(self.store_dir, 'work')
+        last_access = dict(self._connection().execute('SELECT sha256, last_access FROM blobs'))
+        copies = []
+        for filename in os.listdir(work_dir):
+            file_path = os.path.join(work_dir, filename)
+            try:
+                size = os.path.getsize(file_path)
+            except FileNotFoundError:
+                continue
+            copies.append((last_access.get(filename.split('.', 1)[0], 0), size, file_path))
+        return sorted(copies)
+
+    def _remove_work_copy(self, file_path):
+        try:
+            os.remove(file_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _evict_work_copies(self):
+        """Usuwa najdawniej używane kopie robocze ponad limit rozmiaru katalogu"""
+        if not self.work_max_bytes:
+            return 0
+        copies = self._work_copies()
+        total = sum(size for _, size, _ in copies)
+        grace_cutoff = time.time() - self.WORK_GRACE_SECONDS
+        deleted_count = 0
+        for accessed, size, file_path in copies:
+            if total <= self.work_max_bytes or accessed >= grace_cutoff:
+                break
+            if self._remove_work_copy(file_path):
+                deleted_count += 1
+            total -= size
+        return deleted_count
+
+    def clean_work_copies(self, days=7):
+        """Usuwa rozpakowane kopie robocze nieużywane od X dni (last_access z indeksu)"""
+        cutoff_time = time.time() - (days * 24 * 60 * 60)
+        deleted_count = 0
+        for accessed, _, file_path in self._work_copies():
+            if accessed >= cutoff_time:
+                break
+            if self._remove_work_copy(file_path):
+                deleted_count += 1
+        return deleted_count
+
+    def get_stats(self):
+        """Zwraca statystyki magazynu"""
+        conn = self._connection()
+        urls = conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]
+        blobs, size, stored_size = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs'
+        ).fetchone()
+        return {
+            'urls': urls,
+            'blobs': blobs,
+            'size_mb': round(size / (1024 * 1024), 2),
+            'stored_size_mb': round(stored_size / (1024 * 1024), 2),
+            'work_size_mb': round(sum(size for _, size, _ in self._work_copies()) / (1024 * 1024), 2),
+            'store_dir': self.store_dir
+        }
+
+
+_default_store = None
+
+
+def get_pdf_store():
+    """Zwraca współdzielony magazyn PDF-ów"""
+    global _default_store
+    if _default_store is None:
+        _default_store = PDFBlobStore()
+    return _default_store
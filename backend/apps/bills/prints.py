@@ -0,0 +1,563 @@
+"""
+Druki sejmowe - metadane, załączniki i wyciągnięty tekst w bazie danych
+
+Metadane druku i jego tekst pobierane są z API Sejmu raz (przy imporcie
+głosowań albo komendą sync_prints) i zapisywane w modelu Print. Ścieżki
+obsługujące żądania (endpoint /project-pdfs/, analiza AI) czytają już tylko
+z bazy. Druki, których API nie zna (404), są zapamiętywane jako nieistniejące
+i nie są odpytywane ponownie przed upływem NEGATIVE_CACHE_TTL.
+"""
+import re
+from datetime import timedelta
+
+import requests
+from django.utils import timezone
+import logging
+
+from .management.commands.ocr_cache import OCRCache, ocr_pdf_page
+from .legal_structure import PRINT_HEADER, PRINT_SEPARATOR, segment_text
+from .models import Print, PrintSetAnalysis
+from .pdf_store import get_pdf_store
+from .telemetry import count, stage
+from .text_extraction import (
+    FAST_BACKEND, extract_document_text, get_attachment_format, iter_page_texts,
+    open_document, rank_attachments
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TERM = 10
+PRINTS_API_URL = "https://api.sejm.gov.pl/sejm/term{term}/prints/{number}"
+
+# Jak długo ufamy odpowiedzi "druk nie istnieje"
+NEGATIVE_CACHE_TTL = timedelta(days=1)
+# Po jakim czasie metadane istniejącego druku są sprawdzane ponownie (nowe / wymienione załączniki)
+METADATA_TTL = timedelta(days=1)
+
+# Numery druków w tytule głosowania: "druk nr 321", "druki nr 322, 321 i 400", "druków nr 12 oraz 13-A"
+PRINT_NUMBERS_PATTERN = re.compile(
+    r'\bdruk(?:i|u|ów|ach)?\s+(?:nr|numer)\.?\s*'
+    r'(\d+(?:-[A-Z]+)?(?:\s*(?:,|\bi\b|\boraz\b)\s*\d+(?:-[A-Z]+)?)*)',
+    re.IGNORECASE
+)
+PRINT_NUMBER_PATTERN = re.compile(r'\b(\d+)(?:-[A-Z]+)?\b', re.IGNORECASE)
+
+# Nagłówek uzasadnienia - w drukach często rozstrzelony ("U Z A S A D N I E N I E")
+JUSTIFICATION_PATTERN = re.compile(r'^\s*U\s*Z\s*A\s*S\s*A\s*D\s*N\s*I\s*E\s*N\s*I\s*E\b', re.IGNORECASE | re.MULTILINE)
+
+
+def extract_print_numbers(title):
+    """
+    Wyciąga numery druków z tytułu głosowania
+
+    Brane są tylko liczby po "druk nr" / "druki nr" (także listy "322, 321",
+    "322 i 321", "322 oraz 321") - lata i inne liczby z tytułu ("z 2024 r.")
+    nie trafiają do zapytań API Sejmu. Przyrostki druków dodatkowych ("321-A")
+    są pomijane.
+    """
+    numbers = []
+    for match in PRINT_NUMBERS_PATTERN.finditer(title):
+        numbers.extend(PRINT_NUMBER_PATTERN.findall(match.group(1)))
+    return numbers
+
+
+def print_set_key(print_numbers, term=DEFAULT_TERM):
+    """
+    Kanoniczny zestaw druków: (klucz, posortowane numery bez powtórzeń)
+
+    Kolejność i powtórzenia numerów w tytule głosowania nie zmieniają klucza.
+    """
+    numbers = sorted(set(print_numbers), key=int)
+    return f"{term}:{','.join(numbers)}", numbers
+
+
+def confirmed_print_numbers(print_numbers, term=DEFAULT_TERM, fetch=False):
+    """
+    Numery z tytułu, które są drukami potwierdzonymi przez API Sejmu
+
+    Numer po "druk nr" nie musi istnieć (literówka w tytule, druk innej
+    kadencji), więc zestaw druków tworzony jest tylko z numerów, dla których
+    API zwróciło druk (exists=True po sprawdzeniu). Przy fetch=True niesprawdzone numery
+    są sprawdzane w API (sync_print); bez tego liczy się tylko baza danych.
+    """
+    numbers = {str(number) for number in print_numbers}
+    confirmed = set(Print.objects.filter(
+        term=term, number__in=numbers, exists=True, checked_at__isnull=False
+    ).values_list('number', flat=True))
+    if fetch:
+        for number in sorted(numbers - confirmed):
+            try:
+                with stage('metadata'):
+                    print_obj = sync_print(number, term)
+            except Exception as e:
+                logger.error(f"Błąd pobierania metadanych druku {number}: {str(e)}")
+                continue
+            if print_obj.exists and print_obj.checked_at:
+                confirmed.add(number)
+    return [number for number in print_numbers if str(number) in confirmed]
+
+
+def get_print_set(bill, term=DEFAULT_TERM, fetch=False):
+    """
+    Zwraca (tworząc w razie potrzeby) zestaw druków z tytułu głosowania i przypisuje go do projektu
+
+    Zestaw tworzą tylko numery potwierdzone jako druki (confirmed_print_numbers).
+    Projekt bez własnej analizy dostaje od razu analizę zestawu, jeśli
+    zestaw był już analizowany przy innym głosowaniu.
+
+    Returns:
+        PrintSetAnalysis | None: None, gdy tytuł nie zawiera numerów potwierdzonych druków
+    """
+    title = (bill.api_data or {}).get('title', '')
+    print_numbers = confirmed_print_numbers(extract_print_numbers(title), term, fetch=fetch)
+    if not print_numbers:
+        if bill.print_set_id:
+            # Zestaw z liczb, które nie są drukami (np. rok w tytule)
+            bill.print_set = None
+            if bill.pk:
+                bill.save(update_fields=['print_set'])
+        return None
+
+    key, numbers = print_set_key(print_numbers, term)
+    if bill.print_set_id and bill.print_set.key == key:
+        return bill.print_set
+
+    print_set, _ = PrintSetAnalysis.objects.get_or_create(
+        key=key, defaults={'term': term, 'print_numbers': numbers}
+    )
+    bill.print_set = print_set
+    update_fields = ['print_set']
+    if print_set.analysis and not bill.ai_analysis:
+        bill.ai_analysis = print_set.analysis
+        bill.ai_analysis_date = print_set.analysis_date
+        update_fields += ['ai_analysis', 'ai_analysis_date']
+    if bill.pk:
+        bill.save(update_fields=update_fields)
+    return print_set
+
+
+def get_predecessor_set(print_set):
+    """
+    Najnowszy przeanalizowany zestaw druków poprzedzających druki zestawu (tylko baza danych)
+
+    Nowy druk w procesie (np. sprawozdanie komisji) tworzy nowy zestaw bez
+    analizy - analiza zestawu jego poprzednika pozwala zaktualizować ją
+    przyrostowo zamiast analizować projekt od zera.
+
+    Returns:
+        PrintSetAnalysis | None
+    """
+    predecessors = set(
+        Print.objects.filter(
+            term=print_set.term, number__in=print_set.print_numbers, predecessor__isnull=False
+        ).values_list('predecessor__number', flat=True)
+    ) - set(print_set.print_numbers)
+    if not predecessors:
+        return None
+
+    keys = {print_set_key(predecessors, print_set.term)[0]}
+    keys |= {print_set_key([number], print_set.term)[0] for number in predecessors}
+    return PrintSetAnalysis.objects.filter(
+        key__in=keys, analysis__isnull=False
+    ).exclude(id=print_set.id).order_by('-analysis_date').first()
+
+
+def build_attachment_list(term, print_number, data):
+    """
+    Lista załączników druku w kolejności preferencji
+
+    Najpierw załączniki główne, potem dodatkowe druki (np. autopoprawka
+    12-A - pliki pod adresem dodatkowego druku); w obrębie grupy wersje
+    edytowalne (DOCX/ODT) przed PDF-em.
+    """
+    groups = [('main_attachment', str(print_number), data.get('attachments', []))]
+    groups += [
+        ('additional_print', str(add.get('number') or print_number), add.get('attachments', []))
+        for add in data.get('additionalPrints', [])
+    ]
+
+    attachments = []
+    for attachment_type, source_number, names in groups:
+        base_url = PRINTS_API_URL.format(term=term, number=source_number)
+        for name in rank_attachments(names):
+            attachments.append({
+                'name': name,
+                'url': f"{base_url}/{name}",
+                'type': attachment_type,
+                'format': get_attachment_format(name),
+                'print_number': source_number,
+            })
+    return attachments
+
+
+def predecessor_number(print_number, data):
+    """
+    Numer druku poprzedzającego w procesie legislacyjnym albo None
+
+    Sprawozdanie komisji czy druk kolejnego etapu wskazuje w processPrint
+    druk, który otworzył proces. Dodatkowe druki z sufiksem (12-A) należą
+    do druku bazowego (12).
+    """
+    print_number = str(print_number)
+    for number in data.get('processPrint') or []:
+        if str(number) != print_number:
+            return str(number)
+    base, separator, _ = print_number.partition('-')
+    return base if separator else None
+
+
+def fit_text_to_budget(text, max_chars):
+    """Przycina gotowy tekst do limitu: początek dokumentu i uzasadnienie"""
+    if len(text) <= max_chars:
+        return text
+
+    match = JUSTIFICATION_PATTERN.search(text)
+    if not match:
+        return text[:max_chars]
+
+    head = text[:min(match.start(), max_chars // 2)]
+    return head + '\n' + text[match.start():match.start() + max_chars - len(head) - 1]
+
+
+class PrintTextExtractor:
+    """
+    Wyciąga tekst druku z jego załączników
+
+    Po wywołaniu extract() atrybuty method i content_hash opisują, skąd
+    pochodzi tekst.
+    """
+
+    # Liczba pierwszych stron druku czytanych zawsze w pierwszej kolejności
+    FIRST_PAGES = 2
+
+    def __init__(self, store=None, cache=None, progress=None, refresh=False):
+        self.store = store or get_pdf_store()
+        self.cache = cache or OCRCache()
+        # Wywoływane z 'ocr' przed pierwszą stroną wymagającą OCR (postęp zadań analizy)
+        self.progress = progress
+        # Sprawdź załączniki na serwerze (warunkowy GET), nawet jeśli magazyn ma świeży wpis
+        self.refresh = refresh
+        self.method = ''
+        self.content_hash = ''
+
+    def extract(self, print_number, attachments, max_chars=None):
+        """
+        Zwraca tekst druku razem z tekstami jego dodatkowych druków
+
+        Z każdego druku (głównego i dodatkowych, np. autopoprawki) brany jest
+        pierwszy załącznik, z którego udało się odczytać tekst. Tekst
+        dodatkowego druku dołączany jest pod nagłówkiem "=== DRUK NR 12-A ===".
+        method i content_hash opisują załącznik druku głównego.
+
+        Args:
+            print_number: Numer druku
+            attachments: Lista załączników z build_attachment_list
+            max_chars: Limit znaków - jeśli podany, strony PDF-a czytane są
+                leniwie w kolejności priorytetu aż do wyczerpania limitu
+        """
+        groups = {}
+        for attachment in attachments:
+            groups.setdefault(attachment.get('print_number') or str(print_number), []).append(attachment)
+
+        parts = []
+        remaining = max_chars
+        for source_number, group in groups.items():
+            if remaining is not None and remaining <= 0:
+                break
+            if source_number == str(print_number):
+                text = self._extract_first(source_number, group, remaining)
+            else:
+                # Metoda i hash opisują druk główny; błąd dodatkowego druku nie przekreśla tekstu
+                main_source = (self.method, self.content_hash)
+                try:
+                    text = self._extract_first(source_number, group, remaining)
+                except Exception as e:
+                    logger.warning(f"Błąd odczytu dodatkowego druku {source_number}: {str(e)}")
+                    text = None
+                if parts:
+                    self.method, self.content_hash = main_source
+                if text:
+                    text = PRINT_HEADER.format(number=source_number) + text
+            if not text:
+                continue
+            parts.append(text)
+            if remaining is not None:
+                remaining -= len(text) + len(PRINT_SEPARATOR)
+        return PRINT_SEPARATOR.join(parts) or None
+
+    def _extract_first(self, print_number, attachments, max_chars=None):
+        """Zwraca tekst pierwszego załącznika, z którego udało się go odczytać"""
+        # Wersje edytowalne przed PDF-em (OCR skanu to ostateczność)
+        for attachment in attachments:
+            attachment_url = attachment['url']
+            attachment_format = attachment['format']
+            if attachment_format == 'pdf':
+                # Pusty wynik (np. skan bez OCR) - próbuj kolejnego załącznika
+                try:
+                    pdf_text = self._extract_pdf_text(print_number, attachment_url, max_chars)
+                except Exception as e:
+                    logger.warning(f"Błąd odczytu {attachment_url}: {str(e)}")
+                    continue
+                if pdf_text:
+                    return pdf_text
+                continue
+
+            try:
+                with stage('download'):
+                    path = self.store.get_path(attachment_url, refresh=self.refresh)
+                document_text = extract_document_text(path, attachment_format)
+            except Exception as e:
+                logger.warning(f"Błąd odczytu {attachment_url}: {str(e)}")
+                continue
+
+            if document_text:
+                logger.info(f"Tekst druku {print_number} pobrany z pliku {attachment_format.upper()}")
+                self.method = attachment_format
+                self.content_hash = self.store.get_content_hash(attachment_url)
+                return fit_text_to_budget(document_text, max_chars) if max_chars else document_text
+
+        return None
+
+    def _extract_pdf_text(self, print_number, pdf_url, max_chars=None):
+        """Wyciąga tekst z PDF-a druku (warstwa tekstowa, OCR dla stron bez tekstu)"""
+        with stage('download'):
+            pdf_path = self.store.get_path(pdf_url, refresh=self.refresh)
+
+        # Klucze cache wynikają z treści pliku - nowa wersja druku unieważnia się sama,
+        # a identyczne załączniki różnych druków przetwarzane są tylko raz
+        content_hash = self.store.get_content_hash(pdf_url)
+        self.cache.set_alias(print_number, content_hash)
+        self.content_hash = content_hash
+        self.method = 'pdf_text'
+
+        if max_chars:
+            with open_document(pdf_path, FAST_BACKEND) as document:
+                return self._extract_pages_within_budget(document, pdf_path, content_hash, max_chars)
+
+        cached_text = self.cache.get_cached_text(content_hash)
+        if cached_text:
+            logger.info(f"Używam cache tekstu dla druku {print_number}")
+            return cached_text
+
+        text_parts = []
+        for page_number, page_text in iter_page_texts(pdf_path, FAST_BACKEND):
+            # Najpierw spróbuj wyciągnąć tekst bezpośrednio
+            if len(page_text.strip()) > 50:
+                text_parts.append(page_text)
+            else:
+                # Jeśli nie ma tekstu, użyj OCR dla tej strony
+                ocr_text = self._extract_text_with_ocr(pdf_path, content_hash, page_number)
+                if ocr_text:
+                    text_parts.append(ocr_text)
+
+        full_text = '\n'.join(text_parts)
+        if full_text:
+            self.cache.save_to_cache(content_hash, full_text)
+        return full_text
+
+    def _extract_pages_within_budget(self, document, pdf_path, content_hash, max_chars):
+        """Czyta strony w kolejności priorytetu i kończy po wyczerpaniu limitu znaków"""
+        text_layers = {}
+
+        def text_layer(page_number):
+            if page_number not in text_layers:
+                text_layers[page_number] = document.page_text(page_number).strip()
+            return text_layers[page_number]
+
+        selected = {}
+        remaining = max_chars
+        for page_number in self._iter_pages_by_priority(len(document), text_layer):
+            page_text = text_layer(page_number)
+            if len(page_text) <= 50:
+                # OCR tylko dla stron, które faktycznie trafią do analizy
+                page_text = self._extract_text_with_ocr(pdf_path, content_hash, page_number) or ''
+            if not page_text:
+                continue
+            selected[page_number] = page_text[:remaining]
+            remaining -= len(selected[page_number]) + 1
+            if remaining <= 0:
+                break
+
+        logger.info(f"Odczytano {len(selected)} z {len(document)} stron w limicie {max_chars} znaków")
+        # Zachowaj kolejność stron z dokumentu
+        return '\n'.join(selected[page_number] for page_number in sorted(selected))
+
+    def _iter_pages_by_priority(self, page_count, text_layer):
+        """Kolejność stron: pierwsze strony, uzasadnienie, potem artykuły"""
+        first_pages = min(self.FIRST_PAGES, page_count)
+        yield from range(first_pages)
+
+        # Uzasadnienie szukamy tylko w warstwie tekstowej (bez OCR), i dopiero gdy pierwsze strony nie wystarczyły
+        justification_page = None
+        for page_number in range(first_pages, page_count):
+            if JUSTIFICATION_PATTERN.search(text_layer(page_number)):
+                justification_page = page_number
+                break
+
+        if justification_page is None:
+            yield from range(first_pages, page_count)
+        else:
+            yield from range(justification_page, page_count)
+            yield from range(first_pages, justification_page)
+
+    def _extract_text_with_ocr(self, pdf_path, content_hash, page_number):
+        """Wyciąga tekst ze strony PDF-a używając OCR z cache'owaniem"""
+        if self.progress:
+            self.progress('ocr')
+        count('pages_ocr')
+        try:
+            with stage('ocr'):
+                text = ocr_pdf_page(pdf_path, content_hash, page_number, self.cache)
+        except Exception as e:
+            logger.error(f"Błąd OCR dla {content_hash[:12]}, strona {page_number + 1}: {str(e)}")
+            return None
+        if text:
+            self.method = 'pdf_ocr'
+        return text
+
+
+def get_print(print_number, term=DEFAULT_TERM):
+    """Zwraca zapisany druk (tylko baza danych) albo None"""
+    return Print.objects.filter(term=term, number=str(print_number), exists=True).first()
+
+
+def sync_print(print_number, term=DEFAULT_TERM, force=False):
+    """
+    Zapewnia aktualne metadane druku w bazie i zwraca rekord Print
+
+    Metadane pobierane są dla druków niesprawdzonych, sprawdzonych dawniej
+    niż METADATA_TTL (albo przy force). Odpowiedź 404 zapisywana jest jako
+    exists=False i ponawiana najwcześniej po NEGATIVE_CACHE_TTL. Zmiana listy
+    załączników albo daty zmiany druku (changeDate) unieważnia wyciągnięty tekst.
+    """
+    print_obj, _ = Print.objects.get_or_create(term=term, number=str(print_number))
+    if not force and print_obj.checked_at:
+        ttl = METADATA_TTL if print_obj.exists else NEGATIVE_CACHE_TTL
+        if timezone.now() - print_obj.checked_at < ttl:
+            return print_obj
+
+    url = PRINTS_API_URL.format(term=term, number=print_number)
+    response = requests.get(url, headers={"Accept": "application/json"}, timeout=30)
+    print_obj.checked_at = timezone.now()
+
+    if response.status_code == 404:
+        logger.info(f"Druk {print_number} nie istnieje w API Sejmu")
+        print_obj.exists = False
+        print_obj.save()
+        return print_obj
+
+    response.raise_for_status()
+    data = response.json()
+
+    attachments = build_attachment_list(term, print_number, data)
+    previous_change = (print_obj.metadata or {}).get('changeDate')
+    if attachments != print_obj.attachments or (previous_change and data.get('changeDate') != previous_change):
+        # Nowe albo wymienione załączniki unieważniają wyciągnięty tekst; content_hash
+        # zostaje, żeby kolejna ekstrakcja sprawdziła pliki na serwerze (extract_print_text)
+        if print_obj.attachments is not None:
+            logger.info(f"Druk {print_number} zmienił się w API Sejmu - tekst zostanie wyciągnięty ponownie")
+        print_obj.text = ''
+        print_obj.text_budget = None
+        print_obj.extraction_method = ''
+        print_obj.text_extracted_at = None
+        print_obj.structure = {}
+
+    print_obj.exists = True
+    print_obj.title = (data.get('title') or '')[:1000]
+    print_obj.metadata = data
+    print_obj.attachments = attachments
+    previous_number = predecessor_number(print_number, data)
+    if previous_number:
+        print_obj.predecessor, _ = Print.objects.get_or_create(term=term, number=previous_number)
+    print_obj.save()
+    return print_obj
+
+
+def extract_print_text(print_obj, max_chars=None, progress=None, refresh=False):
+    """
+    Wyciąga tekst druku z załączników i zapisuje go w rekordzie
+
+    Przy refresh=True załączniki są sprawdzane na serwerze (druk wydany
+    ponownie pod tym samym adresem).
+    """
+    # Tekst unieważniony po zmianie druku - ten sam URL może wskazywać nową wersję pliku
+    refresh = refresh or bool(print_obj.content_hash and not print_obj.text)
+    extractor = PrintTextExtractor(progress=progress, refresh=refresh)
+    with stage('text_layer'):
+        text = extractor.extract(print_obj.number, print_obj.attachments or [], max_chars)
+    if not text:
+        return None
+
+    print_obj.text = text
+    print_obj.text_budget = max_chars
+    print_obj.extraction_method = extractor.method
+    print_obj.content_hash = extractor.content_hash
+    print_obj.text_extracted_at = timezone.now()
+    print_obj.structure = segment_text(text)
+    print_obj.save(update_fields=[
+        'text', 'text_budget', 'extraction_method', 'content_hash', 'text_extracted_at', 'structure', 'updated_at'
+    ])
+    return text
+
+
+def load_print(print_number, max_chars=None, term=DEFAULT_TERM, fetch=False, progress=None):
+    """
+    Zwraca druk z bazy danych razem z wyciągniętym tekstem
+
+    Zapisany tekst jest używany, jeśli jest pełny albo był wyciągnięty
+    z limitem co najmniej max_chars. Przy fetch=True brakujące metadane
+    i tekst pobierane są z API Sejmu i zapisywane; bez tego funkcja nie
+    wykonuje żadnych zapytań sieciowych.
+
+    Returns:
+        Print | None: Druk z tekstem (i strukturą) albo None, gdy brak tekstu
+    """
+    if fetch:
+        try:
+            with stage('metadata'):
+                print_obj = sync_print(print_number, term)
+        except Exception as e:
+            logger.error(f"Błąd pobierania metadanych druku {print_number}: {str(e)}")
+            print_obj = get_print(print_number, term)
+    else:
+        print_obj = get_print(print_number, term)
+
+    if print_obj is None or not print_obj.exists:
+        return None
+
+    has_enough_text = print_obj.text and (
+        print_obj.text_budget is None or (max_chars and print_obj.text_budget >= max_chars)
+    )
+    if not has_enough_text and fetch:
+        try:
+            extract_print_text(print_obj, max_chars, progress=progress)
+        except Exception as e:
+            logger.error(f"Błąd pobierania tekstu druku {print_number}: {str(e)}")
+
+    if not print_obj.text:
+        return None
+    return print_obj
+
+
+def get_print_text(print_number, max_chars=None, term=DEFAULT_TERM, fetch=False, progress=None):
+    """Zwraca tekst druku z bazy danych (load_print), obcięty do max_chars"""
+    print_obj = load_print(print_number, max_chars, term=term, fetch=fetch, progress=progress)
+    if print_obj is None:
+        return None
+    return fit_text_to_budget(print_obj.text, max_chars) if max_chars else print_obj.text
+
+
+def sync_bill_prints(bill, term=DEFAULT_TERM, with_text=True, force=False):
+    """Zapisuje druki wymienione w tytule głosowania (metadane i pełny tekst)"""
+    title = (bill.api_data or {}).get('title', '') or bill.title
+    synced = []
+    for print_number in dict.fromkeys(extract_print_numbers(title)):
+        try:
+            print_obj = sync_print(print_number, term, force=force)
+            if with_text and print_obj.exists and (force or not print_obj.text or print_obj.text_budget is not None):
+                extract_print_text(print_obj, refresh=force)
+            synced.append(print_obj)
+        except Exception as e:
+            logger.error(f"Błąd synchronizacji druku {print_number}: {str(e)}")
+    get_print_set(bill, term)
+    return synced
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Bill, BillVote, ClubColor, BillUpdate
+from .models import AnalysisJob, Bill, BillVote, ClubColor, BillUpdate, Deputy, DeputyVote
 
 
 class BillSerializer(serializers.ModelSerializer):
@@ -101,3 +101,34 @@ class ClubColorSerializer(serializers.ModelSerializer):
         model = ClubColor
         fields = ['id', 'club_name', 'color_hex', 'color_name', 'is_active', 'created_at', 'updated_at']
 
+
+class DeputySerializer(serializers.ModelSerializer):
+    """Serializer do wyświetlania posłów"""
+    
+    class Meta:
+        model = Deputy
+        fields = ['id', 'first_name', 'last_name', 'club']
+
+
+class DeputyVoteHistorySerializer(serializers.ModelSerializer):
+    """Serializer historii głosowań posła"""
+    bill_id = serializers.IntegerField(source='bill.id', read_only=True)
+    bill_title = serializers.CharField(source='bill.title', read_only=True)
+    voting_date = serializers.CharField(source='bill.voting_date', read_only=True)
+    voting_number = serializers.IntegerField(source='bill.voting_number', read_only=True)
+    session_number = serializers.CharField(source='bill.session_number', read_only=True)
+    
+    class Meta:
+        model = DeputyVote
+        fields = ['bill_id', 'bill_title', 'voting_date', 'voting_number', 'session_number', 'club', 'vote']
+
+
+class AnalysisJobSerializer(serializers.ModelSerializer):
+    """Serializer statusu zadania analizy AI"""
+    job_id = serializers.IntegerField(source='id', read_only=True)
+    bill_id = serializers.IntegerField(source='bill.id', read_only=True)
+    stage_display = serializers.CharField(source='get_stage_display', read_only=True)
+    
+    class Meta:
+        model = AnalysisJob
+        fields = ['job_id', 'bill_id', 'status', 'stage', 'stage_display', 'error', 'created_at', 'started_at', 'finished_at']
@@ -1,23 +1,63 @@
 """
 Serwisy do analizy projektów ustaw przez AI
 """
-import openai
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 from django.conf import settings
 from django.utils import timezone
 import json
 import logging
 
+from .article_diff import change_share, diff_articles, extract_articles, format_changes, has_changes
+from .chunking import chunk_text
+from .llm import CHARS_PER_TOKEN, cached_chat_completion, estimate_tokens, get_openai_client
+from .models import AnalysisRun, Print
+from .legal_structure import ensure_structure, join_prints
+from .prints import get_predecessor_set, get_print_set, load_print
+from .summarizer import summarize_text
+from .telemetry import RunTelemetry, bind, count, stage
+
 logger = logging.getLogger(__name__)
 
 
 class AIAnalysisService:
     """Serwis do analizy projektów ustaw przez OpenAI"""
     
-    def __init__(self):
-        self.client = openai.OpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            timeout=60.0
-        )
+    # Limit znaków tekstu analizowanego jednym zapytaniem (poza oknem modelu - patrz
+    # analysis_text_budget); teksty, które nie mieszczą się w oknie, idą w całości przez map-reduce
+    PROJECT_TEXT_BUDGET = settings.AI_ANALYSIS_TEXT_BUDGET
+    
+    SYSTEM_PROMPT = "Jesteś ekspertem prawnym i politycznym specjalizującym się w analizie projektów ustaw w Polsce. Analizujesz projekty ustaw pod kątem ich wpływu na państwo polskie."
+    MAX_TOKENS = 2000
+    # Podnieś przy każdej zmianie _create_analysis_prompt / SYSTEM_PROMPT (unieważnia cache odpowiedzi)
+    PROMPT_VERSION = 'analysis-v1'
+    
+    # Map-reduce: rozmiar fragmentu i długość jego streszczenia (tokeny)
+    CHUNK_TOKENS = 6000
+    CHUNK_SUMMARY_TOKENS = 600
+    # Podnieś przy każdej zmianie _create_chunk_prompt (prompt zależy tylko od treści fragmentu)
+    CHUNK_PROMPT_VERSION = 'chunk-summary-v2'
+    # Maksymalna liczba rund streszczania streszczeń
+    MAX_REDUCE_ROUNDS = 3
+    
+    # Analiza przyrostowa: do AI trafiają tylko zmienione artykuły i poprzednia analiza,
+    # o ile zmiana obejmuje nie więcej niż podany udział tekstu
+    INCREMENTAL_MAX_CHANGE_SHARE = 0.4
+    INCREMENTAL_PROMPT_VERSION = 'incremental-v1'
+    # Klucz, pod którym analiza niesie źródło (artykuły) do save_analysis_to_bill
+    SOURCE_KEY = '_source'
+    
+    def __init__(self, fetch_prints=False, use_cache=True, progress=None, incremental=True):
+        # Bez fetch_prints teksty druków czytane są wyłącznie z bazy (bez zapytań do API Sejmu)
+        self.fetch_prints = fetch_prints
+        # Identyczne wejście (model, wersja promptu, tekst) zwraca zapisaną odpowiedź bez wywołania API
+        self.use_cache = use_cache
+        # Opcjonalna funkcja wywoływana z nazwą etapu (extraction / ocr / llm) - postęp zadań w tle
+        self.progress = progress
+        # Po zmianie tekstu projektu aktualizuj poprzednią analizę na podstawie zmienionych artykułów
+        self.incremental = incremental
+        # Klient współdzielony przez wszystkie instancje (pula połączeń HTTP)
+        self.client = get_openai_client()
     
     def is_openai_configured(self):
         """Sprawdza czy OpenAI API jest skonfigurowane"""
@@ -31,312 +71,427 @@ class AIAnalysisService:
             bill: Instancja modelu Bill
             
         Returns:
-            dict: Analiza zawierająca klucze: changes, risks, benefits
+            dict | None: Analiza zawierająca klucze: changes, risks, benefits;
+                None, gdy projekt nie ma tekstu druków ani pełnego tekstu / opisu
         """
         try:
-            # Przygotuj tekst do analizy
-            text_to_analyze = self._prepare_text_for_analysis(bill)
-            
-            if not text_to_analyze:
-                return {
-                    'error': 'Brak tekstu do analizy',
-                    'changes': '',
-                    'risks': '',
-                    'benefits': ''
-                }
-            
-            # Wygeneruj prompt
-            prompt = self._create_analysis_prompt(text_to_analyze, bill.title)
-            
-            # Wywołaj OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Jesteś ekspertem prawnym i politycznym specjalizującym się w analizie projektów ustaw w Polsce. Analizujesz projekty ustaw pod kątem ich wpływu na państwo polskie."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.7
-            )
+            prepared = self.prepare_analysis(bill)
             
-            # Parsuj odpowiedź
-            analysis_text = response.choices[0].message.content
-            parsed_analysis = self._parse_analysis_response(analysis_text)
+            if not prepared:
+                return None
             
-            return parsed_analysis
+            self._report_progress('llm')
+            analysis, _ = self.run_prepared_analysis(bill, prepared)
+            return analysis
             
         except Exception as e:
             logger.error(f"Błąd podczas analizy AI dla projektu {bill.number}: {str(e)}")
-            return {
-                'error': f'Błąd analizy: {str(e)}',
-                'changes': '',
-                'risks': '',
-                'benefits': ''
-            }
+            return self._error_result(f'Błąd analizy: {str(e)}')
+    
+    def prepare_analysis(self, bill):
+        """
+        Przygotowuje wejście analizy (druki, OCR, porównanie z poprzednią wersją, skracanie) - bez wywołania OpenAI
+        
+        Returns:
+            dict | None: source_text, articles, diff (gdy możliwa analiza przyrostowa),
+                text (skrócony tekst do pełnej analizy) i telemetry; None, gdy brak tekstu
+        """
+        telemetry = RunTelemetry()
+        with telemetry.activate():
+            prepared = self._prepare_analysis(bill)
+        if prepared is not None:
+            prepared['telemetry'] = telemetry
+        return prepared
+    
+    def _prepare_analysis(self, bill):
+        source_text, structure, origin = self._collect_analysis_text(bill)
+        if not source_text:
+            return None
+        count('chars_in', len(source_text))
+        
+        previous_analysis, previous = self._previous_analysis(bill, origin)
+        prepared = {
+            'source_text': source_text,
+            'structure': structure,
+            'origin': origin,
+            'articles': extract_articles(source_text, structure),
+            'previous_analysis': previous_analysis,
+            'previous_articles': None,
+            'diff': None,
+            'text': None,
+        }
+        if (self.incremental and previous_analysis and 'error' not in previous_analysis
+                and previous.get('prompt_version') == self.PROMPT_VERSION
+                and previous.get('articles') and prepared['articles']):
+            diff = diff_articles(previous['articles'], prepared['articles'])
+            if change_share(diff) <= self.INCREMENTAL_MAX_CHANGE_SHARE:
+                prepared['diff'] = diff
+                prepared['previous_articles'] = previous['articles']
+            else:
+                logger.info(f"Zmiana projektu {bill.number} obejmuje {change_share(diff):.0%} tekstu - pełna analiza")
+        
+        if prepared['diff'] is None:
+            prepared['text'] = self._analysis_text(source_text, bill.title)
+        return prepared
+    
+    def _record_run(self, bill, telemetry, analysis, error=''):
+        """Zapisuje telemetrię przebiegu (AnalysisRun) - błąd zapisu nie przerywa analizy"""
+        if not error and analysis and 'error' in analysis:
+            error = analysis['error']
+        prompt_tokens = telemetry.get('prompt_tokens')
+        completion_tokens = telemetry.get('completion_tokens')
+        cost = (
+            Decimal(prompt_tokens) * Decimal(str(settings.OPENAI_PRICE_PROMPT_PER_1K))
+            + Decimal(completion_tokens) * Decimal(str(settings.OPENAI_PRICE_COMPLETION_PER_1K))
+        ) / 1000
+        try:
+            AnalysisRun.objects.create(
+                bill=bill,
+                print_set_id=bill.print_set_id,
+                status='error' if error else 'ok',
+                error=error,
+                mode=((analysis or {}).get(self.SOURCE_KEY) or {}).get('mode', ''),
+                model=settings.OPENAI_MODEL,
+                total_seconds=round(telemetry.wall_time, 4),
+                stages=telemetry.stage_times(),
+                pages_ocr=telemetry.get('pages_ocr'),
+                chars_in=telemetry.get('chars_in'),
+                chars_out=telemetry.get('chars_out'),
+                llm_calls=telemetry.get('llm_calls'),
+                cache_hits=telemetry.get('cache_hits'),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost_usd=cost.quantize(Decimal('0.000001')),
+            )
+        except Exception as e:
+            logger.warning(f"Nie udało się zapisać telemetrii analizy projektu {bill.number}: {str(e)}")
+    
+    def _previous_analysis(self, bill, origin='prints'):
+        """
+        Ostatnia analiza tekstu projektu i jej źródło: dla tekstu druków analiza
+        zestawu druków (wspólna dla głosowań nad tymi samymi drukami) albo zestawu
+        druków poprzedzających (Print.predecessor), poza tym analiza samego projektu
+        """
+        if bill.print_set_id and origin == 'prints' and bill.print_set.analysis:
+            return bill.print_set.analysis, bill.print_set.analysis_source or {}
+        if bill.print_set_id and origin == 'prints':
+            previous_set = get_predecessor_set(bill.print_set)
+            if previous_set is not None:
+                logger.info(
+                    f"Projekt {bill.number}: nowy zestaw druków, porównanie z poprzednią "
+                    f"analizą druków {', '.join(previous_set.print_numbers)}"
+                )
+                return previous_set.analysis, self._predecessor_source(previous_set)
+        return bill.ai_analysis, bill.ai_analysis_source or {}
+    
+    def _predecessor_source(self, previous_set):
+        """Źródło analizy zestawu poprzedniego; bez zapisanych artykułów - artykuły z tekstu jego druków"""
+        source = dict(previous_set.analysis_source or {})
+        if source.get('articles'):
+            return source
+        prints = {
+            print_obj.number: print_obj
+            for print_obj in Print.objects.filter(
+                term=previous_set.term, number__in=previous_set.print_numbers, exists=True
+            ).exclude(text='')
+        }
+        if prints:
+            text, structure = join_prints([
+                (number, prints[number].text, ensure_structure(prints[number]))
+                for number in previous_set.print_numbers if number in prints
+            ])
+            source['articles'] = extract_articles(text, structure)
+        return source
+    
+    def run_prepared_analysis(self, bill, prepared):
+        """
+        Analizuje przygotowane wejście: przyrostowo (tylko zmienione artykuły) albo w całości
+        
+        Przebieg (czasy etapów, tokeny, koszt) zapisywany jest jako AnalysisRun.
+        
+        Returns:
+            tuple: (analiza, liczba zużytych tokenów)
+        """
+        telemetry = prepared.get('telemetry') or RunTelemetry()
+        analysis, error = None, ''
+        try:
+            with telemetry.activate():
+                analysis, tokens = self._analyze_prepared(bill, prepared)
+            return analysis, tokens
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self._record_run(bill, telemetry, analysis, error)
+    
+    def _analyze_prepared(self, bill, prepared):
+        diff = prepared['diff']
+        source = {
+            'prompt_version': self.PROMPT_VERSION,
+            'articles': prepared['articles'],
+            'mode': 'full',
+            'origin': prepared['origin'],
+        }
+        
+        if diff is not None and not has_changes(diff):
+            logger.info(f"Tekst projektu {bill.number} bez zmian w artykułach - poprzednia analiza aktualna")
+            analysis = {key: value for key, value in prepared['previous_analysis'].items() if key != 'error'}
+            analysis[self.SOURCE_KEY] = dict(source, mode='unchanged')
+            return analysis, 0
+        
+        if diff is not None:
+            changes = format_changes(prepared['previous_articles'], prepared['articles'], diff)
+            prompt = self._create_incremental_prompt(prepared['previous_analysis'], changes, bill.title)
+            if estimate_tokens(self.SYSTEM_PROMPT) + estimate_tokens(prompt) + self.MAX_TOKENS <= settings.OPENAI_CONTEXT_TOKENS:
+                count('chars_out', len(changes))
+                logger.info(
+                    f"Analiza przyrostowa projektu {bill.number}: zmienione {len(diff['modified'])}, "
+                    f"dodane {len(diff['added'])}, usunięte {len(diff['removed'])} artykuły"
+                )
+                analysis_text, tokens, _ = cached_chat_completion(
+                    [
+                        {"role": "system", "content": self.SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=self.MAX_TOKENS,
+                    template_version=self.INCREMENTAL_PROMPT_VERSION,
+                    temperature=0.7,
+                    use_cache=self.use_cache
+                )
+                analysis = self._parse_analysis_response(analysis_text)
+                if 'error' not in analysis:
+                    analysis[self.SOURCE_KEY] = dict(source, mode='incremental', changed_articles=(
+                        len(diff['modified']) + len(diff['added']) + len(diff['removed'])
+                    ))
+                return analysis, tokens
+        
+        text = prepared['text'] or self._analysis_text(prepared['source_text'], bill.title)
+        count('chars_out', len(text))
+        analysis, tokens = self.run_analysis(text, bill.title, prepared.get('structure'))
+        if 'error' not in analysis:
+            analysis[self.SOURCE_KEY] = source
+        return analysis, tokens
+    
+    def run_analysis(self, text, title, structure=None):
+        """
+        Analizuje przygotowany tekst (z limitem zapytań i tokenów) i parsuje odpowiedź
+        
+        Tekst mieszczący się w oknie modelu analizowany jest jednym zapytaniem.
+        Dłuższy dzielony jest na fragmenty, które są streszczane równolegle
+        (map), a analiza powstaje ze streszczeń (reduce). Zapisana struktura
+        tekstu (legal_structure) wyznacza granice fragmentów bez ponownego parsowania.
+        
+        Returns:
+            tuple: (analiza, liczba zużytych tokenów - 0 dla odpowiedzi z cache)
+        """
+        tokens = 0
+        rounds = 0
+        while not self._fits_in_context(text, title) and rounds < self.MAX_REDUCE_ROUNDS:
+            text, used = self._summarize_chunks(text, title, structure)
+            # Kolejne rundy dzielą streszczenia - bez struktury aktu
+            structure = None
+            tokens += used
+            rounds += 1
+        
+        analysis_text, used, _ = cached_chat_completion(
+            [
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": self._create_analysis_prompt(text, title)}
+            ],
+            max_tokens=self.MAX_TOKENS,
+            template_version=self.PROMPT_VERSION,
+            temperature=0.7,
+            use_cache=self.use_cache
+        )
+        return self._parse_analysis_response(analysis_text), tokens + used
+    
+    def _analysis_text(self, source_text, title):
+        """
+        Tekst do pełnej analizy
+        
+        Tekst mieszczący się w budżecie jednego zapytania trafia do AI bez zmian.
+        Dłuższy od PROJECT_TEXT_BUDGET, ale mieszczący się w oknie modelu, jest
+        skracany ekstrakcyjnie do budżetu. Tekst spoza okna idzie w całości -
+        map-reduce dzieli go na fragmenty, których streszczenia w cache nie
+        zależą od długości reszty tekstu.
+        """
+        budget = self.analysis_text_budget(title)
+        if len(source_text) <= budget or not self._fits_in_context(source_text, title):
+            return source_text
+        return self._smart_text_shortening(source_text, budget)
+    
+    @classmethod
+    def analysis_text_budget(cls, title=''):
+        """
+        Liczba znaków tekstu, która mieści się w jednym zapytaniu: okno modelu
+        bez promptu systemowego, szablonu promptu i odpowiedzi, nie więcej niż
+        PROJECT_TEXT_BUDGET
+        """
+        overhead = (
+            estimate_tokens(cls.SYSTEM_PROMPT) + estimate_tokens(cls._create_analysis_prompt('', title))
+            + cls.MAX_TOKENS + 1
+        )
+        available = (settings.OPENAI_CONTEXT_TOKENS - overhead) * CHARS_PER_TOKEN
+        return max(0, min(cls.PROJECT_TEXT_BUDGET, available))
+    
+    def _fits_in_context(self, text, title):
+        prompt_tokens = estimate_tokens(self.SYSTEM_PROMPT) + estimate_tokens(self._create_analysis_prompt(text, title))
+        return prompt_tokens + self.MAX_TOKENS <= settings.OPENAI_CONTEXT_TOKENS
+    
+    def _summarize_chunks(self, text, title, structure=None):
+        """
+        Etap map: streszcza fragmenty tekstu równolegle
+        
+        Streszczenia są w cache odpowiedzi, więc po zmianie projektu ponownie
+        liczone są tylko fragmenty, których treść się zmieniła.
+        
+        Returns:
+            tuple: (połączone streszczenia, liczba zużytych tokenów)
+        """
+        chunks = chunk_text(text, self.CHUNK_TOKENS, structure)
+        logger.info(f"Tekst projektu ({len(text)} znaków) podzielony na {len(chunks)} fragmentów")
+        
+        def summarize(chunk):
+            summary, used, _ = cached_chat_completion(
+                [
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "user", "content": self._create_chunk_prompt(chunk)}
+                ],
+                max_tokens=self.CHUNK_SUMMARY_TOKENS,
+                template_version=self.CHUNK_PROMPT_VERSION,
+                temperature=0.3,
+                use_cache=self.use_cache
+            )
+            return summary, used
+        
+        with ThreadPoolExecutor(max_workers=settings.AI_ANALYSIS_MAP_CONCURRENCY) as executor:
+            results = list(executor.map(bind(summarize), chunks))
+        
+        # Kolejność fragmentów (i tytuł w prompcie analizy) dochodzą dopiero w etapie reduce
+        summaries = [
+            f"=== FRAGMENT {number}/{len(chunks)} (streszczenie) ===\n{summary.strip()}"
+            for number, (summary, _) in enumerate(results, start=1)
+        ]
+        return '\n\n'.join(summaries), sum(used for _, used in results)
+    
+    def _create_chunk_prompt(self, chunk):
+        """
+        Tworzy prompt streszczenia jednego fragmentu (etap map)
+        
+        Prompt to stała instrukcja i treść fragmentu - bez tytułu i numeru
+        fragmentu, więc niezmieniony fragment trafia w cache także wtedy, gdy
+        zmieniła się liczba albo kolejność pozostałych fragmentów.
+        """
+        return f"""
+Poniżej znajduje się fragment projektu ustawy.
+Streść go rzeczowo w języku polskim. Zachowaj numery artykułów i druków, konkretne zmiany przepisów,
+kwoty, terminy, nowe obowiązki i uprawnienia oraz wskazane w uzasadnieniu cele i skutki.
+Nie oceniaj projektu - ocena powstanie na podstawie streszczeń wszystkich fragmentów.
+
+FRAGMENT:
+{chunk}
+"""
+    
+    def _report_progress(self, stage):
+        if self.progress:
+            self.progress(stage)
+    
+    def _error_result(self, message):
+        return {
+            'error': message,
+            'changes': '',
+            'risks': '',
+            'benefits': ''
+        }
     
-    def _prepare_text_for_analysis(self, bill):
-        """Przygotowuje tekst do analizy z inteligentnym skracaniem"""
+    def _collect_analysis_text(self, bill):
+        """
+        Pełny (nieskrócony) tekst projektu: druki, pełny tekst albo opis
+        
+        Returns:
+            tuple: (tekst, zapisana struktura tekstu albo None, pochodzenie:
+                'prints' / 'full_text' / 'description'); (None, None, None), gdy brak tekstu
+        """
         # Najpierw spróbuj pobrać PDF-y projektów ustaw
-        project_text = self._get_project_pdfs_text(bill)
+        project_text, structure = self._get_project_pdfs_text(bill)
         if project_text:
-            return self._smart_text_shortening(project_text)
+            return project_text, structure, 'prints'
         
         # Jeśli nie ma PDF-ów projektów, użyj pełnego tekstu jeśli dostępny
         if bill.full_text and len(bill.full_text) > 100:
-            return self._smart_text_shortening(bill.full_text)
+            return bill.full_text, ensure_structure(bill, 'full_text'), 'full_text'
         elif bill.description and len(bill.description) > 50:
-            return bill.description
+            return bill.description, None, 'description'
         else:
-            return None
+            return None, None, None
     
     def _get_project_pdfs_text(self, bill):
-        """Pobiera tekst z PDF-ów projektów ustaw dla danego głosowania"""
+        """
+        Pobiera tekst z druków projektów ustaw dla danego głosowania
+        
+        Returns:
+            tuple: (połączony tekst druków, jego struktura złożona ze struktur druków); (None, None), gdy brak tekstu
+        """
         try:
-            import requests
-            import pdfplumber
-            import io
-            
-            # Pobierz dane głosowania z API Sejmu
-            voting_data = bill.api_data
-            if not voting_data:
-                return None
-            
-            # Wyciągnij numery druków z tytułu
-            title = voting_data.get('title', '')
-            print_numbers = self._extract_print_numbers_from_title(title)
-            
-            if not print_numbers:
-                return None
-            
-            # Pobierz tekst ze wszystkich dostępnych PDF-ów
-            all_pdf_texts = []
+            # Zestaw druków z tytułu głosowania - posortowane numery, więc głosowania
+            # nad tymi samymi drukami dostają ten sam tekst (i tę samą analizę)
+            print_set = get_print_set(bill, fetch=self.fetch_prints)
+            if print_set is None:
+                return None, None
+            print_numbers = print_set.print_numbers
+            
+            # Pełne teksty druków - skracanie (albo map-reduce) dotyczy dopiero całego tekstu
+            prints = []
             for print_number in print_numbers:
                 logger.info(f"Próbuję pobrać tekst z druku {print_number}")
-                pdf_text = self._download_print_pdf_text(print_number)
-                if pdf_text:
-                    logger.info(f"Pobrano tekst z druku {print_number}, długość: {len(pdf_text)}")
-                    all_pdf_texts.append(f"=== DRUK NR {print_number} ===\n{pdf_text}")
+                print_obj = self._load_print(print_number)
+                if print_obj:
+                    logger.info(f"Pobrano tekst z druku {print_number}, długość: {len(print_obj.text)}")
+                    prints.append((print_number, print_obj.text, ensure_structure(print_obj)))
                 else:
                     logger.warning(f"Nie udało się pobrać tekstu z druku {print_number}")
             
-            if all_pdf_texts:
-                # Połącz wszystkie PDF-y w jeden tekst
-                combined_text = '\n\n'.join(all_pdf_texts)
-                logger.info(f"Połączono {len(all_pdf_texts)} PDF-ów, łączna długość: {len(combined_text)}")
-                
-                # Jeśli tekst jest za długi, obetnij proporcjonalnie z każdego druku
-                if len(combined_text) > 6000:
-                    max_length = 6000
-                    # Oblicz proporcjonalny limit dla każdego druku
-                    per_document_limit = max_length // len(all_pdf_texts)
-                    
-                    truncated_texts = []
-                    for doc_text in all_pdf_texts:
-                        # Znajdź nagłówek druku
-                        if '=== DRUK NR' in doc_text:
-                            header_end = doc_text.find('\n', doc_text.find('=== DRUK NR'))
-                            header = doc_text[:header_end + 1]
-                            content = doc_text[header_end + 1:]
-                            truncated_content = content[:per_document_limit - len(header)]
-                            truncated_texts.append(header + truncated_content)
-                        else:
-                            truncated_texts.append(doc_text[:per_document_limit])
-                    
-                    combined_text = '\n\n'.join(truncated_texts)
-                
-                return combined_text
+            if prints:
+                # Połącz wszystkie druki w jeden tekst - struktura bez ponownego parsowania druków
+                combined_text, structure = join_prints(prints)
+                logger.info(f"Połączono {len(prints)} PDF-ów, łączna długość: {len(combined_text)}")
+                return combined_text, structure
             
             logger.warning("Nie udało się pobrać tekstu z żadnego PDF-a")
-            return None
+            return None, None
             
         except Exception as e:
             logger.error(f"Błąd pobierania PDF-ów projektów dla {bill.number}: {str(e)}")
-            return None
-    
-    def _extract_print_numbers_from_title(self, title):
-        """Wyciąga numery druków z tytułu głosowania"""
-        import re
-        # Znajdź wszystkie liczby 3-5 cyfrowe
-        numbers = re.findall(r'\d{3,5}', title)
-        return numbers
-    
-    def _download_print_pdf_text(self, print_number):
-        """Pobiera tekst z PDF-a dla danego numeru druku"""
-        try:
-            import requests
-            import pdfplumber
-            import io
-            
-            headers = {"Accept": "application/json"}
-            url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}"
-            
-            # Pobierz metadane druku
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Znajdź pierwszy dostępny PDF
-            pdf_url = None
-            
-            # Sprawdź główne załączniki
-            for att in data.get("attachments", []):
-                if att.endswith(".pdf"):
-                    pdf_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}/{att}"
-                    break
-            
-            # Jeśli nie ma w głównych, sprawdź dodatkowe druki
-            if not pdf_url:
-                for add in data.get("additionalPrints", []):
-                    for att in add.get("attachments", []):
-                        if att.endswith(".pdf"):
-                            pdf_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}/{att}"
-                            break
-                    if pdf_url:
-                        break
-            
-            if not pdf_url:
-                return None
-            
-            # Pobierz PDF i wyciągnij tekst
-            pdf_response = requests.get(pdf_url, timeout=30)
-            pdf_response.raise_for_status()
-            
-            with pdfplumber.open(io.BytesIO(pdf_response.content)) as pdf:
-                text_parts = []
-                for page in pdf.pages:
-                    # Najpierw spróbuj wyciągnąć tekst bezpośrednio
-                    page_text = page.extract_text()
-                    if page_text and len(page_text.strip()) > 50:
-                        text_parts.append(page_text)
-                    else:
-                        # Jeśli nie ma tekstu, użyj OCR
-                        logger.info(f"Używam OCR dla strony {len(text_parts) + 1}")
-                        ocr_text = self._extract_text_with_ocr(print_number)
-                        if ocr_text:
-                            text_parts.append(ocr_text)
-                
-                return '\n'.join(text_parts)
-                
-        except Exception as e:
-            logger.error(f"Błąd pobierania PDF dla druku {print_number}: {str(e)}")
-            return None
-    
-    def _extract_text_with_ocr(self, print_number):
-        """Wyciąga tekst z PDF-a używając OCR z cache'owaniem"""
-        try:
-            from .management.commands.ocr_cache import OCRCache
-            import pytesseract
-            from pdf2image import convert_from_bytes
-            import requests
-            
-            # Sprawdź cache
-            cache = OCRCache()
-            cached_text = cache.get_cached_text(print_number)
-            if cached_text:
-                logger.info(f"Używam cache OCR dla druku {print_number}")
-                return cached_text
-            
-            # Pobierz PDF URL
-            headers = {"Accept": "application/json"}
-            url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}"
-            response = requests.get(url, headers=headers, timeout=30)
-            data = response.json()
-            
-            pdf_url = None
-            for att in data.get("attachments", []):
-                if att.endswith(".pdf"):
-                    pdf_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}/{att}"
-                    break
-            
-            if not pdf_url:
-                return None
-            
-            # Pobierz PDF
-            pdf_response = requests.get(pdf_url, timeout=30)
-            pdf_bytes = pdf_response.content
-            
-            # Konwertuj PDF na obrazy
-            images = convert_from_bytes(pdf_bytes, dpi=300)
-            
-            if not images:
-                return None
-            
-            # Użyj OCR na wszystkich obrazach
-            all_text = []
-            for i, image in enumerate(images):
-                # Sprawdź cache dla konkretnej strony
-                page_cached = cache.get_cached_text(print_number, i)
-                if page_cached:
-                    logger.info(f"Używam cache OCR dla druku {print_number}, strona {i+1}")
-                    all_text.append(page_cached)
-                else:
-                    logger.info(f"Używam OCR dla druku {print_number}, strona {i+1}")
-                    text = pytesseract.image_to_string(image, lang='pol')
-                    if text.strip():
-                        all_text.append(text.strip())
-                        # Zapisz do cache
-                        cache.save_to_cache(print_number, text.strip(), i)
-            
-            full_text = '\n'.join(all_text) if all_text else None
-            
-            # Zapisz pełny tekst do cache
-            if full_text:
-                cache.save_to_cache(print_number, full_text)
-            
-            return full_text
-            
-        except Exception as e:
-            logger.error(f"Błąd OCR dla druku {print_number}: {str(e)}")
-            return None
+            return None, None
     
-    def _smart_text_shortening(self, text, max_length=100000):
-        """Inteligentne skracanie tekstu zachowując kluczowe fragmenty"""
-        if len(text) <= max_length:
-            return text
-        
-        # 1. Znajdź kluczowe sekcje dokumentu prawniczego
-        key_sections = self._extract_key_sections(text)
-        
-        # 2. Jeśli kluczowe sekcje są wystarczające, użyj ich
-        if len(key_sections) <= max_length:
-            return key_sections
+    def _load_print(self, print_number):
+        """
+        Zwraca druk z tekstem zapisanym w bazie (model Print)
         
-        # 3. W przeciwnym razie użyj proporcjonalnego skracania
-        return self._proportional_shortening(text, max_length)
+        Args:
+            print_number: Numer druku
+        """
+        return load_print(print_number, fetch=self.fetch_prints, progress=self.progress)
     
-    def _extract_key_sections(self, text):
-        """Wyciąga kluczowe sekcje dokumentu prawniczego"""
-        import re
-        
-        key_sections = []
-        
-        # Wzorce kluczowych sekcji w dokumentach prawniczych
-        patterns = [
-            r'(?i)(preambuła|wstęp|uzasadnienie).*?(?=\n\n|\n[A-ZĄĆĘŁŃÓŚŹŻ])',
-            r'(?i)(art\.|artykuł|§|paragraf).*?(?=\n\n|\n[A-ZĄĆĘŁŃÓŚŹŻ])',
-            r'(?i)(zmiany|nowe przepisy).*?(?=\n\n|\n[A-ZĄĆĘŁŃÓŚŹŻ])',
-            r'(?i)(przepisy przejściowe|przepisy końcowe).*?(?=\n\n|\n[A-ZĄĆĘŁŃÓŚŹŻ])',
-            r'(?i)(załącznik|aneks).*?(?=\n\n|\n[A-ZĄĆĘŁŃÓŚŹŻ])',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL)
-            key_sections.extend(matches)
+    def _smart_text_shortening(self, text, max_length=None):
+        """
+        Skraca tekst lokalnym streszczeniem ekstrakcyjnym (TF-IDF) przed wysłaniem do AI
         
-        # Jeśli nie znaleziono kluczowych sekcji, użyj początku dokumentu
-        if not key_sections:
-            return text[:4000] + "\n\n[... tekst skrócony ...]"
+        Tylko tekst dłuższy niż max_length (domyślnie budżet jednego zapytania)
+        jest redukowany - do max_length znaków, najbardziej informatywne zdania
+        w oryginalnej kolejności.
+        """
+        target_length = max_length or self.analysis_text_budget()
+        if len(text) <= target_length:
+            return text
         
-        # Połącz kluczowe sekcje
-        combined = '\n\n'.join(key_sections[:5])  # Maksymalnie 5 sekcji
+        with stage('shortening'):
+            summary = summarize_text(text, target_length)
+        if summary:
+            logger.info(f"Streszczenie ekstrakcyjne: {len(text)} -> {len(summary)} znaków")
+            return summary
         
-        return combined[:100000]  # Ogranicz do 100000 znaków
+        return self._proportional_shortening(text, target_length)
     
     def _proportional_shortening(self, text, max_length):
         """Proporcjonalne skracanie zachowując strukturę"""
@@ -370,7 +525,8 @@ class AIAnalysisService:
         
         return result
     
-    def _create_analysis_prompt(self, text, title):
+    @staticmethod
+    def _create_analysis_prompt(text, title):
         """Tworzy prompt dla OpenAI"""
         return f"""
 Przeanalizuj poniższy projekt ustawy (lub projekty ustaw) i napisz szczegółową analizę w języku polskim w następującym formacie:
@@ -403,6 +559,39 @@ WYMAGANIA ANALIZY:
 - Analizuj projekt z perspektywy dobra Państwa Polskiego i jego obywateli
 - Uwzględnij aspekty prawne, ekonomiczne, społeczne i polityczne
 - Jeśli dokumenty zawierają różne wersje tego samego projektu, wyjaśnij różnice
+"""
+    
+    def _create_incremental_prompt(self, previous_analysis, changes, title):
+        """Tworzy prompt aktualizacji analizy na podstawie zmienionych artykułów"""
+        return f"""
+Poniżej znajduje się dotychczasowa analiza projektu ustawy "{title}" oraz zmiany wprowadzone w nowej wersji
+tekstu projektu (np. autopoprawka lub sprawozdanie komisji). Zmienione artykuły podano jako diff
+(linie z "-" usunięte, z "+" dodane), nowe artykuły w całości, usunięte artykuły z nazwy.
+
+Zaktualizuj analizę tak, aby opisywała nową wersję projektu. Zachowaj trafne fragmenty dotychczasowej analizy,
+popraw te, których dotyczą zmiany, i opisz skutki zmian. Odpowiedz pełną analizą w tym samym formacie:
+
+**O CZYM JEST TEN PROJEKT:**
+**DOBRE STRONY PROJEKTU:**
+**ZAGROŻENIA Z PROJEKTU:**
+
+---
+
+DOTYCHCZASOWA ANALIZA:
+
+**O CZYM JEST TEN PROJEKT:**
+{previous_analysis.get('changes', '')}
+
+**DOBRE STRONY PROJEKTU:**
+{previous_analysis.get('benefits', '')}
+
+**ZAGROŻENIA Z PROJEKTU:**
+{previous_analysis.get('risks', '')}
+
+---
+
+ZMIANY W NOWEJ WERSJI PROJEKTU:
+{changes}
 """
     
     def _parse_analysis_response(self, response_text):
@@ -464,11 +653,41 @@ WYMAGANIA ANALIZY:
             }
     
     def save_analysis_to_bill(self, bill, analysis):
-        """Zapisuje analizę do modelu Bill"""
+        """
+        Zapisuje analizę do modelu Bill (razem z artykułami, z których powstała)
+        
+        Analiza tekstu druków zestawu zapisywana jest w zestawie
+        (PrintSetAnalysis) i kopiowana do wszystkich głosowań nad tymi drukami.
+        Analiza pełnego tekstu albo opisu projektu dotyczy tylko tego projektu.
+        """
         try:
+            analysis = dict(analysis)
+            source = analysis.pop(self.SOURCE_KEY, None)
+            now = timezone.now()
+            
+            if bill.print_set_id and (source or {}).get('origin') == 'prints':
+                print_set = bill.print_set
+                update_fields = ['analysis', 'analysis_date', 'updated_at']
+                if source is not None:
+                    print_set.analysis_source = source
+                    update_fields.append('analysis_source')
+                print_set.analysis = analysis
+                print_set.analysis_date = now
+                print_set.save(update_fields=update_fields)
+                shared = print_set.bills.update(ai_analysis=analysis, ai_analysis_date=now)
+                if shared > 1:
+                    logger.info(f"Analiza druków {print_set.key} zapisana dla {shared} głosowań")
+                bill.ai_analysis = analysis
+                bill.ai_analysis_date = now
+                return True
+            
+            update_fields = ['ai_analysis', 'ai_analysis_date']
+            if source is not None:
+                bill.ai_analysis_source = source
+                update_fields.append('ai_analysis_source')
             bill.ai_analysis = analysis
-            bill.ai_analysis_date = timezone.now()
-            bill.save(update_fields=['ai_analysis', 'ai_analysis_date'])
+            bill.ai_analysis_date = now
+            bill.save(update_fields=update_fields)
             return True
         except Exception as e:
             logger.error(f"Błąd zapisywania analizy dla projektu {bill.number}: {str(e)}")
@@ -0,0 +1,230 @@
+"""
+Podobieństwo posłów i mapa 2-D na podstawie głosowań
+
+Dla każdej pary posłów trzymane są trzy macierze (posłowie x posłowie):
+- agree: liczba głosowań, w których oboje zagłosowali tak samo (za/przeciw/wstrzymał)
+- shared: liczba głosowań, w których oboje oddali jeden z tych głosów
+- gram: iloczyn skalarny wektorów głosów ze znakiem (za = +1, przeciw = -1)
+
+Wszystkie trzy są sumami po głosowaniach, więc nowe głosowania dodawane są
+przyrostowo (iloczyn macierzowy tylko dla nowych wierszy macierzy głosów).
+Mapa 2-D to PCA posłów liczone z podwójnie scentrowanej macierzy gram
+(rozkład własny macierzy posłowie x posłowie zamiast SVD pełnej macierzy głosów).
+"""
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+from .analytics import AGAINST, CACHE_TIMEOUT, FOR, POSITIONS
+from .models import AnalyticsResult, Deputy
+from .vote_matrix import load_vote_matrix
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = 'similarity.npz'
+# Minimalna liczba wspólnych głosowań, żeby porównywać dwóch posłów
+MIN_SHARED_VOTINGS = 20
+
+
+def _state_path(matrix_dir=None):
+    return os.path.join(str(matrix_dir or settings.VOTE_MATRIX_DIR), STATE_FILE)
+
+
+def _pairwise_counts(votes):
+    """Macierze agree, shared i gram dla podanych wierszy macierzy głosów"""
+    votes = np.asarray(votes)
+    decided = np.isin(votes, POSITIONS).astype(np.float32)
+    agree = np.zeros((votes.shape[1], votes.shape[1]), dtype=np.float32)
+    for position in POSITIONS:
+        same = (votes == position).astype(np.float32)
+        agree += same.T @ same
+    signed = (votes == FOR).astype(np.float32) - (votes == AGAINST).astype(np.float32)
+    return agree, decided.T @ decided, signed.T @ signed
+
+
+def _pad(square, size):
+    """Powiększa macierz kwadratową zerami (nowi posłowie na końcu)"""
+    if square.shape[0] == size:
+        return square
+    padded = np.zeros((size, size), dtype=square.dtype)
+    padded[:square.shape[0], :square.shape[0]] = square
+    return padded
+
+
+def load_similarity_state(matrix_dir=None):
+    """Wczytuje zapisane macierze par posłów (albo None)"""
+    path = _state_path(matrix_dir)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def update_deputy_similarity(matrix=None, rebuild=False, matrix_dir=None):
+    """
+    Dolicza do macierzy par posłów głosowania, których jeszcze w nich nie ma
+
+    Args:
+        matrix: Macierz głosów (domyślnie wczytana z dysku)
+        rebuild: Przelicz wszystko od zera (np. po nadpisaniu istniejących głosowań)
+
+    Returns:
+        int: Liczba dodanych głosowań
+    """
+    matrix = matrix or load_vote_matrix(matrix_dir)
+    if matrix is None:
+        return 0
+
+    state = None if rebuild else load_similarity_state(matrix_dir)
+    if state is not None:
+        known_bills = set(state['bill_ids'].tolist())
+        known_deputies = state['deputy_ids'].tolist()
+        # Posłowie z zapisanego stanu muszą być prefiksem kolumn macierzy (nowi dochodzą na końcu)
+        if not known_bills <= set(matrix.bill_ids) or matrix.deputy_ids[:len(known_deputies)] != known_deputies:
+            state = None
+
+    if state is None:
+        size = len(matrix.deputy_ids)
+        state = {
+            'agree': np.zeros((size, size), dtype=np.float32),
+            'shared': np.zeros((size, size), dtype=np.float32),
+            'gram': np.zeros((size, size), dtype=np.float32),
+            'bill_ids': np.zeros(0, dtype=np.int64),
+        }
+        known_bills = set()
+
+    new_rows = [row for row, bill_id in enumerate(matrix.bill_ids) if bill_id not in known_bills]
+    size = len(matrix.deputy_ids)
+    for key in ('agree', 'shared', 'gram'):
+        state[key] = _pad(state[key], size)
+
+    if new_rows:
+        agree, shared, gram = _pairwise_counts(matrix.votes[new_rows])
+        state['agree'] += agree
+        state['shared'] += shared
+        state['gram'] += gram
+        state['bill_ids'] = np.concatenate([state['bill_ids'], np.asarray(matrix.bill_ids, dtype=np.int64)[new_rows]])
+    state['deputy_ids'] = np.asarray(matrix.deputy_ids, dtype=np.int64)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(_state_path(matrix_dir)), suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp_path, _state_path(matrix_dir))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    compute_deputy_embedding(state)
+    logger.info(f"Podobieństwo posłów: dodano {len(new_rows)} głosowań, razem {len(state['bill_ids'])}")
+    return len(new_rows)
+
+
+def compute_deputy_embedding(state):
+    """Liczy mapę 2-D posłów (PCA) i zapisuje ją jako AnalyticsResult 'deputy_embedding'"""
+    gram = state['gram'].astype(np.float64)
+    deputy_ids = state['deputy_ids'].tolist()
+    if not deputy_ids:
+        return None
+
+    # Podwójne centrowanie macierzy gram = centrowanie głosowań po posłach
+    centered = gram - gram.mean(axis=0) - gram.mean(axis=1)[:, None] + gram.mean()
+    eigenvalues, eigenvectors = np.linalg.eigh(centered)
+    top = np.argsort(eigenvalues)[::-1][:2]
+    coordinates = eigenvectors[:, top] * np.sqrt(np.maximum(eigenvalues[top], 0))
+    # Stały znak osi, żeby mapa nie odwracała się między przeliczeniami
+    signs = np.sign(coordinates[np.abs(coordinates).argmax(axis=0), np.arange(coordinates.shape[1])])
+    coordinates *= np.where(signs == 0, 1, signs)
+
+    total = max(float(eigenvalues[eigenvalues > 0].sum()), 1e-9)
+    deputies = Deputy.objects.in_bulk(deputy_ids)
+    points = []
+    for column, deputy_id in enumerate(deputy_ids):
+        deputy = deputies.get(deputy_id)
+        if deputy is None:
+            continue
+        points.append({
+            'deputy_id': deputy_id,
+            'first_name': deputy.first_name,
+            'last_name': deputy.last_name,
+            'club': deputy.club,
+            'x': round(float(coordinates[column, 0]), 4),
+            'y': round(float(coordinates[column, 1]) if coordinates.shape[1] > 1 else 0.0, 4),
+        })
+
+    data = {
+        'deputies': points,
+        'explained_variance': [round(float(value) / total, 4) for value in np.maximum(eigenvalues[top], 0)],
+        'votings': len(state['bill_ids']),
+    }
+    AnalyticsResult.objects.update_or_create(
+        key='deputy_embedding',
+        defaults={'data': data, 'votings': len(state['bill_ids'])}
+    )
+    cache.set('analytics:deputy_embedding', data, CACHE_TIMEOUT)
+    return data
+
+
+_loaded = {}
+
+
+def _cached_state():
+    """Stan macierzy par posłów, trzymany w pamięci procesu do czasu zmiany pliku"""
+    path = _state_path()
+    if not os.path.exists(path):
+        return None
+    mtime = os.path.getmtime(path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    state = load_similarity_state()
+    state['deputy_index'] = {deputy_id: column for column, deputy_id in enumerate(state['deputy_ids'].tolist())}
+    _loaded[path] = (mtime, state)
+    return state
+
+
+def get_similar_deputies(deputy_id, limit=10):
+    """
+    Posłowie głosujący najbardziej podobnie do wskazanego
+
+    Returns:
+        list | None: None, jeśli posła nie ma w macierzy
+    """
+    state = _cached_state()
+    if state is None or deputy_id not in state['deputy_index']:
+        return None
+
+    column = state['deputy_index'][deputy_id]
+    shared = state['shared'][column]
+    agree = state['agree'][column]
+    min_shared = min(MIN_SHARED_VOTINGS, max(int(shared[column]) // 2, 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = np.where(shared >= min_shared, agree / np.maximum(shared, 1), -1.0)
+    rates[column] = -1.0
+
+    limit = min(limit, int((rates >= 0).sum()))
+    if limit <= 0:
+        return []
+    best = np.argpartition(-rates, limit - 1)[:limit]
+    best = best[np.argsort(-rates[best], kind='stable')]
+
+    deputy_ids = state['deputy_ids']
+    deputies = Deputy.objects.in_bulk([int(deputy_ids[other]) for other in best])
+    similar = []
+    for other in best:
+        deputy = deputies.get(int(deputy_ids[other]))
+        if deputy is None:
+            continue
+        similar.append({
+            'deputy_id': deputy.id,
+            'first_name': deputy.first_name,
+            'last_name': deputy.last_name,
+            'club': deputy.club,
+            'agreement': round(float(rates[other]), 4),
+            'shared_votings': int(shared[other]),
+        })
+    return similar
@@ -0,0 +1,145 @@
+"""
+Lokalne streszczanie ekstrakcyjne tekstów prawnych (TF-IDF, tylko CPU)
+
+Tekst dzielony jest na zdania (z uwzględnieniem skrótów typowych dla aktów
+prawnych: art., ust., pkt, Dz. U. itd.), każde zdanie dostaje wektor TF-IDF,
+a jego ocena to podobieństwo kosinusowe do centroidu całego dokumentu
+z premią za zdania o zmianach przepisów, wejściu w życie i celach regulacji.
+Wybierane są najwyżej ocenione zdania mieszczące się w limicie znaków,
+w kolejności z oryginału. Nagłówki druków (=== DRUK NR ...) są zachowywane.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+# Skróty, po których kropka nie kończy zdania
+ABBREVIATIONS = {
+    'art', 'ust', 'pkt', 'lit', 'poz', 'nr', 'dz', 'zm', 'tj', 'tzw', 'np', 'm.in', 'ww', 'godz',
+    'str', 'par', 'rozdz', 'ozn', 'proc', 'tys', 'mln', 'mld', 'zł', 'gr', 'ok', 'późn',
+}
+# Koniec zdania, pusta linia, nowy artykuł / paragraf / punkt albo granica nagłówka druku
+SENTENCE_END = re.compile(
+    r'(?<=[.;!?])\s+(?=[A-ZĄĆĘŁŃÓŚŹŻ0-9§„"(])'
+    r'|\n\s*\n'
+    r'|\n(?=\s*(?:Art\.|§|\d+[a-z]?\)|\d+\.\s|=== DRUK NR))'
+    r'|(?<====)\s*\n'
+)
+WORD = re.compile(r'[a-ząćęłńóśźż]{3,}')
+HEADER = re.compile(r'^=== DRUK NR .* ===$')
+# Samo oznaczenie jednostki ("Art. 5.", "§ 2.") łączone jest z następnym zdaniem
+UNIT_LABEL = re.compile(r'^(?:Art\.|§)\s*\d+[a-z]*\.$')
+
+STOPWORDS = set("""
+oraz albo lub jest są być został została zostały który która które których którym
+tego tej ten tym tych się nie przez dla przy jako jeżeli jeśli także również może mogą
+od do na po za ze we w z i a o u że aby ani bez pod nad czy tak jak jego jej ich
+art ust pkt lit poz dnia roku rok ustawy ustawa ustawie ustawę przepisy przepisów
+""".split())
+
+# Frazy wskazujące zdania szczególnie istotne dla analizy projektu - premia większa niż
+# zakres podobieństwa kosinusowego, więc takie zdania wybierane są w pierwszej kolejności
+KEY_PHRASES = re.compile(
+    r'(?i)(wchodzi w życie|uchyla się|otrzymuje brzmienie|dodaje się|skreśla się|wprowadza się|'
+    r'celem projektu|projekt ma na celu|przepisy przejściowe|skutki finansowe|kara|grzywn|'
+    r'obowiąz|uprawni|zakaz)'
+)
+KEY_PHRASE_BONUS = 1.0
+
+
+def split_sentences(text):
+    """Dzieli tekst na zdania, nie rozcinając skrótów (art. 5 ust. 2 pkt 3)"""
+    sentences = []
+    pending = ''
+    for part in SENTENCE_END.split(text):
+        if not part or not part.strip():
+            continue
+        part = part.strip()
+        candidate = f"{pending} {part}" if pending else part
+        last_word = re.search(r'(\S+)\.$', candidate)
+        if UNIT_LABEL.match(candidate) or (last_word and last_word.group(1).lower().rstrip('.') in ABBREVIATIONS):
+            pending = candidate
+            continue
+        sentences.append(candidate)
+        pending = ''
+    if pending:
+        sentences.append(pending)
+    return sentences
+
+
+def _tokens(sentence):
+    return [word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS]
+
+
+def score_sentences(sentences):
+    """
+    Ocena zdań: podobieństwo TF-IDF do centroidu dokumentu + premia za kluczowe frazy
+
+    Returns:
+        np.ndarray: Ocena każdego zdania
+    """
+    token_lists = [_tokens(sentence) for sentence in sentences]
+    document_frequency = Counter(word for tokens in token_lists for word in set(tokens))
+    if not document_frequency:
+        return np.zeros(len(sentences))
+
+    vocabulary = {word: index for index, word in enumerate(document_frequency)}
+    idf = np.array([
+        math.log((1 + len(sentences)) / (1 + document_frequency[word])) + 1
+        for word in vocabulary
+    ])
+
+    # Rzadka macierz zdania x słowa jako trójki (wiersz, kolumna, waga)
+    rows, columns, weights = [], [], []
+    for row, tokens in enumerate(token_lists):
+        for word, count in Counter(tokens).items():
+            rows.append(row)
+            columns.append(vocabulary[word])
+            weights.append(1 + math.log(count))
+    rows = np.asarray(rows)
+    columns = np.asarray(columns)
+    weights = np.asarray(weights) * idf[columns]
+    norms = np.sqrt(np.bincount(rows, weights ** 2, minlength=len(sentences)))
+    weights /= np.maximum(norms, 1e-12)[rows]
+
+    centroid = np.bincount(columns, weights, minlength=len(vocabulary)) / len(sentences)
+    centroid /= max(np.linalg.norm(centroid), 1e-12)
+    scores = np.bincount(rows, weights * centroid[columns], minlength=len(sentences))
+    bonus = np.array([KEY_PHRASE_BONUS if KEY_PHRASES.search(sentence) else 0.0 for sentence in sentences])
+    return scores + bonus
+
+
+def summarize_text(text, max_chars):
+    """
+    Wybiera najbardziej informatywne zdania tekstu mieszczące się w max_chars
+
+    Returns:
+        str: Streszczenie (zdania w oryginalnej kolejności); tekst bez zmian,
+            jeśli już mieści się w limicie
+    """
+    if len(text) <= max_chars:
+        return text
+
+    headers = []
+    sentences = []
+    for sentence in split_sentences(text):
+        if HEADER.match(sentence):
+            headers.append(len(sentences))
+        sentences.append(sentence)
+    if not sentences:
+        return text[:max_chars]
+
+    scores = score_sentences(sentences)
+    # Nagłówki druków zawsze w streszczeniu (rozdzielają teksty kilku druków)
+    scores[headers] = np.inf
+
+    selected = []
+    used = 0
+    for index in np.argsort(-scores, kind='stable'):
+        length = len(sentences[index]) + 1
+        if used + length > max_chars:
+            continue
+        selected.append(index)
+        used += length
+    return '\n'.join(sentences[index] for index in sorted(selected))
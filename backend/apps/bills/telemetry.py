@@ -0,0 +1,108 @@
+"""
+Telemetria potoku analizy AI: czasy etapów i liczniki jednego przebiegu
+
+Przebieg analizy (AIAnalysisService) aktywuje obiekt RunTelemetry, a kod
+potoku - pobieranie metadanych i PDF-ów druków, odczyt warstwy tekstowej,
+OCR, skracanie, oczekiwanie na limiter i zapytania do modelu - mierzy się
+przez stage() i count(). Bez aktywnej telemetrii (np. komenda sync_prints)
+oba wywołania nic nie robią. Czasy etapów są wyłączne: czas OCR albo
+pobierania PDF-a wewnątrz odczytu tekstu nie jest liczony podwójnie.
+Wynik zapisywany jest w modelu AnalysisRun.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Etapy potoku w kolejności wykonywania ('other' = czas poza etapami)
+STAGES = ('metadata', 'download', 'text_layer', 'ocr', 'shortening', 'rate_limit', 'llm', 'other')
+
+_current = contextvars.ContextVar('analysis_telemetry', default=None)
+# Stos otwartych etapów bieżącego wątku - do odejmowania czasu etapów zagnieżdżonych
+_frames = threading.local()
+
+
+class RunTelemetry:
+    """Czasy etapów (s) i liczniki jednego przebiegu analizy (bezpieczne wątkowo)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.wall_time = 0.0
+
+    def add_time(self, stage_name, seconds):
+        with self._lock:
+            self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def get(self, counter):
+        return self.counters.get(counter, 0)
+
+    @contextmanager
+    def activate(self):
+        """Ustawia telemetrię jako bieżącą i dolicza czas ściany bloku"""
+        token = _current.set(self)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_time += time.perf_counter() - start
+            _current.reset(token)
+
+    def stage_times(self):
+        """Czasy etapów z czasem poza etapami jako 'other'"""
+        with self._lock:
+            stages = {name: round(seconds, 4) for name, seconds in self.stages.items()}
+        # Etapy z wątków puli (map) mogą łącznie przekroczyć czas ściany
+        stages['other'] = round(max(self.wall_time - sum(stages.values()), 0.0), 4)
+        return stages
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    """Mierzy czas etapu w bieżącym przebiegu (bez czasu etapów zagnieżdżonych)"""
+    telemetry = _current.get()
+    if telemetry is None:
+        yield
+        return
+
+    stack = _frames.__dict__.setdefault('stack', [])
+    frame = [0.0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        telemetry.add_time(name, elapsed - frame[0])
+
+
+def count(counter, value=1):
+    """Zwiększa licznik bieżącego przebiegu"""
+    telemetry = _current.get()
+    if telemetry is not None:
+        telemetry.add(counter, value)
+
+
+def bind(fn):
+    """Przenosi bieżącą telemetrię do funkcji wykonywanej w wątku puli"""
+    telemetry = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(telemetry)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
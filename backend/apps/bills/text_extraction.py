@@ -0,0 +1,313 @@
+"""
+Wspólne wyciąganie tekstu z PDF-ów
+
+Dostępne backendy (wybierane w miejscu wywołania):
+- 'pdfplumber' - pełna analiza layoutu znaków; wolna, ale potrzebna tam, gdzie
+  liczy się układ strony (np. tabele głosów posłów)
+- 'poppler' - `pdftotext` z poppler-utils (jest w obrazie Dockera); szybki
+  tekst ciągły dla druków
+- 'pdfium' - pypdfium2, jeśli jest zainstalowany
+
+pdfplumber trzyma na każdej stronie wynik analizy layoutu (znaki, obiekty,
+mapa tekstu). Przy iteracji po `pdf.pages` wszystkie strony żyją do zamknięcia
+pliku, więc przy dokumentach liczących setki stron pamięć rośnie liniowo.
+Backend pdfplumbera zwalnia cache każdej strony zaraz po jej przetworzeniu.
+
+Gdy druk ma wersję edytowalną (DOCX/ODT), tekst czytany jest bezpośrednio
+z jej XML-a - to o rzędy wielkości taniej niż OCR skanu tego samego dokumentu.
+"""
+import os
+import shutil
+import subprocess
+import zipfile
+from xml.etree import ElementTree
+
+import pdfplumber
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Backend dla tekstu ciągłego (druki, uzasadnienia)
+FAST_BACKEND = 'poppler'
+# Backend dla parsowania zależnego od układu strony
+LAYOUT_BACKEND = 'pdfplumber'
+
+
+def release_page(page):
+    """Zwalnia cache strony pdfplumbera (layout, obiekty, mapa tekstu)"""
+    if hasattr(page, 'close'):
+        # Nowsze wersje pdfplumbera mają dedykowane zamknięcie strony
+        page.close()
+        return
+    page.flush_cache()
+    if hasattr(page, 'get_textmap'):
+        page.get_textmap.cache_clear()
+
+
+def extract_page_text(pdf, page_number):
+    """Wyciąga tekst jednej strony otwartego (pdfplumberem) PDF-a i od razu zwalnia jej cache"""
+    page = pdf.pages[page_number]
+    try:
+        return page.extract_text() or ''
+    finally:
+        release_page(page)
+
+
+class PdfplumberDocument:
+    """Dokument otwarty pdfplumberem"""
+
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_path):
+        self.pdf = pdfplumber.open(pdf_path)
+
+    def __len__(self):
+        return len(self.pdf.pages)
+
+    def page_text(self, page_number):
+        return extract_page_text(self.pdf, page_number)
+
+    def iter_page_texts(self):
+        for page_number in range(len(self)):
+            yield page_number, self.page_text(page_number)
+
+    def close(self):
+        self.pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PopplerDocument:
+    """Dokument czytany przez `pdftotext` (poppler-utils)"""
+
+    name = 'poppler'
+
+    def __init__(self, pdf_path):
+        self.pdf_path = str(pdf_path)
+        self._page_count = None
+
+    @staticmethod
+    def is_available():
+        return shutil.which('pdftotext') is not None and shutil.which('pdfinfo') is not None
+
+    def __len__(self):
+        if self._page_count is None:
+            output = subprocess.run(
+                ['pdfinfo', self.pdf_path], capture_output=True, text=True, check=True
+            ).stdout
+            self._page_count = 0
+            for line in output.splitlines():
+                if line.startswith('Pages:'):
+                    self._page_count = int(line.split()[1])
+                    break
+        return self._page_count
+
+    def page_text(self, page_number):
+        page = str(page_number + 1)
+        return subprocess.run(
+            ['pdftotext', '-enc', 'UTF-8', '-f', page, '-l', page, self.pdf_path, '-'],
+            capture_output=True, text=True, check=True
+        ).stdout.rstrip('\f')
+
+    def iter_page_texts(self):
+        """Jeden proces pdftotext dla całego dokumentu; strony rozdzielone znakiem \\f"""
+        process = subprocess.Popen(
+            ['pdftotext', '-enc', 'UTF-8', self.pdf_path, '-'],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, encoding='utf-8'
+        )
+        try:
+            page_number = 0
+            buffer = ''
+            while True:
+                chunk = process.stdout.read(64 * 1024)
+                if not chunk:
+                    break
+                buffer += chunk
+                *pages, buffer = buffer.split('\f')
+                for page_text in pages:
+                    yield page_number, page_text
+                    page_number += 1
+            # pdftotext kończy każdą stronę znakiem \f, więc reszta bufora jest pusta
+            if buffer.strip():
+                yield page_number, buffer
+            if process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, 'pdftotext')
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PdfiumDocument:
+    """Dokument czytany przez pypdfium2"""
+
+    name = 'pdfium'
+
+    def __init__(self, pdf_path):
+        import pypdfium2
+        self.pdf = pypdfium2.PdfDocument(str(pdf_path))
+
+    @staticmethod
+    def is_available():
+        try:
+            import pypdfium2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def __len__(self):
+        return len(self.pdf)
+
+    def page_text(self, page_number):
+        page = self.pdf[page_number]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+            page.close()
+
+    def iter_page_texts(self):
+        for page_number in range(len(self)):
+            yield page_number, self.page_text(page_number)
+
+    def close(self):
+        self.pdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+BACKENDS = {
+    'pdfplumber': PdfplumberDocument,
+    'poppler': PopplerDocument,
+    'pdfium': PdfiumDocument,
+}
+
+
+def is_backend_available(backend):
+    document_class = BACKENDS[backend]
+    return not hasattr(document_class, 'is_available') or document_class.is_available()
+
+
+def open_document(pdf_path, backend=LAYOUT_BACKEND):
+    """
+    Otwiera PDF wybranym backendem
+
+    Gdy backend nie jest dostępny w środowisku (np. brak poppler-utils),
+    używany jest pdfplumber.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Nieznany backend ekstrakcji tekstu: {backend}")
+    if not is_backend_available(backend):
+        logger.warning(f"Backend {backend} niedostępny, używam pdfplumber")
+        backend = 'pdfplumber'
+    return BACKENDS[backend](pdf_path)
+
+
+def iter_page_texts(pdf_path, backend=LAYOUT_BACKEND):
+    """
+    Generator zwracający (numer_strony, tekst) dla kolejnych stron PDF-a
+
+    Numeracja stron od 0. Pamięć nie rośnie z liczbą stron dokumentu.
+    """
+    with open_document(pdf_path, backend) as document:
+        yield from document.iter_page_texts()
+
+
+# Preferowana kolejność formatów załączników (najtańsze i najdokładniejsze najpierw)
+ATTACHMENT_FORMATS = ('docx', 'odt', 'pdf')
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+ODF_TEXT_NS = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+
+def get_attachment_format(name):
+    """Zwraca format załącznika ('docx', 'odt', 'pdf') albo None dla nieobsługiwanych"""
+    extension = os.path.splitext(name.lower())[1].lstrip('.')
+    return extension if extension in ATTACHMENT_FORMATS else None
+
+
+def rank_attachments(names):
+    """Sortuje obsługiwane załączniki według preferowanego formatu (stabilnie)"""
+    supported = [name for name in names if get_attachment_format(name)]
+    return sorted(supported, key=lambda name: ATTACHMENT_FORMATS.index(get_attachment_format(name)))
+
+
+def extract_docx_text(path):
+    """Wyciąga tekst z DOCX (word/document.xml), akapit po akapicie"""
+    paragraphs = []
+    parts = []
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as xml_file:
+        for _, element in ElementTree.iterparse(xml_file, events=('end',)):
+            tag = element.tag
+            if tag == WORD_NS + 't':
+                parts.append(element.text or '')
+            elif tag == WORD_NS + 'tab':
+                parts.append('\t')
+            elif tag in (WORD_NS + 'br', WORD_NS + 'cr'):
+                parts.append('\n')
+            elif tag == WORD_NS + 'p':
+                paragraphs.append(''.join(parts))
+                parts = []
+                element.clear()
+    return '\n'.join(paragraphs).strip()
+
+
+def _odf_element_text(element):
+    """Tekst elementu ODF z obsługą spacji (text:s), tabulatorów i łamań wiersza"""
+    parts = [element.text or '']
+    for child in element:
+        if child.tag == ODF_TEXT_NS + 's':
+            parts.append(' ' * int(child.get(ODF_TEXT_NS + 'c', '1')))
+        elif child.tag == ODF_TEXT_NS + 'tab':
+            parts.append('\t')
+        elif child.tag == ODF_TEXT_NS + 'line-break':
+            parts.append('\n')
+        else:
+            parts.append(_odf_element_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def extract_odt_text(path):
+    """Wyciąga tekst z ODT (content.xml), akapit po akapicie"""
+    paragraphs = []
+    depth = 0
+    with zipfile.ZipFile(path) as archive, archive.open('content.xml') as xml_file:
+        for event, element in ElementTree.iterparse(xml_file, events=('start', 'end')):
+            if element.tag not in (ODF_TEXT_NS + 'p', ODF_TEXT_NS + 'h'):
+                continue
+            # Akapity zagnieżdżone (np. w przypisach) są częścią zewnętrznego akapitu
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                paragraphs.append(_odf_element_text(element))
+                element.clear()
+    return '\n'.join(paragraphs).strip()
+
+
+def extract_document_text(path, attachment_format):
+    """Wyciąga cały tekst z edytowalnego dokumentu (DOCX/ODT)"""
+    if attachment_format == 'docx':
+        return extract_docx_text(path)
+    if attachment_format == 'odt':
+        return extract_odt_text(path)
+    raise ValueError(f"Format {attachment_format} nie jest dokumentem edytowalnym")
@@ -13,8 +13,20 @@ urlpatterns = [
     path('trending/', views.trending_bills, name='trending-bills'),
     path('<int:bill_id>/ai-analysis/generate/', views.generate_ai_analysis, name='generate-ai-analysis'),
     path('<int:bill_id>/ai-analysis/', views.get_ai_analysis, name='get-ai-analysis'),
+    path('ai-analysis/jobs/<int:job_id>/', views.analysis_job_status, name='analysis-job-status'),
+    path('<int:bill_id>/alignment/', views.bill_citizen_alignment, name='bill-citizen-alignment'),
     path('<int:bill_id>/pdf-data/', views.get_voting_pdf_data, name='get-voting-pdf-data'),
     path('<int:bill_id>/project-pdfs/', views.get_voting_project_pdfs, name='get-voting-project-pdfs'),
+    path('prints/<str:print_number>/structure/', views.print_structure, name='print-structure'),
+    path('deputies/', views.DeputyListView.as_view(), name='deputy-list'),
+    path('deputies/<int:deputy_id>/votes/', views.DeputyVoteHistoryView.as_view(), name='deputy-vote-history'),
+    path('deputies/<int:deputy_id>/similar/', views.similar_deputies, name='similar-deputies'),
+    path('analytics/deputy-embedding/', views.deputy_embedding, name='deputy-embedding'),
+    path('match/', views.user_club_match, name='user-club-match'),
+    path('analytics/citizen-alignment/', views.citizen_alignment, name='citizen-alignment'),
+    path('analytics/cohesion/', views.club_cohesion, name='club-cohesion'),
+    path('analytics/rebels/', views.rebel_deputies, name='rebel-deputies'),
+    path('analytics/club-agreement/', views.club_agreement, name='club-agreement'),
     path('club-colors/', views.ClubColorListView.as_view(), name='club-color-list'),
     path('club-colors/<int:pk>/', views.ClubColorDetailView.as_view(), name='club-color-detail'),
     path('club-colors/active/', views.get_club_colors, name='get-club-colors'),
@@ -0,0 +1,121 @@
+"""
+Dopasowanie użytkownika do klubów i posłów na podstawie jego głosów
+
+Głosy użytkownika (BillVote: za = +1, przeciw = -1, neutralny pomijany)
+tworzą rzadki wektor po głosowaniach. Wektory posłów (z macierzy głosów)
+i klubów (stanowiska większości) są policzone wcześniej, więc dopasowanie
+to dwa iloczyny skalarne wektora użytkownika z macierzami:
+
+    zgodne - niezgodne = u · V
+    wspólne            = |u| · |V|
+
+skąd zgodne = (wspólne + u · V) / 2.
+"""
+import numpy as np
+import logging
+
+from .analytics import AGAINST, FOR, load_club_positions
+from .models import BillVote, Deputy
+from .vote_matrix import load_vote_matrix
+
+logger = logging.getLogger(__name__)
+
+USER_SIGNS = {'support': 1, 'against': -1}
+# Minimalna liczba wspólnych głosowań, żeby pokazać posła na liście
+MIN_SHARED_VOTINGS = 3
+
+_vectors = {}
+
+
+def _signed(codes):
+    """Kody głosów -> +1 (za), -1 (przeciw), 0 (pozostałe)"""
+    codes = np.asarray(codes)
+    return ((codes == FOR).astype(np.int8) - (codes == AGAINST).astype(np.int8))
+
+
+def get_match_vectors():
+    """
+    Wektory posłów i klubów ze znakiem (głosowania x posłowie / kluby)
+
+    Trzymane w pamięci procesu do czasu przebudowania macierzy głosów.
+    """
+    matrix = load_vote_matrix()
+    if matrix is None:
+        return None
+    cached = _vectors.get('current')
+    if cached and cached['matrix'] is matrix:
+        return cached
+
+    vectors = {
+        'matrix': matrix,
+        'deputies': _signed(matrix.votes),
+        'clubs': _signed(load_club_positions(matrix)),
+    }
+    _vectors['current'] = vectors
+    return vectors
+
+
+def _agreement(user_signs, vectors):
+    """Liczba wspólnych i zgodnych głosowań dla każdej kolumny macierzy"""
+    values = vectors.astype(np.int32)
+    dot = user_signs @ values
+    shared = np.abs(user_signs) @ np.abs(values)
+    return shared, (shared + dot) // 2
+
+
+def match_user(user, deputies_limit=10):
+    """
+    Zgodność użytkownika z klubami i najbliżsi posłowie
+
+    Returns:
+        dict | None: None, jeśli macierz głosów nie została jeszcze zbudowana
+    """
+    vectors = get_match_vectors()
+    if vectors is None:
+        return None
+    matrix = vectors['matrix']
+
+    rows = []
+    signs = []
+    for bill_id, vote in BillVote.objects.filter(user=user, vote__in=USER_SIGNS).values_list('bill_id', 'vote'):
+        row = matrix.bill_index.get(bill_id)
+        if row is not None:
+            rows.append(row)
+            signs.append(USER_SIGNS[vote])
+
+    result = {'compared_votings': len(rows), 'clubs': [], 'deputies': []}
+    if not rows:
+        return result
+    user_signs = np.asarray(signs, dtype=np.int32)
+
+    shared, agree = _agreement(user_signs, vectors['clubs'][rows])
+    for club_number, club_name in enumerate(matrix.club_names):
+        if shared[club_number]:
+            result['clubs'].append({
+                'club': club_name,
+                'agreement': round(float(agree[club_number] / shared[club_number]), 4),
+                'shared_votings': int(shared[club_number]),
+            })
+    result['clubs'].sort(key=lambda club: club['agreement'], reverse=True)
+
+    shared, agree = _agreement(user_signs, vectors['deputies'][rows])
+    min_shared = min(MIN_SHARED_VOTINGS, len(rows))
+    rates = np.where(shared >= min_shared, agree / np.maximum(shared, 1), -1.0)
+    limit = min(deputies_limit, int((rates >= 0).sum()))
+    if limit > 0:
+        best = np.argpartition(-rates, limit - 1)[:limit]
+        best = best[np.argsort(-rates[best], kind='stable')]
+        deputies = Deputy.objects.in_bulk([matrix.deputy_ids[column] for column in best])
+        for column in best:
+            deputy = deputies.get(matrix.deputy_ids[column])
+            if deputy is None:
+                continue
+            result['deputies'].append({
+                'deputy_id': deputy.id,
+                'first_name': deputy.first_name,
+                'last_name': deputy.last_name,
+                'club': deputy.club,
+                'agreement': round(float(rates[column]), 4),
+                'shared_votings': int(shared[column]),
+            })
+    return result
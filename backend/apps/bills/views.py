@@ -3,16 +3,23 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, F
+from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
-import re
 
-from .models import Bill, BillVote, BillUpdate, ClubColor
+from .models import AnalysisJob, Bill, BillAlignment, BillVote, BillUpdate, ClubColor, Deputy, DeputyVote, Print
 from .serializers import (
     BillSerializer, BillVoteSerializer, BillUpdateSerializer, 
-    BillCreateSerializer, BillStatsSerializer, ClubColorSerializer
+    BillCreateSerializer, BillStatsSerializer, ClubColorSerializer,
+    DeputySerializer, DeputyVoteHistorySerializer, AnalysisJobSerializer
 )
-from .services import AIAnalysisService
+from .alignment import get_alignment_summary
+from .analytics import get_analytics
+from .jobs import TooManyJobs, enqueue_analysis
+from .legal_structure import ensure_structure, locate
+from .prints import DEFAULT_TERM, extract_print_numbers
+from .similarity import get_similar_deputies
+from .user_match import match_user
 
 
 class BillListView(generics.ListAPIView):
@@ -217,7 +224,13 @@ def trending_bills(request):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def generate_ai_analysis(request, bill_id):
-    """Generuje analizę AI dla konkretnego projektu ustawy"""
+    """
+    Zleca wygenerowanie analizy AI dla projektu ustawy
+
+    Analiza wykonywana jest w tle - odpowiedź 202 zawiera identyfikator
+    zadania, którego status można sprawdzać pod status_url. Jeśli dla
+    projektu trwa już zadanie, żądanie dołącza do niego.
+    """
     try:
         bill = Bill.objects.get(id=bill_id)
     except Bill.DoesNotExist:
@@ -234,39 +247,36 @@ def generate_ai_analysis(request, bill_id):
         )
     
     try:
-        # Wygeneruj analizę
-        ai_service = AIAnalysisService()
-        analysis = ai_service.analyze_bill(bill)
-        
-        if 'error' in analysis:
-            return Response(
-                {'error': analysis['error']}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        
-        # Zapisz analizę
-        if ai_service.save_analysis_to_bill(bill, analysis):
-            # Odśwież bill z bazy danych aby uzyskać analysis_date
-            bill.refresh_from_db()
-            return Response({
-                'success': True,
-                'analysis': analysis,
-                'analysis_date': bill.ai_analysis_date,
-                'bill_id': bill.id,
-                'bill_title': bill.title,
-                'message': 'Analiza została wygenerowana pomyślnie'
-            })
-        else:
-            return Response(
-                {'error': 'Błąd podczas zapisywania analizy'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-            
-    except Exception as e:
+        job, created = enqueue_analysis(bill, request.user)
+    except TooManyJobs:
         return Response(
-            {'error': f'Błąd podczas generowania analizy: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': 'Masz już aktywne zadania analizy - poczekaj na ich zakończenie'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
         )
+    
+    data = AnalysisJobSerializer(job).data
+    data['created'] = created
+    data['status_url'] = request.build_absolute_uri(reverse('analysis-job-status', args=[job.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def analysis_job_status(request, job_id):
+    """Status zadania analizy AI (po zakończeniu razem z analizą)"""
+    try:
+        job = AnalysisJob.objects.select_related('bill').get(id=job_id)
+    except AnalysisJob.DoesNotExist:
+        return Response(
+            {'error': 'Zadanie nie zostało znalezione'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    data = AnalysisJobSerializer(job).data
+    if job.status == 'done':
+        data['analysis'] = job.bill.ai_analysis
+        data['analysis_date'] = job.bill.ai_analysis_date
+    return Response(data)
 
 
 @api_view(['GET'])
@@ -298,56 +308,36 @@ def get_ai_analysis(request, bill_id):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_voting_pdf_data(request, bill_id):
-    """Pobiera dane posłów z PDF-a głosowania"""
+    """Zwraca głosy posłów w głosowaniu (sparsowane z PDF-a przy imporcie)"""
     try:
-        bill = Bill.objects.get(id=bill_id)
+        bill = Bill.objects.only('id', 'attachments').get(id=bill_id)
     except Bill.DoesNotExist:
         return Response(
             {'error': 'Projekt ustawy nie został znaleziony'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Sprawdź czy są dostępne załączniki PDF
-    if not bill.attachments or len(bill.attachments) == 0:
+    # Głosy posłów zapisane przy imporcie głosowania - bez parsowania PDF-a
+    deputy_votes = DeputyVote.objects.filter(bill_id=bill.id).order_by('position').values_list(
+        'club', 'deputy__first_name', 'deputy__last_name', 'vote'
+    )
+    deputies = [
+        {'party': club, 'first_name': first_name, 'last_name': last_name, 'vote': vote}
+        for club, first_name, last_name, vote in deputy_votes
+    ]
+    
+    if not deputies:
         return Response(
-            {'error': 'Brak dostępnych plików PDF'}, 
+            {'error': 'Brak zapisanych głosów posłów dla tego głosowania'}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    try:
-        import requests
-        import pdfplumber
-        import io
-        import re
-        
-        # Pobierz pierwszy PDF
-        pdf_url = bill.attachments[0]['url']
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        
-        # Przetwórz PDF
-        pdf_data = []
-        with pdfplumber.open(io.BytesIO(response.content)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    # Parsuj dane posłów
-                    deputies = parse_deputies_from_text(text)
-                    pdf_data.extend(deputies)
-        
-        # Nie sortujemy - wyświetlamy dokładnie tak jak w pliku PDF
-        
-        return Response({
-            'deputies': pdf_data,
-            'total_count': len(pdf_data),
-            'pdf_url': pdf_url
-        })
-        
-    except Exception as e:
-        return Response(
-            {'error': f'Błąd podczas przetwarzania PDF: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    # Kolejność jak w pliku PDF
+    return Response({
+        'deputies': deputies,
+        'total_count': len(deputies),
+        'pdf_url': bill.attachments[0]['url'] if bill.attachments else None
+    })
 
 
 @api_view(['GET'])
@@ -363,9 +353,7 @@ def get_voting_project_pdfs(request, bill_id):
         )
     
     try:
-        import requests
-        
-        # Pobierz dane głosowania z API Sejmu
+        # Dane głosowania zapisane przy imporcie z API Sejmu
         voting_data = bill.api_data
         if not voting_data:
             return Response(
@@ -383,15 +371,20 @@ def get_voting_project_pdfs(request, bill_id):
                 'message': 'Brak numerów druków w tytule głosowania'
             })
         
-        # Pobierz PDF-y dla każdego numeru druku
+        # Załączniki druków z bazy - bez zapytań do API Sejmu
+        prints = {
+            print_obj.number: print_obj
+            for print_obj in Print.objects.filter(term=DEFAULT_TERM, number__in=print_numbers, exists=True)
+        }
         all_pdfs = []
         for print_number in print_numbers:
-            pdfs = download_print_pdfs(print_number)
-            all_pdfs.extend(pdfs)
+            if print_number in prints:
+                all_pdfs.extend(prints[print_number].attachments or [])
         
         return Response({
             'project_pdfs': all_pdfs,
             'print_numbers': print_numbers,
+            'missing_prints': [number for number in print_numbers if number not in prints],
             'total_count': len(all_pdfs)
         })
         
@@ -402,128 +395,33 @@ def get_voting_project_pdfs(request, bill_id):
         )
 
 
-def parse_deputies_from_text(text):
-    """Parsuje dane posłów z tekstu PDF"""
-    deputies = []
-    current_party = None
-    
-    lines = text.split('\n')
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def print_structure(request, print_number):
+    """
+    Struktura tekstu druku (artykuły, ustępy, punkty z zakresami znaków)
+
+    Z parametrem ?offset=N zwraca też ścieżkę jednostek zawierających
+    pozycję N w tekście (np. do podświetlenia wyniku wyszukiwania).
+    """
+    print_obj = Print.objects.filter(term=DEFAULT_TERM, number=print_number, exists=True).exclude(text='').first()
+    if print_obj is None:
+        return Response(
+            {'error': 'Brak tekstu druku'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Sprawdź czy to nazwa partii (np. "PiS(188)", "Konfederacja_KP(3)", "PSL-TD(63)", "niez.(4)")
-        party_match = re.search(r'^([A-ZĄĆĘŁŃÓŚŹŻa-ząćęłńóśźż_.-]+)\([0-9]+\)', line)
-        if party_match:
-            current_party = party_match.group(1).strip()
-            continue
-        
-        # Sprawdź czy to linia z posłami (zawiera skróty głosów)
-        if current_party and any(word in line.lower() for word in ['za', 'pr.', 'wstrzymał', 'ws.', 'ng.', 'nie', 'ob.']):
-            # Podziel linię na poszczególnych posłów
-            # Format PDF: "NAZWISKO IMIĘ skrót_głosu NAZWISKO IMIĘ skrót_głosu"
-            words = line.split()
-            i = 0
-            while i < len(words):
-                if i + 1 < len(words):
-                    # Sprawdź czy to nazwisko i imię (format PDF: NAZWISKO IMIĘ)
-                    if (words[i].isupper() and words[i+1].isupper() and 
-                        i + 2 < len(words)):
-                        
-                        last_name = words[i]  # Pierwsze słowo to zawsze NAZWISKO
-                        first_name = words[i+1]  # Drugie słowo to IMIĘ (może być pierwsze z kilku)
-                        vote_short = words[i+2].lower()
-                        
-                        # Mapuj skróty na pełne nazwy głosów
-                        if vote_short == 'za':
-                            vote = 'ZA'
-                        elif vote_short == 'pr.':
-                            vote = 'PRZECIW'
-                        elif vote_short == 'wstrzymał' or vote_short == 'ws.':
-                            vote = 'WSTRZYMAŁ'
-                        elif vote_short == 'ng.':
-                            vote = 'NIE GŁOSOWAŁ'
-                        elif vote_short == 'ob.':
-                            vote = 'OBECNY'
-                        elif vote_short == 'nie' and i + 3 < len(words) and words[i+3].lower() == 'głosował':
-                            vote = 'NIE GŁOSOWAŁ'
-                            i += 4
-                            deputies.append({
-                                'party': current_party,
-                                'first_name': first_name,
-                                'last_name': last_name,
-                                'vote': vote
-                            })
-                            continue
-                        else:
-                            i += 1
-                            continue
-                        
-                        deputies.append({
-                            'party': current_party,
-                            'first_name': first_name,
-                            'last_name': last_name,
-                            'vote': vote
-                        })
-                        i += 3
-                    else:
-                        i += 1
-                else:
-                    i += 1
-    
-    return deputies
+    structure = ensure_structure(print_obj)
+    data = {'print_number': print_obj.number, 'structure': structure}
+    offset = request.query_params.get('offset')
+    if offset is not None and offset.isdigit():
+        data['path'] = locate(structure, int(offset))
+    return Response(data)
 
 
 def extract_print_numbers_from_title(title):
     """Wyciąga numery druków z tytułu głosowania"""
-    import re
-    # Znajdź wszystkie liczby 3-5 cyfrowe
-    numbers = re.findall(r'\d{3,5}', title)
-    return numbers
-
-
-def download_print_pdfs(print_number):
-    """Pobiera PDF-y dla danego numeru druku"""
-    import requests
-    
-    headers = {"Accept": "application/json"}
-    url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}"
-    
-    try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        pdf_files = []
-        
-        # Główne załączniki
-        for att in data.get("attachments", []):
-            if att.endswith(".pdf"):
-                pdf_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}/{att}"
-                pdf_files.append({
-                    'name': att,
-                    'url': pdf_url,
-                    'type': 'main_attachment'
-                })
-        
-        # Dodatkowe druki
-        for add in data.get("additionalPrints", []):
-            for att in add.get("attachments", []):
-                if att.endswith(".pdf"):
-                    pdf_url = f"https://api.sejm.gov.pl/sejm/term10/prints/{print_number}/{att}"
-                    pdf_files.append({
-                        'name': att,
-                        'url': pdf_url,
-                        'type': 'additional_print'
-                    })
-        
-        return pdf_files
-        
-    except Exception as e:
-        print(f"Błąd pobierania druku {print_number}: {str(e)}")
-        return []
+    return extract_print_numbers(title)
 
 
 class ClubColorListView(generics.ListCreateAPIView):
@@ -548,3 +446,143 @@ def get_club_colors(request):
     serializer = ClubColorSerializer(colors, many=True)
     return Response(serializer.data)
 
+
+class DeputyListView(generics.ListAPIView):
+    """Lista posłów z wyszukiwaniem po imieniu i nazwisku"""
+    queryset = Deputy.objects.all()
+    serializer_class = DeputySerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['club']
+    search_fields = ['last_name', 'first_name']
+    ordering = ['last_name', 'first_name']
+
+
+class DeputyVoteHistoryView(generics.ListAPIView):
+    """Historia głosowań posła"""
+    serializer_class = DeputyVoteHistorySerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['vote', 'club']
+    
+    def get_queryset(self):
+        return DeputyVote.objects.filter(deputy_id=self.kwargs['deputy_id']).select_related('bill').order_by(
+            '-bill__session_number', '-bill__voting_number'
+        )
+
+
+def analytics_response(key):
+    """Odpowiedź z przeliczonym wynikiem analizy głosowań"""
+    data = get_analytics(key)
+    if data is None:
+        return Response(
+            {'error': 'Analiza nie została jeszcze przeliczona'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def club_cohesion(request):
+    """Spójność klubów (średni indeks Rice'a we wszystkich głosowaniach)"""
+    return analytics_response('cohesion')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def rebel_deputies(request):
+    """Posłowie najczęściej głosujący wbrew większości własnego klubu"""
+    return analytics_response('rebels')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def club_agreement(request):
+    """Macierz zgodności stanowisk klubów"""
+    return analytics_response('club_agreement')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def deputy_embedding(request):
+    """Mapa 2-D posłów (PCA głosowań) do wykresu punktowego"""
+    return analytics_response('deputy_embedding')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def similar_deputies(request, deputy_id):
+    """Posłowie głosujący najbardziej podobnie do wskazanego posła"""
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+    except ValueError:
+        limit = 10
+    
+    similar = get_similar_deputies(deputy_id, limit)
+    if similar is None:
+        return Response(
+            {'error': 'Brak danych o głosowaniach posła'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({
+        'deputy_id': deputy_id,
+        'similar': similar
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def citizen_alignment(request):
+    """Jak często Sejm i poszczególne kluby głosują tak, jak większość obywateli"""
+    return Response(get_alignment_summary())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def bill_citizen_alignment(request, bill_id):
+    """Porównanie głosów obywateli z wynikiem głosowania w Sejmie dla projektu"""
+    try:
+        alignment = BillAlignment.objects.get(bill_id=bill_id)
+    except BillAlignment.DoesNotExist:
+        return Response(
+            {'error': 'Brak danych o zgodności dla tego projektu'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({
+        'bill_id': bill_id,
+        'citizens': {
+            'support': alignment.citizen_support,
+            'against': alignment.citizen_against,
+            'neutral': alignment.citizen_neutral,
+            'position': alignment.citizen_position,
+        },
+        'sejm': {
+            'yes': alignment.sejm_yes,
+            'no': alignment.sejm_no,
+            'position': alignment.sejm_position,
+        },
+        'aligned': alignment.aligned,
+        'club_matches': alignment.club_matches,
+        'updated_at': alignment.updated_at
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def user_club_match(request):
+    """Zgodność głosów zalogowanego użytkownika z klubami i najbliżsi posłowie"""
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+    except ValueError:
+        limit = 10
+    
+    match = match_user(request.user, deputies_limit=limit)
+    if match is None:
+        return Response(
+            {'error': 'Macierz głosów posłów nie została jeszcze zbudowana'}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return Response(match)
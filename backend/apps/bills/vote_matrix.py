@@ -0,0 +1,183 @@
+"""
+Macierz głosów posłów (głosowania x posłowie) w postaci tablicy int8
+
+Głosy z tabeli DeputyVote zapisywane są jako jeden plik .npy dla całej
+kadencji (wiersz = głosowanie, kolumna = poseł), obok macierz klubów
+(numer klubu posła w danym głosowaniu) oraz indeks JSON z identyfikatorami
+głosowań, posłów i nazwami klubów. Loader mapuje plik w pamięć (mmap),
+więc wczytanie pełnej macierzy trwa milisekundy i nie wymaga dekodowania
+JSON-a z club_results.
+
+Każda przebudowa zapisuje komplet plików w nowym katalogu wersji, a na
+końcu atomowo podmienia plik CURRENT z nazwą tego katalogu. Czytelnik
+zawsze widzi pliki jednej wersji, nigdy macierz z jednej i indeks z innej.
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from django.conf import settings
+import logging
+
+from .models import DeputyVote
+
+logger = logging.getLogger(__name__)
+
+# Kody głosów w macierzy (0 = poseł nie brał udziału w głosowaniu / brak danych)
+ABSENT = 0
+VOTE_CODES = {
+    'ZA': 1,
+    'PRZECIW': 2,
+    'WSTRZYMAŁ': 3,
+    'NIE GŁOSOWAŁ': 4,
+    'OBECNY': 5,
+}
+VOTE_LABELS = {code: vote for vote, code in VOTE_CODES.items()}
+
+# Komórka macierzy klubów dla posła spoza głosowania
+NO_CLUB = -1
+
+MATRIX_FILE = 'votes.npy'
+CLUBS_FILE = 'clubs.npy'
+INDEX_FILE = 'index.json'
+# Wskaźnik na katalog bieżącej wersji macierzy
+CURRENT_FILE = 'CURRENT'
+VERSION_PREFIX = 'v'
+# Poprzednie wersje zostawiane dla procesów, które jeszcze ich używają
+KEEP_VERSIONS = 2
+
+
+class VoteMatrix:
+    """Macierz głosów z indeksami głosowań (wiersze) i posłów (kolumny)"""
+
+    def __init__(self, votes, clubs, bill_ids, deputy_ids, club_names, built_at=None):
+        self.votes = votes
+        self.clubs = clubs
+        self.bill_ids = bill_ids
+        self.deputy_ids = deputy_ids
+        self.club_names = club_names
+        self.built_at = built_at
+        self.bill_index = {bill_id: row for row, bill_id in enumerate(bill_ids)}
+        self.deputy_index = {deputy_id: column for column, deputy_id in enumerate(deputy_ids)}
+
+    @property
+    def shape(self):
+        return self.votes.shape
+
+    def bill_votes(self, bill_id):
+        """Wektor głosów wszystkich posłów w głosowaniu"""
+        return self.votes[self.bill_index[bill_id]]
+
+    def deputy_votes(self, deputy_id):
+        """Wektor głosów posła we wszystkich głosowaniach"""
+        return self.votes[:, self.deputy_index[deputy_id]]
+
+
+def build_vote_matrix(matrix_dir=None):
+    """
+    Buduje macierz głosów z tabeli DeputyVote i zapisuje ją atomowo
+
+    Returns:
+        VoteMatrix: Zbudowana macierz (w pamięci)
+    """
+    matrix_dir = str(matrix_dir or settings.VOTE_MATRIX_DIR)
+    os.makedirs(matrix_dir, exist_ok=True)
+
+    # order_by() wyłącza domyślne sortowanie modelu - kolejność wierszy nie ma tu znaczenia
+    rows = DeputyVote.objects.order_by().values_list('bill_id', 'deputy_id', 'club', 'vote')
+    bill_ids = sorted(DeputyVote.objects.order_by().values_list('bill_id', flat=True).distinct())
+    deputy_ids = sorted(DeputyVote.objects.order_by().values_list('deputy_id', flat=True).distinct())
+    bill_index = {bill_id: row for row, bill_id in enumerate(bill_ids)}
+    deputy_index = {deputy_id: column for column, deputy_id in enumerate(deputy_ids)}
+    club_index = {}
+
+    votes = np.zeros((len(bill_ids), len(deputy_ids)), dtype=np.int8)
+    clubs = np.full((len(bill_ids), len(deputy_ids)), NO_CLUB, dtype=np.int16)
+    for bill_id, deputy_id, club, vote in rows.iterator(chunk_size=10000):
+        row, column = bill_index[bill_id], deputy_index[deputy_id]
+        votes[row, column] = VOTE_CODES.get(vote, ABSENT)
+        clubs[row, column] = club_index.setdefault(club, len(club_index))
+    club_names = sorted(club_index, key=club_index.get)
+
+    built_at = time.time()
+    version = f'{VERSION_PREFIX}{time.time_ns()}'
+    version_dir = os.path.join(matrix_dir, version)
+    os.makedirs(version_dir)
+    _atomic_write(version_dir, MATRIX_FILE, lambda f: np.save(f, votes))
+    _atomic_write(version_dir, CLUBS_FILE, lambda f: np.save(f, clubs))
+    index = {'bill_ids': bill_ids, 'deputy_ids': deputy_ids, 'club_names': club_names, 'built_at': built_at}
+    _atomic_write(version_dir, INDEX_FILE, lambda f: f.write(json.dumps(index).encode('utf-8')))
+    # Podmiana wskaźnika publikuje komplet plików nowej wersji naraz
+    _atomic_write(matrix_dir, CURRENT_FILE, lambda f: f.write(version.encode('utf-8')))
+    _remove_old_versions(matrix_dir, version)
+
+    logger.info(f"Zbudowano macierz głosów {votes.shape[0]} x {votes.shape[1]}")
+    return VoteMatrix(votes, clubs, bill_ids, deputy_ids, club_names, built_at)
+
+
+def _atomic_write(matrix_dir, filename, write):
+    fd, tmp_path = tempfile.mkstemp(dir=matrix_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, os.path.join(matrix_dir, filename))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _remove_old_versions(matrix_dir, current_version):
+    """Usuwa najstarsze katalogi wersji (otwarte mmapy działają dalej po usunięciu pliku)"""
+    versions = sorted(
+        name for name in os.listdir(matrix_dir)
+        if name.startswith(VERSION_PREFIX) and name != current_version
+        and os.path.isdir(os.path.join(matrix_dir, name))
+    )
+    for name in versions[:max(len(versions) - (KEEP_VERSIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(matrix_dir, name), ignore_errors=True)
+
+
+def _read_version(matrix_dir):
+    try:
+        with open(os.path.join(matrix_dir, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+_loaded = {}
+
+
+def load_vote_matrix(matrix_dir=None):
+    """
+    Wczytuje macierz głosów (mmap, tylko do odczytu)
+
+    Wynik jest trzymany w pamięci procesu do czasu zmiany wersji w CURRENT.
+    Zwraca None, jeśli macierz nie została jeszcze zbudowana.
+    """
+    matrix_dir = str(matrix_dir or settings.VOTE_MATRIX_DIR)
+    version = _read_version(matrix_dir)
+    if version is None:
+        return None
+
+    cached = _loaded.get(matrix_dir)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    version_dir = os.path.join(matrix_dir, version)
+    try:
+        with open(os.path.join(version_dir, INDEX_FILE), 'rb') as f:
+            index = json.load(f)
+        votes = np.load(os.path.join(version_dir, MATRIX_FILE), mmap_mode='r')
+        clubs = np.load(os.path.join(version_dir, CLUBS_FILE), mmap_mode='r')
+    except FileNotFoundError:
+        # Wersja usunięta między odczytem wskaźnika a plików - wskaźnik wskazuje już nowszą
+        return load_vote_matrix(matrix_dir) if _read_version(matrix_dir) != version else None
+    matrix = VoteMatrix(
+        votes, clubs, index['bill_ids'], index['deputy_ids'], index.get('club_names', []), index.get('built_at')
+    )
+    _loaded[matrix_dir] = (version, matrix)
+    return matrix
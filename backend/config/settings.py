@@ -29,6 +29,45 @@ DEBUG = env('DEBUG')
 
 # OpenAI Configuration
 OPENAI_API_KEY = env('OPENAI_API_KEY')
+OPENAI_MODEL = env('OPENAI_MODEL', default='gpt-3.5-turbo')
+# Limity konta OpenAI (zapytania i tokeny na minutę) respektowane przez klienta
+OPENAI_RPM_LIMIT = env.int('OPENAI_RPM_LIMIT', default=3500)
+OPENAI_TPM_LIMIT = env.int('OPENAI_TPM_LIMIT', default=90000)
+OPENAI_MAX_CONNECTIONS = env.int('OPENAI_MAX_CONNECTIONS', default=20)
+# Adres API zgodnego z OpenAI (puste = api.openai.com), np. lokalny stub: http://127.0.0.1:8089/v1
+OPENAI_BASE_URL = env('OPENAI_BASE_URL', default='')
+# Ponowienia zapytań po 429 / 5xx / błędach połączenia (z wykładniczym odstępem, obsługuje klient OpenAI)
+OPENAI_MAX_RETRIES = env.int('OPENAI_MAX_RETRIES', default=2)
+# Cennik modelu (USD za 1000 tokenów) - koszt przebiegów analizy w telemetrii (AnalysisRun)
+OPENAI_PRICE_PROMPT_PER_1K = env.float('OPENAI_PRICE_PROMPT_PER_1K', default=0.0005)
+OPENAI_PRICE_COMPLETION_PER_1K = env.float('OPENAI_PRICE_COMPLETION_PER_1K', default=0.0015)
+# Okno kontekstu modelu (tokeny) - dłuższe teksty analizowane są metodą map-reduce
+OPENAI_CONTEXT_TOKENS = env.int('OPENAI_CONTEXT_TOKENS', default=16385)
+
+# Zadania analizy AI uruchamiane w tle (pula wątków procesu)
+AI_ANALYSIS_WORKERS = env.int('AI_ANALYSIS_WORKERS', default=2)
+AI_ANALYSIS_MAX_JOBS_PER_USER = env.int('AI_ANALYSIS_MAX_JOBS_PER_USER', default=2)
+# Zadanie aktywne dłużej niż limit (np. po restarcie procesu) uznawane jest za nieudane
+AI_ANALYSIS_JOB_TIMEOUT = env.int('AI_ANALYSIS_JOB_TIMEOUT', default=15 * 60)
+# Maksymalna długość tekstu analizowanego jednym zapytaniem (znaki; ograniczona także oknem
+# modelu - dłuższe teksty mieszczące się w oknie są skracane ekstrakcyjnie, a pozostałe idą
+# w całości przez map-reduce) i liczba równolegle streszczanych fragmentów
+AI_ANALYSIS_TEXT_BUDGET = env.int('AI_ANALYSIS_TEXT_BUDGET', default=120000)
+AI_ANALYSIS_MAP_CONCURRENCY = env.int('AI_ANALYSIS_MAP_CONCURRENCY', default=4)
+
+# OCR cache (indeks SQLite podzielony na shardy)
+OCR_CACHE_DIR = env('OCR_CACHE_DIR', default=str(BASE_DIR / 'ocr_cache'))
+OCR_CACHE_SHARDS = env.int('OCR_CACHE_SHARDS', default=16)
+
+# Lokalny magazyn PDF-ów (druki, wyniki głosowań) adresowany treścią
+PDF_STORE_DIR = env('PDF_STORE_DIR', default=str(BASE_DIR / 'pdf_store'))
+# Po ilu sekundach plik spod URL-a jest sprawdzany ponownie (warunkowy GET; 0 = tylko przy --force)
+PDF_STORE_REVALIDATE_SECONDS = env.int('PDF_STORE_REVALIDATE_SECONDS', default=24 * 60 * 60)
+# Limit rozmiaru rozpakowanych kopii roboczych (MB) - ponad limit usuwane są najdawniej używane
+PDF_STORE_WORK_MAX_MB = env.int('PDF_STORE_WORK_MAX_MB', default=1024)
+
+# Macierz głosów posłów (głosowania x posłowie, int8) dla analiz
+VOTE_MATRIX_DIR = env('VOTE_MATRIX_DIR', default=str(BASE_DIR / 'vote_matrix'))
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0', 'backend']
 
@@ -6,6 +6,7 @@ interface ProjectPdf {
   name: string
   url: string
   type: 'main_attachment' | 'additional_print'
+  format: 'docx' | 'odt' | 'pdf'
 }
 
 interface VotingProjectPdfsData {